@@ -0,0 +1,172 @@
+# src/cli.py
+#
+# Ligne de commande sans interface graphique (serveur, cron) : aucun import de PyQt5.
+#
+#   python main.py import newtokens.xlsx            fusion + sauvegarde
+#   python main.py import drop/newtokens*.csv       plusieurs fichiers : une seule fusion
+#   python main.py export --format csv -o out.csv
+#   python main.py stats --json
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+import config
+
+
+COMMANDS = ("import", "export", "stats")
+
+
+def _exporters():
+    # Formats d'export ; parquet / feather nécessitent pyarrow (optionnel)
+    exporters = {
+        "xlsx": lambda df, path: df.to_excel(path, index=False),
+        "csv": lambda df, path: df.to_csv(path, index=False),
+        "jsonl": lambda df, path: df.to_json(path, orient="records", lines=True, date_format="iso",
+                                             force_ascii=False),
+        "pickle": lambda df, path: df.to_pickle(path),
+    }
+    try:
+        import pyarrow  # noqa: F401
+        exporters["parquet"] = lambda df, path: df.to_parquet(path, index=False)
+        exporters["feather"] = lambda df, path: df.reset_index(drop=True).to_feather(path)
+    except ImportError:
+        pass
+    return exporters
+
+
+EXPORT_FORMATS = ("xlsx", "csv", "jsonl", "parquet", "feather", "pickle")
+
+
+def _open(args):
+    # Pas de journal de reprise : l'interface peut avoir le fichier ouvert (journal présent),
+    # on refuse alors d'écrire pour ne pas mélanger les deux sessions
+    if args.command != "import" and not os.path.exists(args.file):
+        raise RuntimeError(f"Fichier {args.file} introuvable.")  # pas de classeur vide créé pour un export
+    from excel_manager import ExcelManager  # pandas / openpyxl chargés seulement pour une commande
+    manager = ExcelManager(args.file, use_recovery=False)
+    if args.command == "import" and os.path.exists(manager._journal_path()) and not args.force:
+        raise RuntimeError(f"{manager._journal_path()} existe : fichier ouvert dans l'interface ou modifications "
+                           "non récupérées. Fermez l'interface (ou --force).")
+    manager.load_excel()
+    return manager
+
+
+def run_import(manager, args):
+    from import_sources import ChunkedSource
+    locked_cells = manager.load_locked_cells()
+    if len(args.sources) == 1:
+        prepared = manager.prepare_import(ChunkedSource(args.sources[0], args.chunk_rows), locked_cells)
+        manager.publish_import(prepared)
+    else:
+        manager.import_files(args.sources, locked_cells, workers=args.workers, archive=False)
+    report = manager.last_import_report
+    if not args.dry_run:
+        manager.save_excel()
+    return {
+        "updated": report["updated"],
+        "added": report["added"],
+        "unparsed_rows": len(report["unparsed_rows"]),
+        "locked_cells": len(locked_cells),
+        "rows": len(manager.df),
+        "saved": not args.dry_run,
+        "save": manager.last_save_stats if not args.dry_run else None,
+    }
+
+
+def run_export(manager, args):
+    exporters = _exporters()
+    if args.format not in exporters:
+        raise RuntimeError(f"Le format {args.format} nécessite pyarrow (pip install pyarrow).")
+    output = args.output or os.path.splitext(manager.filepath)[0] + "." + args.format
+    df = manager.df.drop(columns=[col for col in ("checked",) if col in manager.df.columns])
+    started = time.perf_counter()
+    exporters[args.format](df, output)
+    return {"output": output, "format": args.format, "rows": len(df), "seconds": time.perf_counter() - started}
+
+
+def run_stats(manager, args):
+    df = manager.df
+    stats = {
+        "file": manager.filepath,
+        "rows": len(df),
+        "columns": {str(col): str(dtype) for col, dtype in df.dtypes.items()},
+        "memory_mb": round(df.memory_usage(deep=True).sum() / (1024 * 1024), 2),
+        "load": manager.last_load_stats,
+        "duplicate_keys": len(manager.duplicate_keys()),
+        "locked_cells": len(manager.load_locked_cells()),
+    }
+    if "chain" in df.columns:
+        stats["chains"] = {str(k): int(v) for k, v in df["chain"].value_counts().items()}
+    if "last_scrape_date" in df.columns:
+        import pandas as pd
+        dates = pd.to_datetime(df["last_scrape_date"], errors="coerce", format="mixed")
+        stats["last_scrape_date"] = {"min": str(dates.min()), "max": str(dates.max()),
+                                     "missing": int(dates.isna().sum())}
+    return stats
+
+
+def _print(result, as_json):
+    if as_json:
+        print(json.dumps(result, default=str, ensure_ascii=False, indent=2))
+        return
+    for key, value in result.items():
+        if isinstance(value, dict):
+            print(f"{key} :")
+            for sub_key, sub_value in value.items():
+                print(f"  {sub_key} : {sub_value}")
+        else:
+            print(f"{key} : {value}")
+
+
+def build_parser():
+    # Options communes, acceptées avant ou après la sous-commande
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--file", default=argparse.SUPPRESS, help="classeur de référence (défaut : tokens.xlsx)")
+    common.add_argument("--json", action="store_true", default=argparse.SUPPRESS,
+                        help="résultat en JSON sur la sortie standard")
+
+    parser = argparse.ArgumentParser(prog="token-manager", description="Gestionnaire de tokens (sans interface).",
+                                     parents=[common])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", parents=[common],
+                       help="fusionne un ou plusieurs fichiers de nouveaux tokens puis sauvegarde")
+    p.add_argument("sources", nargs="+", help="fichiers xlsx / csv / jsonl")
+    p.add_argument("--chunk-rows", type=int, default=config.IMPORT_CHUNK_ROWS)
+    p.add_argument("--workers", type=int, default=config.DROP_FOLDER_WORKERS,
+                   help="processus de lecture pour plusieurs fichiers")
+    p.add_argument("--dry-run", action="store_true", help="fusion sans sauvegarde")
+    p.add_argument("--force", action="store_true", help="ignore un journal de reprise présent")
+
+    p = sub.add_parser("export", parents=[common], help="exporte la table")
+    p.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    p.add_argument("-o", "--output", help="fichier de sortie (défaut : à côté du classeur)")
+
+    sub.add_parser("stats", parents=[common], help="statistiques de la table")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.file = getattr(args, "file", "tokens.xlsx")
+    args.json = getattr(args, "json", False)
+    runners = {"import": run_import, "export": run_export, "stats": run_stats}
+    try:
+        # Messages de ExcelManager sur stderr : stdout ne reçoit que le résultat
+        with contextlib.redirect_stdout(sys.stderr):
+            manager = _open(args)
+            result = runners[args.command](manager, args)
+            manager.wait_for_cache()
+    except Exception as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    _print(result, args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
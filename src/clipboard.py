@@ -0,0 +1,118 @@
+# src/clipboard.py
+#
+# Copier / coller en bloc entre TokenTableModel et le presse-papiers :
+# une sélection est écrite en TSV en une passe, un texte collé (TSV ou CSV)
+# est lu en une grille puis appliqué colonne par colonne (ExcelManager.set_cells).
+
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+
+from search_index import _column_text
+
+
+def _cells(ranges):
+    # (lignes vue, colonnes vue) de chaque cellule des plages (QItemSelectionRange : top, bottom,
+    # left, right), calculées en tableaux sans créer un QModelIndex par cellule
+    rows, cols = [], []
+    for rng in ranges:
+        height, width = rng.bottom() - rng.top() + 1, rng.right() - rng.left() + 1
+        rows.append(np.repeat(np.arange(rng.top(), rng.bottom() + 1), width))
+        cols.append(np.tile(np.arange(rng.left(), rng.right() + 1), height))
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+def selection_text(model, ranges):
+    """Texte TSV (format Excel) des cellules sélectionnées, toutes plages confondues.
+
+    Le bloc couvre les lignes et colonnes de la sélection ; les cellules non
+    sélectionnées de ce bloc et la colonne des cases à cocher restent vides.
+    """
+    rows, cols = _cells(ranges)
+    if not len(rows):
+        return ""
+    block_rows, row_at = np.unique(rows, return_inverse=True)
+    block_cols, col_at = np.unique(cols, return_inverse=True)
+    selected = np.zeros((len(block_rows), len(block_cols)), dtype=bool)
+    selected[row_at, col_at] = True
+
+    df = model.manager.df
+    df_rows = model.df_rows(block_rows)
+    columns = []
+    for j, col in enumerate(block_cols.tolist()):
+        if col <= 0:
+            columns.append(np.full(len(block_rows), "", dtype=object))
+            continue
+        texts = _column_text(df.iloc[df_rows, model.position(col)]).to_numpy(dtype=object)
+        columns.append(np.where(selected[:, j], texts, ""))
+
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter="\t", lineterminator="\n").writerows(zip(*columns))
+    return buffer.getvalue()
+
+
+def parse_text(text):
+    """Grille collée (DataFrame d'objets, None au-delà d'une ligne plus courte).
+
+    TSV (Excel, LibreOffice) si le texte contient une tabulation ; CSV si au moins
+    deux lignes ont le même nombre de champs (> 1) ; sinon une valeur par ligne.
+    """
+    if "\t" in text:
+        rows = list(csv.reader(io.StringIO(text), delimiter="\t"))
+    else:
+        rows = list(csv.reader(io.StringIO(text)))
+        lines = [row for row in rows if row]
+        if len(lines) < 2 or len(lines[0]) < 2 or any(len(row) != len(lines[0]) for row in lines):
+            rows = [[line] for line in text.splitlines()]
+    return pd.DataFrame([row or [""] for row in rows], dtype=object)
+
+
+def _writable(model, view_rows, col, values):
+    # Cellules d'une colonne vue hors verrous : (lignes df, valeurs)
+    df_rows = model.df_rows(view_rows)
+    mask = model.manager.lock_masks().get(model.column_name(col))
+    if mask is not None:
+        free = ~mask[df_rows]
+        df_rows, values = df_rows[free], values[free]
+    return df_rows, values
+
+
+def _plan(parts):
+    if not parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=object), np.empty(0, dtype=object)
+    rows = np.concatenate([part_rows for part_rows, _, _ in parts])
+    columns = np.concatenate([np.full(len(part_rows), column, dtype=object) for part_rows, column, _ in parts])
+    values = np.concatenate([part_values for _, _, part_values in parts])
+    return rows, columns, values
+
+
+def paste_plan(model, grid, top, left):
+    """(lignes df, colonnes, valeurs) à écrire pour coller grid en (top, left) de la vue :
+    sans la colonne des cases à cocher, ni ce qui dépasse de la table, ni les cellules verrouillées."""
+    height = min(len(grid), model.rowCount() - top)
+    parts = []
+    for j in range(grid.shape[1]):
+        col = left + j
+        if col <= 0 or col >= model.columnCount() or height <= 0:
+            continue
+        values = grid.iloc[:height, j].to_numpy(dtype=object)
+        present = np.flatnonzero(pd.notna(values))  # ligne collée plus courte : cellule laissée telle quelle
+        df_rows, values = _writable(model, top + present, col, values[present])
+        parts.append((df_rows, model.column_name(col), values))
+    return _plan(parts)
+
+
+def fill_plan(model, ranges, value):
+    """(lignes df, colonnes, valeurs) pour écrire value dans toutes les cellules sélectionnées
+    (effacement, collage d'une seule valeur), hors cases à cocher et cellules verrouillées."""
+    rows, cols = _cells(ranges)
+    parts = []
+    for col in np.unique(cols[cols > 0]).tolist():
+        view_rows = rows[cols == col]
+        df_rows, values = _writable(model, view_rows, col, np.full(len(view_rows), value, dtype=object))
+        parts.append((df_rows, model.column_name(col), values))
+    return _plan(parts)
@@ -19,3 +19,22 @@ INACTIVE_ROW_COLOR = "#F0F0F0" # Couleur grisée pour actif=0
 # Options de log
 ENABLE_LOCAL_LOG = True
 LOCAL_LOG_FILENAME = "logs/project_log.txt"
+
+# Annulation / rétablissement
+UNDO_MEMORY_BUDGET_MB = 64  # mémoire max du journal d'annulation (les plus anciennes actions sont oubliées)
+
+# Recherche
+SEARCH_DEBOUNCE_MS = 200  # délai après la dernière frappe avant de filtrer le tableau
+
+# Journal de reprise après plantage
+JOURNAL_SYNC_INTERVAL = 1.0  # fsync du journal au plus une fois par intervalle (secondes)
+
+# Import de nouveaux tokens
+NEW_TOKENS_FILE = "newtokens.xlsx"  # fichier proposé par défaut (xlsx, CSV ou JSONL)
+IMPORT_CHUNK_ROWS = 50000  # lignes lues et fusionnées par lot (mémoire bornée pour les gros flux)
+
+# Dossier de dépôt surveillé (bouton "Surveiller le dossier de dépôt")
+DROP_FOLDER_PATH = "drop/"          # fichiers newtokens*.xlsx / .csv / .jsonl déposés par le scraper
+DROP_FOLDER_PATTERN = "newtokens*"  # fichiers pris en compte (les traités vont dans drop/imported/)
+DROP_FOLDER_SETTLE_MS = 2000  # délai sans modification avant import (fichier en cours de copie)
+DROP_FOLDER_WORKERS = None    # processus de lecture en parallèle (None = nombre de cœurs)
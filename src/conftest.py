@@ -0,0 +1,46 @@
+# src/conftest.py
+#
+# Fixtures pytest communes : un petit classeur tokens.xlsx écrit dans un dossier
+# temporaire et l'ExcelManager qui le charge (sans cache binaire ni journal de reprise).
+
+import openpyxl
+import pytest
+
+from excel_manager import ExcelManager
+
+
+HEADERS = ["contract_address", "token_id", "chain", "url", "collection", "qtt_owned", "floor_price", "actif"]
+
+
+def token_rows(count):
+    rows = []
+    for i in range(count):
+        contract_address = f"0x{i % 3:040x}"
+        rows.append([contract_address, str(i), "ethereum",
+                     f"https://opensea.io/assets/ethereum/{contract_address}/{i}",
+                     f"col{i % 4}", i % 5, round(0.1 * i, 2), i % 2])
+    return rows
+
+
+def write_workbook(path, rows, headers=HEADERS):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Tokens"
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    return write_workbook(tmp_path / "tokens.xlsx", token_rows(12))
+
+
+@pytest.fixture
+def manager(workbook):
+    manager = ExcelManager(workbook, use_cache=False, use_recovery=False)
+    manager.load_excel()
+    yield manager
+    manager.wait_for_save()
@@ -0,0 +1,463 @@
+# src/diff_engine.py
+
+import hashlib
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from token_index import INDEX_COLUMNS, frame_keys
+
+
+def _cell_texts(values):
+    # Texte de chaque cellule (vide pour None / NaN), celui que compare _changed
+    values = np.asarray(values, dtype=object)
+    if pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty"):
+        texts = values.copy()  # déjà du texte : pas de conversion valeur par valeur
+    else:
+        texts = values.astype(str).astype(object)
+    texts[np.asarray(pd.isna(values), dtype=bool)] = ""
+    return texts
+
+
+def _native(dtype):
+    return isinstance(dtype, np.dtype) and dtype.kind in "biufmM"
+
+
+def cell_hashes(values, dtype):
+    """Empreinte (uint64) de chaque cellule, base de column_hash et de RowHashes.
+
+    Colonnes numpy (nombres, dates) : valeurs brutes ; sinon texte affiché de la
+    cellule, vide pour None / NaN / "" (mêmes égalités que _changed).
+    """
+    if _native(dtype):
+        return pd.util.hash_array(np.asarray(values, dtype=dtype))
+    if isinstance(values, pd.Categorical):
+        # Texte de chaque catégorie haché une fois ; code -1 (vide) -> dernière entrée (None)
+        categories = np.append(values.categories.to_numpy(dtype=object), None)
+        return cell_hashes(categories, np.dtype(object))[values.codes]
+    return pd.util.hash_array(_cell_texts(values), categorize=False)
+
+
+def series_hashes(series, dtype=None):
+    """Empreintes des cellules d'une colonne, calculées dans le type dtype (par défaut le sien).
+
+    RowHashes passe le type de la colonne à la reconstruction : une colonne passée
+    en object par une saisie garde les mêmes empreintes à contenu égal.
+    """
+    dtype = series.dtype if dtype is None else dtype
+    if series.dtype != dtype and not _native(dtype):
+        series = series.astype(object)  # même texte que la colonne passée en object (dates...)
+    try:
+        return cell_hashes(series.array, dtype)
+    except (TypeError, ValueError):
+        return cell_hashes(series.array, np.dtype(object))
+
+
+def column_hash(series):
+    # Empreinte d'une colonne : empreintes de ses cellules dans l'ordre des lignes, sans l'index
+    return hashlib.md5(series_hashes(series).tobytes()).hexdigest()
+
+
+class ColumnHashCache:
+    """Empreintes par colonne gardées entre deux comparaisons.
+
+    Même règle que ColumnParseCache : une entrée reste valable tant que df est
+    le même objet et que la version de la colonne n'a pas changé.
+    """
+
+    def __init__(self):
+        self._source = None
+        self._cache = {}  # colonne -> (version, empreinte)
+
+    def get(self, df, column, version):
+        if self._source is None or self._source() is not df:
+            self._cache.clear()
+            self._source = weakref.ref(df)
+        entry = self._cache.get(column)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        value = column_hash(df[column])
+        self._cache[column] = (version, value)
+        return value
+
+
+def _cell_hash(value, dtype):
+    return cell_hashes([value], dtype)[0]
+
+
+def _salt(column):
+    # Poids de la colonne dans l'empreinte d'une ligne (impair : aucune valeur n'est annulée)
+    return pd.util.hash_array(np.array([str(column)], dtype=object), categorize=False)[0] | np.uint64(1)
+
+
+def _position_weights(count):
+    return pd.util.hash_array(np.arange(count, dtype=np.uint64)) | np.uint64(1)
+
+
+class RowHashes:
+    """Empreinte de chaque ligne de df, tenue à jour à chaque modification.
+
+    Empreinte d'une ligne = somme (modulo 2**64) des empreintes de ses cellules
+    (series_hashes, comme column_hash) pondérées par colonne : une édition ne
+    recalcule que la cellule changée. L'empreinte du tableau pondère les lignes
+    par leur position, mise à jour en O(1) par édition ; les opérations sur les
+    lignes la recalculent en bloc, une opération sur les colonnes ne hache que
+    la colonne concernée.
+    """
+
+    def __init__(self, ignore=("checked",)):
+        self.ignore = ignore
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._ids = np.empty(0, dtype=np.int64)  # identifiant de chaque ligne, croissant à l'insertion
+        self._next_id = 0
+        self._weights = np.empty(0, dtype=np.uint64)
+        self._total = np.uint64(0)
+        self._columns = ()
+        self._dtypes = {}  # type de chaque colonne à la reconstruction (empreinte d'une cellule)
+        self._source = None  # weakref du DataFrame
+        self.generation = 0  # incrémenté à chaque reconstruction (colonnes / types changés)
+        self.version = 0     # incrémenté à chaque changement d'une empreinte
+
+    def is_current(self, df):
+        return self._source is not None and self._source() is df
+
+    def same_dtypes(self, df):
+        # Faux si une colonne a changé de type (texte saisi dans une colonne numérique...)
+        return all(df[col].dtype == dtype for col, dtype in self._dtypes.items())
+
+    def invalidate(self):
+        self._source = None
+
+    def _frame_hashes(self, frame):
+        hashes = np.zeros(len(frame), dtype=np.uint64)
+        for column in self._columns:
+            hashes += self._column_hashes(frame, column) * _salt(column)
+        return hashes
+
+    def _column_hashes(self, frame, column):
+        if column in frame.columns:
+            series = frame[column]
+        else:
+            series = pd.Series(None, index=frame.index, dtype=object)  # colonne absente : cellules vides
+        return series_hashes(series, self._dtypes[column])
+
+    def hashes_of(self, frame):
+        """Empreintes des lignes d'un autre tableau (classeur sauvegardé...), calculées avec les
+        colonnes et les types de df : comparables une à une avec row_hashes()."""
+        return self._frame_hashes(frame)
+
+    def row_hashes(self):
+        return self._hashes
+
+    def row_ids(self):
+        """Identifiant stable de chaque ligne (insertions, suppressions et tris suivis) : une ligne
+        insérée a un identifiant plus grand que les lignes déjà présentes."""
+        return self._ids
+
+    def _new_ids(self, count):
+        ids = np.arange(self._next_id, self._next_id + count, dtype=np.int64)
+        self._next_id += count
+        return ids
+
+    def _attach(self, df):
+        self._source = weakref.ref(df)
+        self.version += 1
+        if len(self._weights) < len(self._hashes):
+            self._weights = _position_weights(max(len(self._hashes), 2 * len(self._weights)))
+        self._total = np.sum(self._hashes * self._weights[:len(self._hashes)], dtype=np.uint64)
+
+    def rebuild(self, df):
+        self._columns = tuple(col for col in df.columns if col not in self.ignore)
+        self._dtypes = {col: df[col].dtype for col in self._columns}
+        self._hashes = self._frame_hashes(df)
+        self._ids = self._new_ids(len(df))
+        self.generation += 1
+        self._attach(df)
+
+    # --- Colonnes : seule la colonne concernée est hachée ---
+
+    def _set_columns(self, df):
+        self._columns = tuple(col for col in df.columns if col not in self.ignore)
+        self.generation += 1  # empreinte du classeur sauvegardé à recalculer avec ces colonnes
+
+    def add_column(self, column, df):
+        if column in self.ignore:
+            return
+        self._dtypes[column] = df[column].dtype
+        self._set_columns(df)
+        with np.errstate(over="ignore"):
+            self._hashes = self._hashes + self._column_hashes(df, column) * _salt(column)
+        self._attach(df)
+
+    def delete_column(self, column, values, df):
+        # values : colonne retirée de df
+        if column not in self._dtypes:
+            return
+        with np.errstate(over="ignore"):
+            self._hashes = self._hashes - self._column_hashes(values.to_frame(column), column) * _salt(column)
+        del self._dtypes[column]
+        self._set_columns(df)
+        self._attach(df)
+
+    def rename_column(self, old_name, new_name, df):
+        if old_name not in self._dtypes:
+            return
+        self._dtypes[new_name] = self._dtypes.pop(old_name)
+        with np.errstate(over="ignore"):
+            self._hashes = self._hashes + self._column_hashes(df, new_name) * (_salt(new_name) - _salt(old_name))
+        self._set_columns(df)
+        self._attach(df)
+
+    def move_column(self, df):
+        # Empreintes des lignes inchangées (somme sur les colonnes), seul l'ordre des colonnes compte
+        self._set_columns(df)
+        self._attach(df)
+
+    def update_cell(self, row, column, old_value, new_value):
+        if column in self.ignore:
+            return
+        dtype = self._dtypes[column]
+        with np.errstate(over="ignore"):
+            delta = (_cell_hash(new_value, dtype) - _cell_hash(old_value, dtype)) * _salt(column)
+            self._hashes[row] += delta
+            self._total += delta * self._weights[row]
+        self.version += 1
+
+    def update_cells(self, rows, column, old_values, new_values):
+        # Même calcul que update_cell pour plusieurs lignes d'une colonne (lignes distinctes)
+        if column in self.ignore or not len(rows):
+            return
+        dtype = self._dtypes[column]
+        rows = np.asarray(rows, dtype=np.int64)
+        with np.errstate(over="ignore"):
+            delta = (cell_hashes(new_values, dtype) - cell_hashes(old_values, dtype)) * _salt(column)
+            self._hashes[rows] += delta
+            self._total += np.sum(delta * self._weights[rows], dtype=np.uint64)
+        self.version += 1
+
+    def insert_rows(self, positions, df):
+        # df : tableau après insertion (valeurs telles que stockées, types de colonnes inchangés)
+        positions = np.asarray(positions, dtype=int)
+        hashes = np.empty(len(self._hashes) + len(positions), dtype=np.uint64)
+        inserted = np.zeros(len(hashes), dtype=bool)
+        inserted[positions] = True
+        hashes[inserted] = self._frame_hashes(df.iloc[positions])
+        hashes[~inserted] = self._hashes
+        self._hashes = hashes
+        ids = np.empty(len(hashes), dtype=np.int64)
+        ids[inserted] = self._new_ids(len(positions))
+        ids[~inserted] = self._ids
+        self._ids = ids
+        self._attach(df)
+
+    def delete_rows(self, positions, df):
+        self._hashes = np.delete(self._hashes, list(positions))
+        self._ids = np.delete(self._ids, list(positions))
+        self._attach(df)
+
+    def reorder(self, order, df):
+        self._hashes = self._hashes[np.asarray(order)]
+        self._ids = self._ids[np.asarray(order)]
+        self._attach(df)
+
+    def row_hash(self, row):
+        return int(self._hashes[row])
+
+    def fingerprint(self):
+        return self._digest(self._columns, self._total, len(self._hashes))
+
+    def fingerprint_of(self, frame):
+        """Empreinte d'un autre tableau calculée comme celle de df (mêmes types de colonnes) :
+        égale à fingerprint() si même contenu, même quand ils ne sont pas stockés dans le même type."""
+        columns = tuple(col for col in frame.columns if col not in self.ignore)
+        if columns != self._columns:
+            other = RowHashes(self.ignore)  # colonnes différentes : empreintes forcément différentes
+            other.rebuild(frame)
+            return other.fingerprint()
+        hashes = self._frame_hashes(frame)
+        total = np.sum(hashes * _position_weights(len(hashes)), dtype=np.uint64)
+        return self._digest(columns, total, len(hashes))
+
+    @staticmethod
+    def _digest(columns, total, count):
+        digest = hashlib.md5("\x1f".join(map(str, columns)).encode("utf-8"))
+        digest.update(int(total).to_bytes(8, "little"))
+        digest.update(count.to_bytes(8, "little"))
+        return digest.hexdigest()
+
+
+def _row_labels(frame):
+    # Clé (contract_address, token_id) de chaque ligne en texte ("" si pas de clé)
+    return np.array(["" if key is None else "\x1f".join(key) for key in frame_keys(frame)], dtype=object)
+
+
+def _align(before_labels, after_labels):
+    # Paires (position avant, position après) de même clé ; doublons et lignes sans clé
+    # sont appariés dans leur ordre d'apparition
+    def ids(labels):
+        series = pd.Series(labels, dtype=object)
+        rank = series.groupby(series, sort=False).cumcount().astype(str)
+        return (series + "\x1e" + rank).to_numpy(dtype=object)
+
+    before_ids, after_ids = ids(before_labels), ids(after_labels)
+    indexer = pd.Index(before_ids).get_indexer(after_ids)
+    matched = indexer >= 0
+    after_rows = np.flatnonzero(matched)
+    before_rows = indexer[matched]
+    removed = np.setdiff1d(np.arange(len(before_ids)), before_rows, assume_unique=True)
+    return before_rows, after_rows, np.flatnonzero(~matched), removed
+
+
+def _is_empty(values):
+    return np.asarray(pd.isna(values), dtype=bool) | np.asarray(values == "", dtype=bool)
+
+
+def _display(value):
+    return "" if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)) else value
+
+
+def _column_values(before, after):
+    # Même type numpy (nombres, dates) : comparaison native, sans convertir chaque valeur en objet
+    if before.dtype == after.dtype and isinstance(before.dtype, np.dtype) and before.dtype.kind in "biufmM":
+        return before.to_numpy(), after.to_numpy(), True
+    return before.to_numpy(dtype=object), after.to_numpy(dtype=object), False
+
+
+def _changed_native(before, after):
+    return (before != after) & ~(pd.isna(before) & pd.isna(after))
+
+
+def _changed(before, after):
+    # Masque des cellules différentes ; vide (None, NaN, "") = vide, sinon comparaison
+    # du texte affiché (1 et "1" sont égaux) pour les seules valeurs d'abord différentes
+    empty_before, empty_after = _is_empty(before), _is_empty(after)
+    same = np.asarray(before == after, dtype=bool) | (empty_before & empty_after)
+    changed = ~same
+    candidates = np.flatnonzero(changed & ~empty_before & ~empty_after)
+    if candidates.size:
+        text_same = np.fromiter((str(a) == str(b) for a, b in zip(before[candidates], after[candidates])),
+                                dtype=bool, count=candidates.size)
+        changed[candidates[text_same]] = False
+    return changed
+
+
+class FrameDiff:
+    """Différences entre deux tableaux (avant -> après).
+
+    changed : {colonne: (lignes après, valeurs avant, valeurs après)} en tableaux numpy.
+    added_rows / removed_rows : positions dans après / dans avant.
+    skipped_columns : colonnes écartées sans comparaison (même empreinte).
+    """
+
+    def __init__(self):
+        self.aligned_on = "position"  # "position" (mêmes clés dans le même ordre) ou "clé"
+        self.changed = {}
+        self.added_rows = np.empty(0, dtype=np.int64)
+        self.removed_rows = np.empty(0, dtype=np.int64)
+        self.added_columns = []
+        self.removed_columns = []
+        self.skipped_columns = []
+        self.seconds = 0.0
+
+    @property
+    def changed_cells(self):
+        return sum(len(rows) for rows, _, _ in self.changed.values())
+
+    def is_empty(self):
+        return not (self.changed or len(self.added_rows) or len(self.removed_rows)
+                    or self.added_columns or self.removed_columns)
+
+    def summary(self):
+        return {
+            "changed_cells": self.changed_cells,
+            "changed_rows": len(np.unique(np.concatenate([rows for rows, _, _ in self.changed.values()])))
+            if self.changed else 0,
+            "added_rows": len(self.added_rows),
+            "removed_rows": len(self.removed_rows),
+            "added_columns": list(self.added_columns),
+            "removed_columns": list(self.removed_columns),
+        }
+
+    def cells(self):
+        # (ligne après, colonne, avant, après), ligne par ligne
+        entries = [(int(row), column, before, after)
+                   for column, (rows, befores, afters) in self.changed.items()
+                   for row, before, after in zip(rows, befores, afters)]
+        return sorted(entries, key=lambda entry: entry[0])
+
+    def describe(self, model_columns=None, is_locked=None, limit=None):
+        """Lignes de journal "🔒/⚠️ Diff (...)" ; model_columns donne la position des colonnes dans le
+        modèle, is_locked(ligne, colonne) les cellules verrouillées."""
+        positions = {column: i for i, column in enumerate(model_columns or [])}
+        lines = []
+        for row, column, before, after in self.cells():
+            if limit is not None and len(lines) >= limit:
+                lines.append(f"... {self.changed_cells - limit} autre(s) cellule(s)")
+                break
+            col = positions.get(column, -1)
+            status = "🔒" if is_locked is not None and is_locked(row, column) else "⚠️"
+            lines.append(f"{status} Diff (row={row}, col={col}, '{column}') : '{_display(before)}' → '{_display(after)}'")
+        return lines
+
+
+def diff_frames(before, after, before_hash=None, after_hash=None, ignore=("checked",), results=None):
+    """Compare before et after colonne par colonne, lignes alignées sur (contract_address, token_id).
+
+    before_hash / after_hash : colonne -> empreinte (voir ColumnHashCache) ; quand les
+    lignes sont dans le même ordre, une colonne de même empreinte n'est pas comparée.
+    results : dict gardé par l'appelant, résultat par colonne pour une paire d'empreintes
+    déjà comparée (seules les colonnes modifiées depuis l'appel précédent sont relues).
+    """
+    started = time.perf_counter()
+    diff = FrameDiff()
+    before_columns = [col for col in before.columns if col not in ignore]
+    after_columns = [col for col in after.columns if col not in ignore]
+    known_before, known_after = set(before_columns), set(after_columns)
+    diff.added_columns = [col for col in after_columns if col not in known_before]
+    diff.removed_columns = [col for col in before_columns if col not in known_after]
+
+    hashed = before_hash is not None and after_hash is not None
+    positional = False
+    if len(before) == len(after):
+        if hashed and all(col in known_before and col in known_after for col in INDEX_COLUMNS):
+            # Colonnes clés identiques : mêmes lignes dans le même ordre, sans recalculer les clés
+            positional = all(before_hash(col) == after_hash(col) for col in INDEX_COLUMNS)
+        if not positional:
+            before_labels, after_labels = _row_labels(before), _row_labels(after)
+            positional = bool(np.all(before_labels == after_labels))
+    else:
+        before_labels, after_labels = _row_labels(before), _row_labels(after)
+    if positional:
+        before_rows = after_rows = None
+    else:
+        diff.aligned_on = "clé"
+        before_rows, after_rows, diff.added_rows, diff.removed_rows = _align(before_labels, after_labels)
+
+    for column in after_columns:
+        if column in known_before:
+            pair = None
+            if positional and hashed:
+                pair = (before_hash(column), after_hash(column))
+                if pair[0] == pair[1]:
+                    diff.skipped_columns.append(column)
+                    continue
+                if results is not None and column in results and results[column][0] == pair:
+                    if results[column][1] is not None:
+                        diff.changed[column] = results[column][1]
+                    continue
+            old, new, native = _column_values(before[column], after[column])
+            if not positional:
+                old, new = old[before_rows], new[after_rows]
+            changed = _changed_native(old, new) if native else _changed(old, new)
+            if changed.any():
+                rows = np.flatnonzero(changed)
+                # Valeurs des seules cellules modifiées, converties en objets Python
+                diff.changed[column] = (rows if positional else after_rows[rows],
+                                        pd.Series(old[rows]).to_numpy(dtype=object),
+                                        pd.Series(new[rows]).to_numpy(dtype=object))
+            if pair is not None and results is not None:
+                results[column] = (pair, diff.changed.get(column))
+    diff.seconds = time.perf_counter() - started
+    return diff
@@ -0,0 +1,171 @@
+# src/drop_folder.py
+
+import fnmatch
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from import_sources import ChunkedSource
+from token_index import frame_keys
+from url_keys import KEY_COLUMNS, UrlKeyExtractor
+
+
+IMPORTED_DIR = "imported"  # sous-dossiers où sont rangés les fichiers traités
+FAILED_DIR = "failed"
+URL_ENTRY = "\x1furl_keys"  # colonne de travail de coalesce (résultat du parsing de l'URL de la ligne)
+INVALID_URL = "\x1finvalide"  # URL présente mais inexploitable (valeur non vide pour coalesce)
+
+
+def pending_files(folder, pattern, settle_seconds=0.0):
+    """Fichiers en attente dans folder, du plus ancien au plus récent (le plus récent l'emporte).
+
+    Un fichier modifié depuis moins de settle_seconds est encore en cours
+    d'écriture : il sera pris au passage suivant.
+    """
+    if not os.path.isdir(folder):
+        return []
+    now = time.time()
+    files = []
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if name.startswith((".", "~$")) or not os.path.isfile(path):
+            continue  # fichiers temporaires / verrous Excel
+        if not fnmatch.fnmatch(name.lower(), pattern.lower()):
+            continue
+        if os.path.splitext(name)[1].lower() not in ChunkedSource.EXTENSIONS:
+            continue
+        mtime = os.path.getmtime(path)
+        if now - mtime >= settle_seconds:
+            files.append((mtime, name, path))
+    return [path for _, _, path in sorted(files)]
+
+
+def read_drop_file(path):
+    # Exécuté dans un processus du pool : lecture complète + clés tirées de l'URL
+    # Retourne (tableau, résultat du parsing par ligne, nombre d'URL inexploitables) ; le résultat
+    # par ligne (clé, INVALID_URL si URL inexploitable, None sans URL) évite de reparser à la fusion
+    frame = pd.concat(list(ChunkedSource(path)), ignore_index=True)
+    frame = frame.drop(columns=[col for col in ("✔", "checked") if col in frame.columns])
+    if "url" not in frame.columns:
+        return frame, None, 0
+    keys, invalid = UrlKeyExtractor().extract(frame["url"])
+    for col in KEY_COLUMNS:
+        found = keys[col].notna().to_numpy()
+        if not found.any():
+            continue
+        values = frame[col].to_numpy(dtype=object, copy=True) if col in frame.columns \
+            else np.full(len(frame), None, dtype=object)
+        values[found] = keys[col].to_numpy(dtype=object)[found]
+        frame[col] = values
+    entries = pd.Series(list(zip(*(keys[col].to_numpy(dtype=object) for col in KEY_COLUMNS))),
+                        dtype=object).to_numpy(copy=True)
+    entries[frame.index.isin(invalid)] = INVALID_URL
+    urls = frame["url"].to_numpy(dtype=object)
+    entries[pd.isna(urls) | (urls == "")] = None  # champ vide pour coalesce : pas de clé
+    return frame, entries, len(invalid)
+
+
+def _url_keys(entries, index):
+    # Résultat par ligne -> (clés, lignes invalides), comme UrlKeyExtractor.extract
+    keys = pd.DataFrame({col: np.array([entry[i] if isinstance(entry, tuple) else None for entry in entries],
+                                       dtype=object)
+                         for i, col in enumerate(KEY_COLUMNS)}, index=index)
+    return keys, index[np.array([isinstance(entry, str) for entry in entries], dtype=bool)]
+
+
+def coalesce(frames, entries=None):
+    """Un seul tableau à importer : une ligne par (contract_address, token_id).
+
+    Pour chaque champ, la dernière valeur non vide l'emporte (frames du plus
+    ancien au plus récent), comme des imports successifs des mêmes fichiers.
+    Les lignes sans clé sont gardées telles quelles.
+
+    entries : résultat du parsing des URL de chaque frame (voir read_drop_file).
+    Retourne (tableau, clés d'URL du tableau ou None) : l'URL gardée pour un token
+    et ses clés viennent de la même ligne, elles ne sont pas reparsées.
+    """
+    frame = pd.concat(frames, ignore_index=True)
+    with_entries = entries is not None and "url" in frame.columns
+    if with_entries:
+        frame[URL_ENTRY] = np.concatenate([
+            np.full(len(part), None, dtype=object) if part_entries is None else part_entries
+            for part, part_entries in zip(frames, entries)])
+    if not frame.empty:
+        keys = frame_keys(frame)
+        keyed = np.array([key is not None for key in keys], dtype=bool)
+        if keyed.any():
+            labels = pd.Series(["\x1f".join(key) for key in np.asarray(keys, dtype=object)[keyed]])
+            with_keys = frame[keyed].reset_index(drop=True)
+            with_keys = with_keys.where(with_keys.astype(object) != "", None)  # "" = champ vide, comme dans import_table
+            latest = with_keys.groupby(labels.to_numpy(), sort=False).last()
+            latest = latest.reset_index(drop=True).reindex(columns=frame.columns)
+            frame = pd.concat([latest, frame[~keyed]], ignore_index=True)
+    if not with_entries:
+        return frame, None
+    return frame.drop(columns=URL_ENTRY), _url_keys(frame[URL_ENTRY].to_numpy(dtype=object), frame.index)
+
+
+def read_files(paths, workers=None, progress=None):
+    """Lit les fichiers en parallèle (pool de processus) -> (tableau fusionné, clés d'URL, lus, en échec).
+
+    clés d'URL : (clés, lignes invalides) du tableau fusionné, ou None (voir coalesce).
+    en échec : [(chemin, message)]. progress(lignes lues, 0) après chaque fichier.
+    """
+    frames, entries, read, failed = [], [], [], []
+    rows = 0
+
+    def collect(path, result):
+        nonlocal rows
+        frame, url_entries, unparsed = result
+        frames.append(frame)
+        entries.append(url_entries)
+        read.append(path)
+        rows += len(frame)
+        print(f"📄 {os.path.basename(path)} : {len(frame)} lignes ({unparsed} URL inexploitable(s))")
+        if progress is not None:
+            progress(rows, 0)
+
+    if len(paths) <= 1:
+        # Un seul fichier : pas de processus à démarrer
+        for path in paths:
+            try:
+                collect(path, read_drop_file(path))
+            except Exception as e:
+                failed.append((path, str(e)))
+    else:
+        # spawn : pas de fork d'un processus qui a des threads (Qt, sauvegarde, import)
+        workers = min(workers or os.cpu_count() or 1, len(paths))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(read_drop_file, path) for path in paths]
+            for path, future in zip(paths, futures):  # dans l'ordre : le plus récent en dernier
+                try:
+                    collect(path, future.result())
+                except BrokenProcessPool:
+                    raise  # le pool lui-même a échoué : aucun fichier n'est mis de côté
+                except Exception as e:
+                    failed.append((path, str(e)))
+
+    for path, message in failed:
+        print(f"❌ {os.path.basename(path)} illisible : {message}")
+    if not frames:
+        return None, None, read, failed
+    return (*coalesce(frames, entries), read, failed)
+
+
+def archive(paths, subfolder):
+    # Range les fichiers traités (à côté d'eux, dans subfolder) : ils ne seront pas réimportés
+    for path in paths:
+        target = os.path.join(os.path.dirname(path), subfolder)
+        os.makedirs(target, exist_ok=True)
+        name = os.path.basename(path)
+        destination = os.path.join(target, name)
+        if os.path.exists(destination):
+            stem, ext = os.path.splitext(name)
+            destination = os.path.join(target, f"{stem}.{time.strftime('%Y%m%d-%H%M%S')}{ext}")
+        shutil.move(path, destination)
@@ -2,20 +2,319 @@
 
 import openpyxl
 import os
-from datetime import datetime
+import json
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+import numpy as np
 import pandas as pd
+from url_keys import UrlKeyExtractor, KEY_COLUMNS
+from token_index import TokenIndex, INDEX_COLUMNS, frame_keys, make_key
+from search_index import SearchIndex, _column_text
+from query_filter import ColumnParseCache, parse_query
+from recovery_journal import RecoveryJournal, file_signature
+from xlsx_patch import PatchError, active_sheet_name, has_formulas, last_row_number, patch_workbook, read_header
+from diff_engine import ColumnHashCache, FrameDiff, RowHashes, diff_frames
+from lock_store import LockStore
+from import_pipeline import check_cancelled, read_ahead
+from import_sources import ChunkedSource
+import drop_folder
+import config
+
+
+def _normalize_token_id(value):
+    # 12.0 (lu comme nombre par Excel) -> "12" ; les chaînes restent intactes
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        if value != value:  # NaN
+            return None
+        return str(int(value)) if value.is_integer() else str(value)
+    return str(value)
+
+
+def _is_text(series):
+    # Test en C : colonne déjà composée uniquement de chaînes (valeurs vides ignorées)
+    return series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty")
+
+
+def _as_text(series):
+    if _is_text(series):
+        return series
+    values = series.to_numpy(dtype=object)
+    mask = pd.isna(values)
+    out = values.astype(str).astype(object)
+    out[mask] = None
+    return pd.Series(out, index=series.index, dtype=object)
+
+
+def _as_token_id(series):
+    if _is_text(series):
+        return series
+    return pd.Series([_normalize_token_id(v) for v in series.to_numpy(dtype=object)],
+                     index=series.index, dtype=object)
+
+
+def _as_category(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    return series.astype("category")
+
+
+def _as_datetime(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    parsed = pd.to_datetime(series, errors="coerce", format="mixed")
+    # On ne convertit que si aucune valeur non vide n'est perdue
+    if parsed.notna().sum() == series.notna().sum():
+        return parsed
+    return series
+
+
+# Types déclarés pour les colonnes connues (les autres sont inférés par pandas)
+COLUMN_DTYPES = {
+    "contract_address": _as_text,
+    "token_id": _as_token_id,
+    "chain": _as_category,
+    "last_scrape_date": _as_datetime,
+}
+
+
+def _read_columns_openpyxl(filepath):
+    # Lecture en flux (read_only) : aucune cellule n'est gardée en mémoire par openpyxl
+    # Formules lues telles quelles ("=SOMME(...)") pour être réécrites à la sauvegarde
+    workbook = openpyxl.load_workbook(filepath, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header_row = next(rows, ())
+        positions = [i for i, value in enumerate(header_row) if value is not None]
+        headers = [str(header_row[i]).strip().lower() for i in positions]
+
+        columns = [[] for _ in positions]
+        appenders = [column.append for column in columns]
+        width = len(header_row)
+        for row in rows:
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            for append, i in zip(appenders, positions):
+                append(row[i])
+        return headers, columns
+    finally:
+        workbook.close()
+
+
+def _calamine_value(value):
+    # Mêmes valeurs Python qu'openpyxl : cellule vide -> None, 12.0 -> 12, date -> datetime
+    if value == "":
+        return None
+    if type(value) is float and value.is_integer():
+        return int(value)
+    if type(value) is date:
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def _read_columns_calamine(filepath):
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_path(filepath)
+    try:
+        # Feuille active et plage depuis A1, comme openpyxl (pas la première feuille ni la zone utilisée)
+        rows = workbook.get_sheet_by_name(active_sheet_name(filepath)).to_python(skip_empty_area=False)
+    finally:
+        workbook.close()
+    header_row = [_calamine_value(value) for value in rows[0]] if rows else []
+    positions = [i for i, value in enumerate(header_row) if value is not None]
+    headers = [str(header_row[i]).strip().lower() for i in positions]
+    columns = [[_calamine_value(row[i]) for row in rows[1:]] for i in positions]
+    # calamine s'arrête à la dernière cellule remplie ; openpyxl garde les lignes vides écrites après
+    missing = last_row_number(filepath) - len(rows)
+    if missing > 0:
+        for column in columns:
+            column.extend([None] * missing)
+    return headers, columns
+
+
+# Lecteurs disponibles ; "auto" prend calamine s'il est installé (beaucoup plus rapide)
+LOAD_ENGINES = {
+    "openpyxl": _read_columns_openpyxl,
+    "calamine": _read_columns_calamine,
+}
+
+
+def _default_engine():
+    try:
+        import python_calamine  # noqa: F401
+        return "calamine"
+    except ImportError:
+        return "openpyxl"
+
+
+# Cache binaire à côté du xlsx : Feather si pyarrow est installé, pickle pandas sinon
+CACHE_VERSION = 1
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = "feather"
+except ImportError:
+    CACHE_FORMAT = "pickle"
+
+
+def _write_cache_file(df, path, fmt):
+    tmp_path = path + ".tmp"
+    if fmt == "feather":
+        df.reset_index(drop=True).to_feather(tmp_path)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)  # jamais de cache tronqué
+
+
+def _read_cache_file(path, fmt):
+    if fmt == "feather":
+        return pd.read_feather(path)
+    return pd.read_pickle(path)
+
+
+SAVE_PROGRESS_ROWS = 5000  # fréquence (en lignes) des notifications de progression
+
+
+def _write_workbook(df, path, progress=None):
+    # Écriture en flux (write_only) : les lignes ne sont pas gardées en mémoire par openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append([str(col) for col in df.columns])
+    columns = [df[col].astype(object).where(df[col].notna(), None).to_numpy(dtype=object) for col in df.columns]
+    total = len(df)
+    for done, row in enumerate(zip(*columns), start=1):
+        sheet.append([None if value == "" else value for value in row])
+        if progress is not None and done % SAVE_PROGRESS_ROWS == 0:
+            progress(done, total)
+    workbook.save(path)
+    if progress is not None:
+        progress(total, total)
+
+
+def _atomic_write(path, write):
+    # Fichier temporaire dans le même dossier puis os.replace : jamais de classeur tronqué
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".xlsx.tmp", dir=directory)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _block_values(values, dtype):
+    # Valeurs sans texte (annulation, effacement) dans une colonne numpy : converties dans son
+    # type (None -> NaN / NaT) comme le fait iat, sinon laissées telles quelles
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufmM" \
+            and not any(isinstance(value, str) for value in values):
+        try:
+            return np.asarray(values, dtype=dtype)
+        except (TypeError, ValueError):
+            pass
+    return values
+
+
+def apply_column_dtypes(df):
+    for column, convert in COLUMN_DTYPES.items():
+        if column in df.columns:
+            df[column] = convert(df[column])
+    return df
+
+
+def restore_column_types(df):
+    # Colonnes réécrites en tableaux object (fusion d'import) : mêmes types et mêmes valeurs
+    # manquantes qu'au chargement du fichier (entiers, flottants, texte ; None dans les colonnes object)
+    for column in df.columns:
+        if df[column].dtype != object:
+            continue
+        series = df[column] if column in COLUMN_DTYPES else df[column].infer_objects()
+        if series.dtype == object and series.hasnans:
+            series = series.where(series.notna(), None)
+        df[column] = series
+    return apply_column_dtypes(df)
+
+
+def _unmatched_rows(hashes, ids, saved_hashes, saved_counts):
+    # Lignes sans ligne sauvegardée de même empreinte : pour une empreinte présente n fois dans le
+    # classeur sauvegardé, seules les n lignes les plus anciennes (plus petits identifiants) sont couvertes
+    order = np.lexsort((ids, hashes))
+    sorted_hashes = hashes[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_hashes, sorted_hashes)
+    found = np.minimum(np.searchsorted(saved_hashes, sorted_hashes), max(len(saved_hashes) - 1, 0))
+    allowed = np.where(saved_hashes[found] == sorted_hashes, saved_counts[found], 0) if len(saved_hashes) \
+        else np.zeros(len(order), dtype=np.int64)
+    mask = np.empty(len(order), dtype=bool)
+    mask[order] = rank >= allowed
+    return mask
+
+
+def build_dataframe(headers, columns):
+    df = pd.DataFrame({header: pd.Series(values, dtype=object) for header, values in zip(headers, columns)},
+                      columns=headers)
+    df = df.infer_objects()
+    return apply_column_dtypes(df)
 
 
 class ExcelManager:
-    def __init__(self, filepath="tokens.xlsx"):
+    def __init__(self, filepath="tokens.xlsx", engine="auto", use_cache=True, use_recovery=True):
         self.filepath = filepath
+        self.engine = engine
+        self.use_cache = use_cache
+        self.use_recovery = use_recovery  # False : pas de journal de reprise (ligne de commande)
+        self._cache_thread = None
         self.workbook = None
         self.sheet = None
         self.headers = []
+        self._dirty_lock = threading.Lock()
+        self._save_executor = ThreadPoolExecutor(max_workers=1)  # une sauvegarde à la fois, dans l'ordre
+        self._import_executor = ThreadPoolExecutor(max_workers=1)  # imports en arrière-plan, voir import_table_async
+        self._pending_save = None
+        self.edit_count = 0  # incrémenté à chaque modification (voir dirty)
+        self.recovery = None  # journal de reprise après plantage, ouvert au premier chargement
+        self._replaying = False
+        self._checkpoint_count = 0  # edit_count au dernier point de reprise
+        self._synced_signature = None  # signature du xlsx quand df et le fichier concordaient
+        self._synced_data_version = 0  # data_version à ce moment (sinon : structure changée)
+        self.last_save_stats = {}
         self.dirty = False
+        self.dirty_cells = set()  # (ligne, colonne) modifiées depuis la dernière sauvegarde
         self.df = None
+        self.last_load_stats = {}
+        self.url_keys = UrlKeyExtractor()  # cache de parsing des URL, partagé entre imports
+        self.url_version = 0  # incrémenté à chaque modification de la colonne url
+        self.last_import_report = {}
+        self.key_index = TokenIndex()  # (contract_address, token_id) -> ligne, voir find()
+        self.search_index = SearchIndex()  # texte de recherche par ligne, voir search()
+        self.query_cache = ColumnParseCache()  # conversions par colonne, voir query()
+        self.data_version = 0  # incrémenté à chaque opération structurelle (lignes / colonnes)
+        self.column_versions = {}  # colonne -> nombre d'éditions de cellules
+        self._saved_frame = None  # état du classeur au dernier chargement / à la dernière sauvegarde
+        self._saved_hashes = ColumnHashCache()  # empreintes par colonne, voir changes_since_save()
+        self._current_hashes = ColumnHashCache()
+        self._diff_results = {}  # colonne -> résultat de la dernière comparaison (voir diff_frames)
+        self.row_hashes = RowHashes()  # empreinte par ligne, voir fingerprint()
+        self.locks = LockStore()  # cellules verrouillées (clé du token, colonne), voir load_locked_cells()
+        self._saved_fingerprint = None  # empreinte de _saved_frame, calculée à la demande
+        self._saved_rows = (None, None, None)  # (_saved_frame, génération de row_hashes, (empreintes, nombres))
+        self._modified = (None, None)  # (état, masque) de modified_rows()
+        self._inactive = (None, None)  # (nombres de la colonne actif, masque) de inactive_rows()
 
-    def load_excel(self):
+    def load_excel(self, profile_memory=False):
         print("Chargement du fichier...")
         if not os.path.exists(self.filepath):
             print(f"Fichier {self.filepath} non trouvé, création...")
@@ -25,25 +324,313 @@ class ExcelManager:
             sheet.append(["contract_address", "token_id"])  # clé minimale
             workbook.save(self.filepath)
 
-        self.workbook = openpyxl.load_workbook(self.filepath)
-        self.sheet = self.workbook.active
-        #self.df = pd.read_excel(self.filepath) equivalent panda non utilisé
+        engine = _default_engine() if self.engine == "auto" else self.engine
+        if engine == "calamine" and has_formulas(self.filepath):
+            # calamine ne lit que les valeurs calculées : les formules seraient perdues à la sauvegarde
+            print("ℹ️ Le classeur contient des formules : lecture avec openpyxl.")
+            engine = "openpyxl"
+        if profile_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
 
-        # Normalisation des en-têtes
-        self.headers = [
-            str(cell.value).strip().lower() for cell in self.sheet[1] if cell.value is not None
-        ]
+        signature = self._source_signature()
+        cached = self._load_cache(signature) if self.use_cache else None
+        if cached is not None:
+            # Cache binaire valide (même mtime/taille que le xlsx) : pas de parsing
+            engine = "cache"
+            self.df = cached
+            headers = [str(col) for col in cached.columns]
+        else:
+            # Colonnes lues directement en tableaux, sans dicts par ligne ni classeur complet
+            headers, columns = LOAD_ENGINES[engine](self.filepath)
+            self.df = build_dataframe(headers, columns)
+            if self.use_cache:
+                self._write_cache_async(self.df.copy(), signature)
+        self.headers = headers
+        self.workbook = None  # le classeur complet n'est rechargé que pour les anciennes API (voir _ensure_sheet)
+        self.sheet = None
+        self.dirty_cells.clear()
+        self.key_index.invalidate()  # reconstruit au premier find() / première édition indexée
+        self.search_index.invalidate()  # reconstruit à la première recherche
+        self.dirty = False
+        self._synced_signature = file_signature(self.filepath)
+        self._synced_data_version = self.data_version
+        self._saved_frame = self.df.drop(columns=["checked"], errors="ignore")  # copy-on-write : pas de copie
+        self._saved_fingerprint = None
+        self.row_hashes.invalidate()
+        recovered = self._open_recovery() if self.use_recovery else 0
 
-        # Création de self.df à partir de openpyxl
-        data = []
-        for row in self.sheet.iter_rows(min_row=2, values_only=True):
-            data.append(dict(zip(self.headers, row)))
-        self.df = pd.DataFrame(data)
+        elapsed = time.perf_counter() - start
+        self.last_load_stats = {"engine": engine, "rows": len(self.df), "seconds": elapsed, "recovered": recovered}
+        if profile_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.last_load_stats["peak_mb"] = peak / (1024 * 1024)
+
+        print(f"Fichier chargé avec {len(self.df)} lignes en {elapsed:.2f} s (moteur {engine})"
+              + (f", pic mémoire {self.last_load_stats['peak_mb']:.1f} Mo." if profile_memory else "."))
+
+    # --- Journal de reprise (écriture anticipée + points de reprise) ---
+
+    def _journal_path(self):
+        return self.filepath + ".journal"
+
+    def _checkpoint_path(self):
+        return self.filepath + ".autosave.pickle"
+
+    def _signature_of(self, kind):
+        path = self.filepath if kind == "xlsx" else self._checkpoint_path()
+        return file_signature(path) if os.path.exists(path) else None
+
+    def _base(self, kind):
+        return {"file": kind, "signature": self._signature_of(kind)}
+
+    def _remove_checkpoint(self):
+        if os.path.exists(self._checkpoint_path()):
+            os.remove(self._checkpoint_path())
+
+    def _open_recovery(self):
+        # Premier chargement : rejoue le journal laissé par une session interrompue.
+        # Rechargement dans la même session : les modifications non sauvegardées sont abandonnées.
+        recovered = 0
+        if self.recovery is None:
+            self.recovery = RecoveryJournal(self._journal_path(), config.JOURNAL_SYNC_INTERVAL)
+            recovered = self._recover()
+        else:
+            self.wait_for_save()
+        if not recovered:
+            self._remove_checkpoint()
+            self.recovery.start(self._base("xlsx"))
+        self._checkpoint_count = self.edit_count
+        return recovered
+
+    def _recover(self):
+        base, records = RecoveryJournal.read(self.recovery.path)
+        start_file, records = RecoveryJournal.replay_plan(base, records, self._signature_of)
+        if base is not None and start_file is None:
+            # Le fichier a changé depuis (autre outil, autre version) : journal mis de côté
+            os.replace(self.recovery.path, self.recovery.path + ".rejected")
+            print(f">>> ⚠️ Journal de reprise ne correspondant pas à {self.filepath}, "
+                  f"mis de côté dans {self.recovery.path}.rejected")
+            return 0
+        edits = [r for r in records if r.get("op") not in ("snapshot", "snapshot_failed")]
+        if not edits:
+            return 0
+
+        if start_file == "checkpoint":
+            self.df = pd.read_pickle(self._checkpoint_path())
+            self.data_version += 1  # le point de reprise peut différer du xlsx : pas de sauvegarde partielle
+        applied = self._replay(edits)
+        self.dirty = True
+        # Le journal repart de la même base, avec les modifications rejouées
+        self.recovery.start(self._base(start_file), edits[:applied])
+        print(f">>> ♻️ {applied} modification(s) non sauvegardée(s) récupérée(s) depuis le journal.")
+        return applied
+
+    def _replay(self, records):
+        applied = 0
+        self._replaying = True
+        try:
+            for record in records:
+                op = record["op"]
+                if op == "cell":
+                    self.set_cell(record["row"], record["column"], record["value"])
+                elif op == "cells":
+                    self.set_cells(record["rows"], [record["column"]] * len(record["rows"]), record["values"])
+                elif op == "insert":
+                    self.insert_rows(record["positions"], pd.DataFrame(record["rows"], columns=record["columns"]))
+                elif op == "delete":
+                    self.delete_rows(record["positions"])
+                elif op == "reorder":
+                    self.reorder_rows(record["order"])
+                elif op == "add_column":
+                    self.add_column(record["name"], record["position"], record.get("values"))
+                elif op == "delete_column":
+                    self.delete_column(record["name"])
+                elif op == "rename_column":
+                    self.rename_column(record["old"], record["new"])
+                elif op == "move_column":
+                    self.move_column(record["name"], record["position"])
+                else:
+                    # "replace" : table remplacée (import) sans point de reprise terminé
+                    print(">>> ⚠️ Reprise arrêtée avant un import non enregistré.")
+                    break
+                applied += 1
+        finally:
+            self._replaying = False
+        return applied
+
+    def _journaling(self):
+        return self.recovery is not None and not self._replaying
+
+    def _log(self, record):
+        if self._journaling():
+            self.recovery.append(record)
+
+    def checkpoint_async(self):
+        """Point de reprise : instantané binaire de df, le journal repart de lui. Future ou None."""
+        if self.recovery is None or self.df is None or self.edit_count == self._checkpoint_count:
+            return None
+        self._checkpoint_count = self.edit_count
+        snapshot = self.df.drop(columns=["checked"], errors="ignore")
+        position = self.recovery.mark_snapshot("checkpoint")
+        self._pending_save = self._save_executor.submit(self._run_checkpoint, snapshot, position)
+        return self._pending_save
+
+    def _run_checkpoint(self, snapshot, position):
+        path = self._checkpoint_path()
+        tmp_path = path + ".tmp"
+        try:
+            snapshot.to_pickle(tmp_path)
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            self.recovery.cancel_snapshot(position)
+            raise
+        self.recovery.rebase(self._base("checkpoint"), position)
+
+    def close_recovery(self, discard=False):
+        # Fermeture propre ; discard=True : rien à récupérer (sauvegardé ou abandonné volontairement)
+        self.wait_for_save()
+        if self.recovery is not None:
+            self.recovery.close(delete=discard)
+            if discard:
+                self._remove_checkpoint()
+            self.recovery = None
+
+    # --- Cache binaire (sidecar) ---
+
+    def _cache_paths(self):
+        base = self.filepath + ".cache"
+        return base + "." + CACHE_FORMAT, base + ".json"
+
+    def _source_signature(self):
+        stat = os.stat(self.filepath)
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "version": CACHE_VERSION}
+
+    def _load_cache(self, signature):
+        data_path, meta_path = self._cache_paths()
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if meta.get("source") != signature:
+                return None
+            return _read_cache_file(data_path, meta["format"])
+        except Exception:
+            return None  # cache absent, périmé ou illisible : on relit le xlsx
+
+    def _write_cache(self, df, signature, convert=False):
+        data_path, meta_path = self._cache_paths()
+        fmt = CACHE_FORMAT
+        try:
+            if convert:
+                # Instantané sauvegardé : mêmes types qu'après une relecture du xlsx
+                df = build_dataframe([str(col) for col in df.columns],
+                                     [df[col].to_numpy(dtype=object) for col in df.columns])
+            try:
+                _write_cache_file(df, data_path, fmt)
+            except Exception:
+                # Colonnes mixtes non supportées par Feather : repli sur pickle
+                fmt = "pickle"
+                data_path = self.filepath + ".cache.pickle"
+                _write_cache_file(df, data_path, fmt)
+            tmp_meta = meta_path + ".tmp"
+            with open(tmp_meta, "w") as f:
+                json.dump({"source": signature, "format": fmt}, f)
+            os.replace(tmp_meta, meta_path)
+        except Exception as e:
+            print(f">>> Cache binaire non écrit : {e}")
+
+    def _write_cache_async(self, df, signature, convert=False):
+        # Régénération en arrière-plan : le chargement et la sauvegarde n'attendent pas l'écriture du cache
+        self.wait_for_cache()
+        self._cache_thread = threading.Thread(target=self._write_cache, args=(df, signature, convert),
+                                              daemon=True)
+        self._cache_thread.start()
+
+    def wait_for_cache(self):
+        if self._cache_thread is not None:
+            self._cache_thread.join()
+            self._cache_thread = None
+
+    def locked_cells_path(self):
+        return os.path.join(os.path.dirname(self.filepath), "locked_cells.json")
+
+    def load_locked_cells(self):
+        """Verrous enregistrés à côté du classeur, chargés dans self.locks (retourné)."""
+        path = self.locked_cells_path()
+        self.locks.clear()
+        if self.df is None or not os.path.exists(path):
+            return self.locks
+        with open(path, "r", encoding="utf-8") as f:
+            loaded = json.load(f)
+        if isinstance(loaded, dict):
+            self.locks.load_json(loaded)
+            return self.locks
+        # Ancien format [[ligne df, colonne modèle], ...] : positions converties en clés, réécrit au format compact
+        columns = [col for col in self.df.columns if col != "checked"]
+        index = self._index()
+        cells = {}
+        for row, col in loaded:
+            if row < len(self.df) and col < len(columns):
+                key = index.key_at(row)
+                if key is not None:
+                    cells.setdefault(columns[col], set()).add(key)
+        for column, keys in cells.items():
+            self.locks.lock(column, keys)
+        print(f"🔐 {path} converti au format par clé ({len(self.locks)} verrou(s)).")
+        self.save_locked_cells()
+        return self.locks
+
+    def save_locked_cells(self):
+        _atomic_write(self.locked_cells_path(), self.locks.dump)
+
+    def _rows_version(self):
+        # Change quand les lignes de df ou leurs clés changent (positions des verrous à recalculer)
+        return (self.data_version,) + tuple(self.column_version(col) for col in INDEX_COLUMNS)
+
+    def lock_masks(self):
+        """{colonne: tableau booléen aligné sur df} des cellules verrouillées (mis en cache)."""
+        if self.df is None:
+            return {}
+        index = self._index()
+        return self.locks.masks(self.df, self._rows_version(), index.positions)
+
+    def is_locked(self, row, column):
+        mask = self.lock_masks().get(column)
+        return mask is not None and row < len(mask) and bool(mask[row])
 
-        print(f"Fichier chargé avec {len(self.df)} lignes.")
+    def set_locked(self, positions, columns, locked=True):
+        """Verrouille / déverrouille les cellules (positions[i], columns[i]) ; retourne le nombre
+        de lignes ignorées faute de clé (contract_address, token_id)."""
+        index = self._index()
+        by_column, skipped = {}, 0
+        for row, column in zip(positions, columns):
+            key = index.key_at(row)
+            if key is None:
+                skipped += 1
+                continue
+            by_column.setdefault(column, set()).add(key)
+        for column, keys in by_column.items():
+            if locked:
+                self.locks.lock(column, keys)
+            else:
+                self.locks.unlock(column, keys)
+        if by_column:
+            self.save_locked_cells()
+        return skipped
+
+    def _ensure_sheet(self):
+        # Classeur openpyxl complet, chargé à la demande pour les API cellule par cellule
+        if self.sheet is None:
+            self.workbook = openpyxl.load_workbook(self.filepath)
+            self.sheet = self.workbook.active
+        return self.sheet
         
 
     def get_all_tokens(self):
+        self._ensure_sheet()
         tokens = []
         for row in self.sheet.iter_rows(min_row=2, values_only=True):
             token = {self.headers[i]: row[i] for i in range(len(self.headers))}
@@ -55,7 +642,7 @@ class ExcelManager:
         if field not in self.headers:
             raise ValueError(f"Champ {field} introuvable.")
         col_idx = self.headers.index(field) + 1
-        self.sheet.cell(row=row_idx + 2, column=col_idx, value=value)
+        self._ensure_sheet().cell(row=row_idx + 2, column=col_idx, value=value)
         self.dirty = True
         self._refresh_df()
 
@@ -65,18 +652,403 @@ class ExcelManager:
             data.append(dict(zip(self.headers, row)))
         self.df = pd.DataFrame(data)
 
+    def set_cell(self, row, column, value):
+        # Écriture d'une seule cellule dans df (O(1)), suivie dans dirty_cells
+        if value == "":
+            value = None
+        pos = self.df.columns.get_loc(column)
+        if column in INDEX_COLUMNS:
+            self._index()  # doublons détectés dès la première édition d'une colonne clé
+        hashed = self.row_hashes.is_current(self.df)
+        old_value = self.df.iat[row, pos] if hashed else None
+        try:
+            self.df.iat[row, pos] = value
+        except (TypeError, ValueError):
+            # Colonne typée (float, str...) : on repasse en object pour accepter le texte saisi
+            self.df[column] = self.df[column].astype(object)
+            self.df.iat[row, pos] = value
+            self.row_hashes.invalidate()  # empreintes de la colonne à recalculer dans son nouveau type
+            hashed = False
+        if hashed:
+            self.row_hashes.update_cell(row, column, old_value, self.df.iat[row, pos])
+        self.dirty_cells.add((row, column))
+        self.dirty = True
+        if column == "url":
+            self.url_version += 1
+        self.column_versions[column] = self.column_versions.get(column, 0) + 1
+        self._log({"op": "cell", "row": int(row), "column": column, "value": value})
+        if self.search_index.is_current(self.df):
+            self.search_index.update(row, self.df)
+        if column in INDEX_COLUMNS and self.key_index.is_current(self.df):
+            key = None
+            if all(col in self.df.columns for col in INDEX_COLUMNS):
+                key = make_key(*(self.df.iat[row, self.df.columns.get_loc(col)] for col in INDEX_COLUMNS))
+            if self.key_index.update(row, key):
+                self._report_duplicates([key])
+
+    def set_cells(self, rows, columns, values):
+        """Écriture en bloc des cellules (rows[i], columns[i]) : une affectation vectorisée par
+        colonne (collage, effacement, annulation), même suivi que set_cell.
+
+        Les cellules dont le texte affiché ne change pas sont ignorées. Retourne
+        (lignes, colonnes, anciennes valeurs, valeurs stockées) des cellules écrites.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.asarray(columns, dtype=object)
+        values = np.asarray(values, dtype=object)
+        written = ([], [], [], [])
+        for column in pd.unique(columns):
+            pick = np.flatnonzero(columns == column)
+            self._set_column_cells(column, rows[pick], values[pick], written)
+        if not written[0]:
+            return [], [], [], []
+        self.dirty = True
+        return tuple(list(np.concatenate(part)) for part in written)
+
+    def _set_column_cells(self, column, rows, values, written):
+        # Une ligne écrite plusieurs fois : la dernière valeur l'emporte
+        rows, last = np.unique(rows[::-1], return_index=True)
+        values = values[::-1][last]
+        texts = _column_text(pd.Series(values, dtype=object)).to_numpy(dtype=object)
+        values[texts == ""] = None  # comme set_cell : cellule vide = None
+        pos = self.df.columns.get_loc(column)
+        old = self.df.iloc[rows, pos]
+        changed = _column_text(old).to_numpy(dtype=object) != texts
+        rows, values, old = rows[changed], values[changed], old.to_numpy(dtype=object)[changed]
+        if not len(rows):
+            return
+        if column in INDEX_COLUMNS:
+            self._index()  # doublons détectés dès la première édition d'une colonne clé
+        hashed = self.row_hashes.is_current(self.df)
+        try:
+            self.df.iloc[rows, pos] = _block_values(values, self.df[column].dtype)
+        except (TypeError, ValueError):
+            # Colonne typée (float, str...) : on repasse en object pour accepter le texte collé
+            self.df[column] = self.df[column].astype(object)
+            self.df.iloc[rows, pos] = values
+            self.row_hashes.invalidate()
+            hashed = False
+        stored = self.df.iloc[rows, pos].to_numpy(dtype=object)
+        if hashed:
+            self.row_hashes.update_cells(rows, column, old, stored)
+        self.dirty_cells.update(zip(rows.tolist(), [column] * len(rows)))
+        if column == "url":
+            self.url_version += 1
+        self.column_versions[column] = self.column_versions.get(column, 0) + 1
+        self._log({"op": "cells", "column": column, "rows": rows.tolist(), "values": values.tolist()})
+        if self.search_index.is_current(self.df):
+            self.search_index.update_rows(rows, self.df)
+        if column in INDEX_COLUMNS and self.key_index.is_current(self.df):
+            keys = frame_keys(self.df.iloc[rows])
+            duplicates = [key for row, key in zip(rows.tolist(), keys) if self.key_index.update(row, key)]
+            if duplicates:
+                self._report_duplicates(duplicates)
+        for part, items in zip(written, (rows, np.full(len(rows), column, dtype=object), old, stored)):
+            part.append(items)
+
+    def fingerprint(self):
+        """Empreinte du contenu de df (hors cases cochées), tenue à jour à chaque modification.
+
+        Deux tableaux de même contenu ont la même empreinte : modifications annulées,
+        comparaison avec une autre copie du classeur, détection d'un changement externe.
+        """
+        if self.df is None:
+            return None
+        if not self.row_hashes.is_current(self.df):
+            self.row_hashes.rebuild(self.df)
+        return self.row_hashes.fingerprint()
+
+    def saved_fingerprint(self):
+        # Empreinte du classeur tel que chargé / sauvegardé, avec les types actuels des colonnes de df :
+        # une colonne passée en object par une saisie garde la même empreinte à contenu égal
+        if self._saved_frame is None or self.df is None:
+            return None
+        if not self.row_hashes.is_current(self.df):
+            self.row_hashes.rebuild(self.df)
+        generation = self.row_hashes.generation
+        if self._saved_fingerprint is None or self._saved_fingerprint[0] != generation:
+            self._saved_fingerprint = (generation, self.row_hashes.fingerprint_of(self._saved_frame))
+        return self._saved_fingerprint[1]
+
+    def changes_since_save(self):
+        """Différences entre df et le classeur tel que chargé / sauvegardé (FrameDiff, voir diff_engine).
+
+        Les colonnes non modifiées depuis sont écartées par leur empreinte, gardée
+        entre deux appels : seules les colonnes éditées entre-temps sont relues.
+        """
+        if self.df is None or self._saved_frame is None:
+            return FrameDiff()
+        saved = self._saved_frame
+        return diff_frames(saved, self.df,
+                           before_hash=lambda column: self._saved_hashes.get(saved, column, 0),
+                           after_hash=lambda column: self._current_hashes.get(self.df, column,
+                                                                              self.column_version(column)),
+                           results=self._diff_results)
+
+    # --- Index (contract_address, token_id) ---
+
+    def modified_rows(self):
+        """Masque booléen (une valeur par ligne de df) des lignes modifiées ou ajoutées depuis la
+        dernière sauvegarde, mis en cache. Chaque ligne sauvegardée couvre une ligne de df de même
+        empreinte, la plus ancienne (row_ids) : une copie d'une ligne sauvegardée est marquée,
+        un tri ou une suppression (même annulée) ne marque aucune ligne."""
+        if self.df is None:
+            return np.zeros(0, dtype=bool)
+        if not self.dirty or self._saved_frame is None:
+            state = ("propre", len(self.df))
+        else:
+            if not self.row_hashes.is_current(self.df):
+                self.row_hashes.rebuild(self.df)
+            saved, generation, saved_hashes = self._saved_rows
+            if saved is not self._saved_frame or generation != self.row_hashes.generation:
+                # Classeur sauvegardé haché avec les types actuels de df : mêmes empreintes si même texte
+                saved, generation = self._saved_frame, self.row_hashes.generation
+                saved_hashes = np.unique(self.row_hashes.hashes_of(saved), return_counts=True)
+                self._saved_rows = (saved, generation, saved_hashes)
+            state = (id(saved), generation, self.row_hashes.version)
+        if self._modified[0] != state:
+            if state[0] == "propre":
+                mask = np.zeros(len(self.df), dtype=bool)
+            else:
+                mask = _unmatched_rows(self.row_hashes.row_hashes(), self.row_hashes.row_ids(), *saved_hashes)
+            self._modified = (state, mask)
+        return self._modified[1]
+
+    def is_modified(self, row):
+        mask = self.modified_rows()
+        return row < len(mask) and bool(mask[row])
+
+    def inactive_rows(self):
+        """Masque des lignes désactivées (actif = 0), None sans colonne actif."""
+        if self.df is None or "actif" not in self.df.columns:
+            return None
+        values = self.query_cache.get(self.df, "actif", "number", self.column_version("actif"))
+        if self._inactive[0] is not values:
+            self._inactive = (values, values == 0)
+        return self._inactive[1]
+
+    def is_inactive(self, row):
+        mask = self.inactive_rows()
+        return mask is not None and row < len(mask) and bool(mask[row])
+
+    def _index(self):
+        # Reconstruit l'index si df a été remplacé sans passer par les opérations ci-dessous
+        if not self.key_index.is_current(self.df):
+            self.key_index.rebuild(self.df)
+        return self.key_index
+
+    def find(self, key):
+        """Position de la ligne (contract_address, token_id), ou None."""
+        if self.df is None:
+            return None
+        return self._index().find(make_key(*key))
+
+    def find_many(self, keys):
+        """Positions des clés (contract_address, token_id) ; -1 pour les clés absentes."""
+        if self.df is None:
+            return np.full(len(keys), -1, dtype=np.int64)
+        return self._index().find_many([make_key(*key) for key in keys])
+
+    def duplicate_keys(self):
+        """Clés présentes sur plusieurs lignes -> positions de ces lignes."""
+        if self.df is None:
+            return {}
+        return self._index().duplicates()
+
+    def search(self, text):
+        """Positions (triées) des lignes dont une cellule contient text."""
+        if self.df is None:
+            return np.empty(0, dtype=int)
+        if not self.search_index.is_current(self.df):
+            self.search_index.rebuild(self.df)
+        return self.search_index.search(text)
+
+    def column_version(self, column):
+        return (self.data_version, self.column_versions.get(column, 0))
+
+    def query(self, text):
+        """Positions (triées) des lignes correspondant à la requête.
+
+        Filtres par colonne séparés par des espaces : chain:eth (contient),
+        qtt_owned>3, last_scrape_date<2026-01-01, collection="x y", != >= <=.
+        Le reste de la requête est cherché dans toutes les colonnes (search).
+        """
+        if self.df is None:
+            return np.empty(0, dtype=int)
+        filters, words = parse_query(text, [col for col in self.df.columns if col != "checked"])
+        if not filters:
+            return self.search(words)  # sans filtre complet ("chain:" en cours de frappe) : texte libre seul
+        positions = np.flatnonzero(self.query_cache.mask(self.df, filters, self.column_version))
+        if words:
+            positions = np.intersect1d(positions, self.search(words), assume_unique=True)
+        return positions
+
+    def _report_duplicates(self, keys):
+        # Une entrée par clé, avec le nombre de lignes concernées (collage ou import de lignes répétées)
+        counts = pd.Series(keys, dtype=object).value_counts(sort=True)
+        examples = ", ".join(f"{ca}/{tid}" + (f" (x{count})" if count > 1 else "")
+                             for (ca, tid), count in list(counts.items())[:5])
+        print(f">>> ⚠️ {len(counts)} clé(s) en doublon (contract_address, token_id) : {examples}"
+              + ("..." if len(counts) > 5 else ""))
+
+    # --- Opérations structurelles (utilisées par la vue et le journal d'annulation) ---
+
+    def _sync_headers(self, *names):
+        # Opération sur les colonnes : métadonnées seulement, les index par ligne (recherche,
+        # empreintes) sont tenus à jour par l'appelant
+        self.headers = [col for col in self.df.columns if col != "checked"]
+        self.dirty = True
+        self.data_version += 1  # disposition du classeur changée : pas de sauvegarde partielle
+        if "url" in names:
+            self.url_version += 1
+        if any(name in INDEX_COLUMNS for name in names):
+            self.key_index.invalidate()
+
+    def insert_rows(self, positions, frame):
+        # positions = positions finales (triées) des lignes de frame après insertion
+        positions = np.asarray(positions, dtype=int)
+        n = len(self.df) + len(positions)
+        inserted = np.zeros(n, dtype=bool)
+        inserted[positions] = True
+        order = np.empty(n, dtype=int)
+        order[~inserted] = np.arange(len(self.df))
+        order[inserted] = len(self.df) + np.arange(len(positions))
+        combined = pd.concat([self.df, frame.reindex(columns=self.df.columns)], ignore_index=True)
+        if self._journaling():
+            rows = frame.drop(columns=["checked"], errors="ignore")
+            self._log({"op": "insert", "positions": [int(p) for p in positions],
+                       "columns": [str(col) for col in rows.columns],
+                       "rows": rows.astype(object).where(rows.notna(), None).values.tolist()})
+        index = self._index()
+        search_current = self.search_index.is_current(self.df)
+        if not self.row_hashes.is_current(self.df):
+            # Identifiants des lignes existantes fixés avant l'insertion : une copie reste distincte
+            # de son original dans modified_rows()
+            self.row_hashes.rebuild(self.df)
+        self.df = combined.take(order).reset_index(drop=True)
+        self.dirty = True
+        self.data_version += 1
+        if search_current:
+            self.search_index.insert(positions, frame, self.df)
+        if self.row_hashes.same_dtypes(self.df):
+            self.row_hashes.insert_rows(positions, self.df)
+        duplicates = index.insert(positions, frame, self.df)
+        if duplicates:
+            self._report_duplicates(duplicates)
+
+    def delete_rows(self, positions):
+        removed = self.df.iloc[list(positions)].reset_index(drop=True)
+        self._log({"op": "delete", "positions": [int(p) for p in positions]})
+        index_current = self.key_index.is_current(self.df)
+        search_current = self.search_index.is_current(self.df)
+        hashes_current = self.row_hashes.is_current(self.df)
+        self.df = self.df.drop(index=self.df.index[list(positions)]).reset_index(drop=True)
+        self.dirty = True
+        self.data_version += 1
+        if index_current:
+            self.key_index.delete(positions, self.df)
+        if search_current:
+            self.search_index.delete(positions, self.df)
+        if hashes_current:
+            self.row_hashes.delete_rows(positions, self.df)
+        return removed
+
+    def reorder_rows(self, order):
+        self._log({"op": "reorder", "order": [int(i) for i in order]})
+        index_current = self.key_index.is_current(self.df)
+        search_current = self.search_index.is_current(self.df)
+        hashes_current = self.row_hashes.is_current(self.df)
+        self.df = self.df.take(order).reset_index(drop=True)
+        self.dirty = True
+        self.data_version += 1
+        if index_current:
+            self.key_index.reorder(order, self.df)
+        if search_current:
+            self.search_index.reorder(order, self.df)
+        if hashes_current:
+            self.row_hashes.reorder(order, self.df)
+
+    def _check_column_name(self, name, renamed=None):
+        # Les en-têtes sont relus sans espaces et en minuscules : "Chain" écraserait "chain" au rechargement
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError("Le nom de colonne ne peut pas être vide.")
+        taken = {str(col).strip().lower() for col in self.df.columns if col != renamed}
+        if name.strip().lower() in taken:
+            raise ValueError(f"La colonne « {name} » existe déjà.")
+
+    def add_column(self, name, position=None, values=None, locks=None):
+        # locks : clés verrouillées de la colonne (suppression annulée, voir delete_column)
+        self._check_column_name(name)
+        if position is None or position > len(self.df.columns):
+            position = len(self.df.columns)
+        hashes_current = self.row_hashes.is_current(self.df)
+        self.df.insert(position, name, values if values is not None else None)
+        if self._journaling():
+            logged = None if values is None else pd.Series(values).astype(object).where(pd.Series(values).notna(), None).tolist()
+            self._log({"op": "add_column", "name": name, "position": int(position), "values": logged})
+        if values is not None:
+            self.search_index.invalidate()  # colonne vide : texte de recherche inchangé
+        if hashes_current:
+            self.row_hashes.add_column(name, self.df)
+        if locks:
+            self.locks.lock(name, locks)
+            self.save_locked_cells()
+        self._sync_headers(name)
+
+    def delete_column(self, name):
+        """Supprime la colonne name ; retourne (position, valeurs, clés verrouillées) pour add_column."""
+        position = self.df.columns.get_loc(name)
+        hashes_current = self.row_hashes.is_current(self.df)
+        values = self.df.pop(name)
+        self._log({"op": "delete_column", "name": name})
+        self.search_index.invalidate()  # le texte de recherche contient encore la colonne
+        if hashes_current:
+            self.row_hashes.delete_column(name, values, self.df)
+        # Verrous retirés avec la colonne : une colonne recréée sous ce nom part sans verrou
+        # (à la reprise, le fichier des verrous est déjà à jour : rien à retirer)
+        locks = set() if self._replaying else self.locks.drop_column(name)
+        if locks:
+            self.save_locked_cells()
+        self._sync_headers(name)
+        return position, values, locks
+
+    def rename_column(self, old_name, new_name):
+        if new_name == old_name:
+            return
+        self._check_column_name(new_name, renamed=old_name)
+        self.df.rename(columns={old_name: new_name}, inplace=True)
+        if old_name in self.locks.columns() and not self._replaying:
+            self.locks.rename_column(old_name, new_name)
+            self.save_locked_cells()  # fichier des verrous tenu à jour, comme pour set_locked
+        self._log({"op": "rename_column", "old": old_name, "new": new_name})
+        if self.row_hashes.is_current(self.df):
+            self.row_hashes.rename_column(old_name, new_name, self.df)
+        self._sync_headers(old_name, new_name)
+
+    def move_column(self, name, position):
+        """Déplace la colonne name à la position position de df, sans copier ses valeurs ;
+        retourne son ancienne position."""
+        old_position = self.df.columns.get_loc(name)
+        self.df.insert(position, name, self.df.pop(name))
+        self._log({"op": "move_column", "name": name, "position": int(position)})
+        if self.row_hashes.is_current(self.df):
+            self.row_hashes.move_column(self.df)
+        self._sync_headers(name)
+        return old_position
+
     def update_last_scraped(self, row_idx):
         if "last_scraped" not in self.headers:
             raise ValueError("Champ 'last_scraped' non trouvé.")
         col_idx = self.headers.index("last_scraped") + 1
         today = datetime.now().strftime("%Y-%m-%d")
-        self.sheet.cell(row=row_idx + 2, column=col_idx, value=today)
+        self._ensure_sheet().cell(row=row_idx + 2, column=col_idx, value=today)
         self.dirty = True
 
     def update_from_table(self, table_widget):
         self.headers = [table_widget.horizontalHeaderItem(col).text() for col in range(table_widget.columnCount())]
     
         # Efface la feuille existante
+        self._ensure_sheet()
         self.sheet.delete_cols(1, self.sheet.max_column)
         self.sheet.delete_rows(1, self.sheet.max_row)
 
@@ -92,82 +1064,306 @@ class ExcelManager:
                 self.sheet.cell(row=row+2, column=col+1, value=value)
         self.dirty = True
 
-    def save_excel(self):
-        df_to_save = self.df.copy()
-        df_to_save = df_to_save.fillna("")
-        
-        # Supprime la colonne 'checked' si elle existe
-        if "checked" in df_to_save.columns:
-            df_to_save.drop(columns=["checked"], inplace=True)
+    def replace_table(self, df):
+        # Remplacement complet de df (import, annulation d'un import) : trop gros pour le
+        # journal, on force un point de reprise
+        self.df = df
+        self.dirty = True
+        self.data_version += 1
+        self._log({"op": "replace"})
+        self.checkpoint_async()
 
-        df_to_save.to_excel(self.filepath, index=False)
-        print(f"Modifications sauvegardées dans {self.filepath}.")
-        self.dirty = False
+    # --- Sauvegarde ---
+
+    def _begin_save(self):
+        # Instantané sans copie : avec le copy-on-write de pandas, les éditions
+        # suivantes de self.df ne modifient pas snapshot
+        snapshot = self.df.drop(columns=["checked"], errors="ignore")
+        with self._dirty_lock:
+            edit_count = self.edit_count
+            saved_cells, self.dirty_cells = self.dirty_cells, set()
+            # Sauvegarde partielle possible si seules des cellules ont changé depuis la
+            # dernière synchronisation avec le fichier (ni lignes, ni colonnes, ni import)
+            structure = (self.data_version, self._synced_data_version, self._synced_signature)
+        fingerprint = self.fingerprint()  # O(1) hors reconstruction, voir RowHashes
+        structure += (fingerprint, fingerprint == self.saved_fingerprint(), self.row_hashes.generation)
+        position = self.recovery.mark_snapshot("xlsx") if self.recovery is not None else None
+        return snapshot, edit_count, saved_cells, position, structure
+
+    def _patch_cells(self, snapshot, saved_cells, structure):
+        # Cellules à réécrire {(ligne Excel, colonne Excel): valeur}, ou None si écriture complète
+        data_version, synced_version, synced_signature, _, unchanged, _ = structure
+        if synced_signature is None or not os.path.exists(self.filepath):
+            return None
+        if file_signature(self.filepath) != synced_signature:
+            return None  # fichier modifié par ailleurs
+        if unchanged:
+            return {}  # même contenu que le fichier (modifications annulées) : rien à écrire
+        if data_version != synced_version:
+            return None
+        if not saved_cells:
+            return {}
+        try:
+            header = read_header(self.filepath)
+        except Exception:
+            return None
+        if list(header) != [str(col) for col in snapshot.columns]:
+            return None
+        cells = {}
+        for row, column in saved_cells:
+            if column not in snapshot.columns or row >= len(snapshot):
+                return None
+            cells[(row + 2, header[str(column)])] = snapshot.iat[row, snapshot.columns.get_loc(column)]
+        return cells
+
+    def _write_snapshot(self, snapshot, saved_cells, structure, progress=None):
+        # Chemin le plus court : correction des seules cellules modifiées, sinon écriture complète en flux
+        cells = self._patch_cells(snapshot, saved_cells, structure)
+        if cells is not None:
+            if not cells:
+                return "aucun changement", 0
+            try:
+                _atomic_write(self.filepath, lambda tmp_path: patch_workbook(self.filepath, tmp_path, cells))
+                if progress is not None:
+                    progress(len(cells), len(cells))
+                return "partielle", len(cells)
+            except PatchError as e:
+                print(f">>> Sauvegarde partielle impossible ({e}), écriture complète.")
+        _atomic_write(self.filepath, lambda tmp_path: _write_workbook(snapshot, tmp_path, progress))
+        return "complète", len(snapshot)
+
+    def _run_save(self, snapshot, edit_count, saved_cells, position, structure, progress=None):
+        start = time.perf_counter()
+        try:
+            mode, count = self._write_snapshot(snapshot, saved_cells, structure, progress)
+        except BaseException:
+            with self._dirty_lock:
+                self.dirty_cells |= saved_cells  # rien n'a été écrit : tout reste à sauvegarder
+            if position is not None:
+                self.recovery.cancel_snapshot(position)
+            raise
+        if position is not None:
+            # Le journal repart du classeur sauvegardé, le point de reprise est périmé
+            self.recovery.rebase(self._base("xlsx"), position)
+            self._remove_checkpoint()
+        with self._dirty_lock:
+            if self.edit_count == edit_count:
+                self._dirty = False  # sinon : modifié pendant l'écriture, reste à sauvegarder
+            # Le fichier correspond maintenant à l'instantané
+            self._synced_signature = file_signature(self.filepath)
+            self._synced_data_version = structure[0]
+            self._saved_frame = snapshot
+            self._saved_fingerprint = (structure[5], structure[3])
+        elapsed = time.perf_counter() - start
+        self.last_save_stats = {"mode": mode, "count": count, "seconds": elapsed}
+        unit = "cellule(s)" if mode == "partielle" else "ligne(s)"
+        print(f"Modifications sauvegardées dans {self.filepath} en {elapsed:.2f} s "
+              f"(sauvegarde {mode}, {count} {unit}).")
+        if mode == "aucun changement":
+            return
+
+        # Le xlsx a changé : on régénère le cache à partir des données sauvegardées (instantané
+        # copy-on-write, non modifié par les éditions suivantes)
+        if self.use_cache:
+            self._write_cache_async(snapshot, self._source_signature(), convert=True)
+
+    def save_excel(self, progress=None):
+        self.wait_for_save()
+        self._run_save(*self._begin_save(), progress)
+
+    def save_excel_async(self, progress=None):
+        """Sauvegarde dans un thread : retourne un Future, df reste modifiable pendant l'écriture.
+
+        progress(lignes écrites, total) est appelé depuis le thread de sauvegarde.
+        """
+        self._pending_save = self._save_executor.submit(self._run_save, *self._begin_save(), progress)
+        return self._pending_save
+
+    def is_saving(self):
+        return self._pending_save is not None and not self._pending_save.done()
+
+    def wait_for_save(self):
+        if self._pending_save is not None:
+            try:
+                self._pending_save.result()
+            except Exception:
+                pass  # l'erreur est remontée à l'appelant de save_excel_async
+            self._pending_save = None
 
 
     def is_dirty(self):
-        return self.dirty
+        # Modifié, et contenu différent du classeur sauvegardé (modifications annulées : rien à sauvegarder)
+        if not self.dirty:
+            return False
+        return self.df is None or self._saved_frame is None or self.fingerprint() != self.saved_fingerprint()
+
+    def is_file_modified(self):
+        """Vrai si le xlsx a changé sur le disque depuis le dernier chargement / la dernière sauvegarde."""
+        if self._synced_signature is None or not os.path.exists(self.filepath):
+            return self._synced_signature is not None
+        return file_signature(self.filepath) != self._synced_signature
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+    @dirty.setter
+    def dirty(self, value):
+        # edit_count permet à une sauvegarde en arrière-plan de savoir si df a changé pendant l'écriture
+        with self._dirty_lock:
+            if value:
+                self.edit_count += 1
+            self._dirty = bool(value)
     
     def get_all_data(self):
         if self.df is None:
             raise ValueError("Aucune donnée en mémoire.")
         return self.df.fillna("").to_dict(orient="records")
 
-    def import_table(self, tnew: pd.DataFrame):
-        print(">>> Colonnes de newtokens.xlsx :", list(tnew.columns))
+    def import_table(self, tnew, locked_cells=None, progress=None):
+        """Fusionne de nouveaux tokens dans df (prepare_import puis publish_import).
 
+        tnew : un DataFrame, ou un itérable de lots (voir import_sources.ChunkedSource)
+        fusionnés l'un après l'autre : seul le lot en cours est en mémoire.
+        progress(lignes lues, total estimé ou None) est appelé après chaque lot.
+        """
         if self.df is None:
             raise ValueError("Aucune table de référence chargée.")
 
         try:
-            def clean_keys(df):
-                df = df.copy()
-
-                def extract_from_url(url):
-                    try:
-                        parts = url.split('/')
-                        chain = parts[4]
-                        contract_address = parts[5]
-                        token_id = str(int(float(parts[6])))  # standardisation du token_id
-                        return chain, contract_address, token_id
-                    except Exception:
-                        return None, None, None
-
-                for idx, row in df.iterrows():
-                    url = row.get("url")
-                    chain, contract_address, token_id = extract_from_url(str(url)) if pd.notna(url) else (None, None, None)
-                    if contract_address:
-                        df.at[idx, "contract_address"] = contract_address
-                    if token_id:
-                        df.at[idx, "token_id"] = token_id
-                    if chain:
-                        df.at[idx, "chain"] = chain
+            self.publish_import(self.prepare_import(tnew, locked_cells, progress))
+        except Exception as e:
+            print(">>> Erreur dans import_table :", e)
 
+    def import_table_async(self, tnew, locked_cells=None, progress=None, cancelled=None):
+        """prepare_import dans un thread : Future du résultat, à publier par publish_import()
+        depuis le thread de l'interface. cancelled : threading.Event vérifié entre deux lots."""
+        if self.df is None:
+            raise ValueError("Aucune table de référence chargée.")
+        # État de départ relevé ici (thread de l'interface), pas au démarrage du thread
+        return self._import_executor.submit(self._prepare_import, self.df, self.edit_count,
+                                            tnew, self._import_locks(locked_cells), progress, cancelled)
+
+    def import_files(self, paths, locked_cells=None, workers=None, archive=True):
+        """Import groupé de plusieurs fichiers (dossier de dépôt) en une seule fusion, puis rangement."""
+        if self.df is None:
+            raise ValueError("Aucune table de référence chargée.")
+        prepared = self._prepare_files(self.df, self.edit_count, paths, self._import_locks(locked_cells),
+                                       None, None, workers)
+        self.publish_import(prepared)
+        if archive:
+            drop_folder.archive(prepared["files"], drop_folder.IMPORTED_DIR)
+        return prepared["report"]
+
+    def import_files_async(self, paths, locked_cells=None, progress=None, cancelled=None, workers=None):
+        # Comme import_table_async ; les fichiers lus sont à ranger après publish_import (prepared["files"])
+        if self.df is None:
+            raise ValueError("Aucune table de référence chargée.")
+        return self._import_executor.submit(self._prepare_files, self.df, self.edit_count,
+                                            paths, self._import_locks(locked_cells), progress, cancelled, workers)
+
+    def _import_locks(self, locked_cells):
+        # Verrous (LockStore) -> masques alignés sur df, calculés dans le thread appelant :
+        # le thread d'import ne lit ni l'index ni les verrous
+        if not locked_cells or self.df is None:
+            return {}
+        return locked_cells.masks(self.df, self._rows_version(), self._index().positions)
+
+    def _prepare_files(self, base, edit_count, paths, locked, progress, cancelled, workers):
+        # Lecture en parallèle (processus), dédoublonnage par clé, puis une seule fusion avec df
+        started = time.perf_counter()
+        tnew, url_keys, read, failed = drop_folder.read_files(paths, workers, progress)
+        drop_folder.archive([path for path, _ in failed], drop_folder.FAILED_DIR)
+        if tnew is None:
+            raise ValueError("Aucun fichier lisible : " + "; ".join(
+                f"{os.path.basename(path)} ({message})" for path, message in failed))
+        check_cancelled(cancelled)
+        print(f"📂 {len(read)} fichier(s) lus en {time.perf_counter() - started:.2f} s → "
+              f"{len(tnew)} tokens distincts à fusionner")
+        prepared = self._prepare_import(base, edit_count, tnew, locked, None, cancelled, url_keys)
+        prepared["files"] = read
+        prepared["report"].update(files=len(read), failed=[path for path, _ in failed],
+                                  seconds=time.perf_counter() - started)
+        return prepared
+
+    def prepare_import(self, tnew, locked_cells=None, progress=None, cancelled=None):
+        return self._prepare_import(self.df, self.edit_count, tnew, self._import_locks(locked_cells),
+                                    progress, cancelled)
+
+    def _prepare_import(self, base, edit_count, tnew, locked=None, progress=None, cancelled=None,
+                        url_keys=None):
+        # locked : {colonne: tableau booléen aligné sur base} (voir _import_locks)
+        # url_keys : (clés, lignes invalides) de tnew déjà extraites de l'URL (dossier de dépôt)
+        # Étapes lecture -> clés (thread de lecture) -> fusion (thread appelant) sur une copie
+        # de base : df n'est pas modifié, la publication est faite par publish_import
+        chunks = [tnew] if isinstance(tnew, pd.DataFrame) else tnew
+        source = tnew.name if isinstance(tnew, ChunkedSource) else "newtokens.xlsx"  # df.name : colonne "name"
+
+        def clean_keys(df, keys):
+            df = df.copy()
+            if keys is None:
                 return df
 
-            def get_key(df):
-                return df["contract_address"].astype(str) + "_" + df["token_id"].astype(str)
+            # Clés extraites de l'URL (parsing mis en cache par URL distincte)
+            for col in ["contract_address", "token_id", "chain"]:
+                found = keys[col].notna()
+                if not found.any():
+                    continue
+                if col not in df.columns:
+                    df[col] = None
+                values = df[col].to_numpy(dtype=object, copy=True)
+                values[found.to_numpy()] = keys.loc[found, col].to_numpy(dtype=object)
+                df[col] = values
+            return df
+
+        def get_key(df):
+            return df["contract_address"].astype(str) + "_" + df["token_id"].astype(str)
 
-            # Nettoyage et normalisation
-            t1 = clean_keys(self.df)
-            tnew = clean_keys(tnew)
+        def parse_keys(tnew):
+            # Étape "clés", exécutée dans le thread de lecture pendant la fusion du lot précédent
+            tnew_url_keys = tnew_invalid = None
+            if "url" in tnew.columns:
+                tnew_url_keys, tnew_invalid = url_keys if url_keys is not None \
+                    else self.url_keys.extract(tnew["url"])
+                if len(tnew_invalid):
+                    examples = ", ".join(str(i) for i in list(tnew_invalid[:10]))
+                    print(f">>> {len(tnew_invalid)} URL inexploitable(s) dans le fichier importé (lignes {examples}...)")
+            tnew = clean_keys(tnew, tnew_url_keys)
 
             for col in ["✔", "checked", "Unnamed: 0", "Unnamed: 1", "Unnamed: 2",]:
                 if col in tnew.columns:
                     tnew = tnew.drop(columns=[col])
-                if col in self.df.columns:
-                    self.df = self.df.drop(columns=[col])
-            for col in ["✔"]:
-                if col in t1.columns:
-                    t1 = t1.drop(columns=[col])
+            return tnew, tnew_url_keys, tnew_invalid
+
+        # Nettoyage et normalisation : les clés de la table existante ne sont
+        # recalculées que si ses URL ont changé depuis le dernier import
+        t1_url_keys = t1_invalid = None
+        if "url" in base.columns:
+            t1_url_keys, t1_invalid = self.url_keys.extract_table(base, self.url_version)
+        t1 = clean_keys(base, t1_url_keys)
+        for col in ["✔", "checked"]:
+            if col in t1.columns:
+                t1 = t1.drop(columns=[col])
 
-            # Supprimer toute colonne "checked" de tnew (ne doit pas être importée)
-            if "checked" in tnew.columns:
-                tnew = tnew.drop(columns=["checked"])
+        locked = locked or {}
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-            # Clés d'identification
-            t1_keys = get_key(t1)
-            tnew_keys = get_key(tnew)
+        # Clé -> position dans t1, complétée par les tokens ajoutés par chaque lot (coût par lot
+        # proportionnel au lot, pas à la table)
+        t1_positions = None
+        updated = added = read = 0
+        unparsed_rows = []
+        # Clés des lignes de la table finale, connues sans reparser (None si un lot n'a pas d'url)
+        result_keys = [t1_url_keys[KEY_COLUMNS]] if t1_url_keys is not None else None
+        result_invalid = [np.asarray(t1_invalid, dtype=int)] if t1_url_keys is not None else None
+        started = chunk_started = time.perf_counter()
+
+        for number, (tnew, tnew_url_keys, tnew_invalid) in enumerate(
+                read_ahead(chunks, parse_keys, cancelled), start=1):
+            if number == 1:
+                print(f">>> Colonnes de {source} :", list(tnew.columns))
+            if tnew_invalid is not None:
+                unparsed_rows.extend(tnew_invalid)
 
             # Harmonise les colonnes entre t1 et tnew
             for col in tnew.columns:
@@ -176,42 +1372,96 @@ class ExcelManager:
             for col in t1.columns:
                 if col not in tnew.columns:
                     tnew[col] = None
+            if "last_scrape_date" not in t1.columns:
+                t1["last_scrape_date"] = None
+                tnew["last_scrape_date"] = None
 
-            # Index rapide pour mise à jour
-            t1_index = {key: i for i, key in enumerate(t1_keys)}
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            for idx, row in tnew.iterrows():
-                key = f"{row['contract_address']}_{row['token_id']}"
-
-                if key in t1_index:
-                    # Mise à jour : champs non vides + non verrouillés
-                    i = t1_index[key]
-                    for col in tnew.columns:
-                        if pd.notna(row[col]) and row[col] != "":
-                            try:
-                                col_index = self.df.columns.get_loc(col)
-                            except KeyError:
-                                continue  # colonne introuvable (sécurité)
-
-                            # Vérification du verrou (si la table a accès à locked_cells via self.table)
-                            if hasattr(self, "table") and hasattr(self.table, "locked_cells"):
-                                if (i, col_index) in self.table.locked_cells:
-                                    continue
-                            t1.at[i, col] = row[col]
-
-                    t1.at[i, "last_scrape_date"] = now
-                else:
-                    # Nouveau token → ajout
-                    new_row = {col: row.get(col) if pd.notna(row.get(col)) else None for col in t1.columns}
-                    new_row["last_scrape_date"] = now
-                    new_row_df = pd.DataFrame([new_row], columns=t1.columns)
-                    t1 = pd.concat([t1, new_row_df], ignore_index=True)
+            # Jointure unique sur la clé (contract_address, token_id) : position dans t1 ou -1
+            if t1_positions is None:
+                t1_positions = dict(zip(get_key(t1).to_numpy(), range(len(t1))))  # doublon : le dernier l'emporte
+            tnew_keys = get_key(tnew).to_numpy()
+            target = np.array([t1_positions.get(key, -1) for key in tnew_keys], dtype=np.int64)
+            matched = target >= 0
+            rows = target[matched]
 
-            self.df = t1
-            print(">>> fin de l'importation succès")
-            print(">>> Colonnes actuelles après import :", list(self.df.columns))
+            # Mise à jour : champs non vides + non verrouillés, colonne par colonne
+            updates = tnew[matched]
+            for col in tnew.columns:
+                values = updates[col]
+                mask = (values.notna() & (values.astype(object) != "")).to_numpy()
+                if col in locked:
+                    # Lecture en bloc du masque de la colonne ; les lignes ajoutées par les lots
+                    # précédents sont au-delà du masque, donc libres
+                    inside = rows < len(locked[col])
+                    hit = np.zeros(len(rows), dtype=bool)
+                    hit[inside] = locked[col][rows[inside]]
+                    mask = mask & ~hit
+                if not mask.any():
+                    continue
+                # Plusieurs lignes de tnew pour un même token : la dernière l'emporte
+                hit_rows = rows[mask]
+                last = ~pd.Series(hit_rows).duplicated(keep="last").to_numpy()
+                column = t1[col].to_numpy(dtype=object, copy=True)
+                column[hit_rows[last]] = values.to_numpy(dtype=object)[mask][last]
+                t1[col] = column
 
+            # Colonne déjà typée en dates : on y écrit un Timestamp pour éviter de tout reparser
+            scrape_is_date = pd.api.types.is_datetime64_any_dtype(t1["last_scrape_date"])
+            now_value = pd.Timestamp(now) if scrape_is_date else now
+            if len(rows):
+                scrape = t1["last_scrape_date"].to_numpy(copy=True) if scrape_is_date \
+                    else t1["last_scrape_date"].to_numpy(dtype=object, copy=True)
+                scrape[rows] = now_value
+                t1["last_scrape_date"] = scrape
 
-        except Exception as e:
-            print(">>> Erreur dans import_table :", e)
\ No newline at end of file
+            # Nouveaux tokens → un seul ajout par lot (les lots suivants les retrouvent par leur clé)
+            new_rows = tnew[~matched].reindex(columns=t1.columns).infer_objects()
+            new_rows["last_scrape_date"] = now_value
+            if len(new_rows):
+                if result_keys is not None and tnew_url_keys is not None:
+                    result_keys.append(tnew_url_keys[KEY_COLUMNS][~matched])
+                    result_invalid.append(np.flatnonzero(tnew.index.isin(tnew_invalid)[~matched]) + len(t1))
+                t1_positions.update(zip(tnew_keys[~matched], range(len(t1), len(t1) + len(new_rows))))
+                t1 = pd.concat([t1, new_rows], ignore_index=True)
+            if tnew_url_keys is None:
+                result_keys = result_invalid = None
+
+            updated += int(matched.sum())
+            added += len(new_rows)
+            read += len(tnew)
+            seconds = time.perf_counter() - chunk_started
+            print(f"📥 Lot {number} : {len(tnew)} lignes en {seconds:.2f} s "
+                  f"({len(tnew) / max(seconds, 1e-9):,.0f} lignes/s, {read} lues au total)")
+            if progress is not None:
+                progress(read, getattr(chunks, "total_rows", None))
+            chunk_started = time.perf_counter()
+
+        check_cancelled(cancelled)
+        return {
+            "table": restore_column_types(t1),
+            "base": base,
+            "edit_count": edit_count,
+            "url_keys": (pd.concat(result_keys, ignore_index=True), pd.Index(np.concatenate(result_invalid)))
+                        if result_keys is not None else None,
+            "report": {
+                "updated": updated,
+                "added": added,
+                "unparsed_rows": unparsed_rows,
+                "rows_read": read,
+                "seconds": time.perf_counter() - started,
+            },
+        }
+
+    def publish_import(self, prepared):
+        # Étape "publication" (thread de l'interface) : échange de df en une affectation
+        if self.df is not prepared["base"] or self.edit_count != prepared["edit_count"]:
+            raise ValueError("La table a été modifiée pendant l'import : relancez l'import.")
+        self.replace_table(prepared["table"])
+        self.last_import_report = prepared["report"]
+
+        # Clés de la nouvelle table connues sans reparser : anciennes lignes + nouveaux tokens
+        if prepared["url_keys"] is not None:
+            self.url_keys.remember_table(self.df, self.url_version, *prepared["url_keys"])
+        report = prepared["report"]
+        print(f">>> fin de l'importation succès ({report['updated']} mis à jour, {report['added']} ajoutés)")
+        print(">>> Colonnes actuelles après import :", list(self.df.columns))
@@ -0,0 +1,72 @@
+# src/import_pipeline.py
+
+import queue
+import threading
+
+
+class ImportCancelled(Exception):
+    """Import interrompu à la demande de l'utilisateur (df n'a pas été modifié)."""
+
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+def check_cancelled(cancelled):
+    if cancelled is not None and cancelled.is_set():
+        raise ImportCancelled("Import annulé.")
+
+
+def read_ahead(chunks, stage, cancelled=None, depth=2):
+    """Étapes lecture + stage(lot) dans un thread dédié, au plus depth lots d'avance.
+
+    Le lot n+1 est lu et préparé pendant que l'appelant fusionne le lot n. Les
+    erreurs du thread de lecture sont relevées chez l'appelant, dans l'ordre.
+    """
+    items = queue.Queue(maxsize=depth)
+    stopped = threading.Event()  # l'appelant a cessé de lire (erreur, annulation)
+
+    def put(item):
+        # Attente par tranches : un lecteur bloqué sur une file pleine voit l'annulation
+        while not stopped.is_set() and not (cancelled is not None and cancelled.is_set()):
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        source = iter(chunks)
+        try:
+            for chunk in source:
+                if not put(stage(chunk)):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()  # fichier source refermé même si la lecture s'arrête avant la fin
+
+    thread = threading.Thread(target=reader, name="import-read", daemon=True)
+    thread.start()
+    try:
+        while True:
+            check_cancelled(cancelled)
+            try:
+                item = items.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
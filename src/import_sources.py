@@ -0,0 +1,99 @@
+# src/import_sources.py
+
+import os
+
+import openpyxl
+import pandas as pd
+
+import config
+
+
+def _excel_headers(header_row):
+    # Mêmes noms que pd.read_excel : cellule vide -> "Unnamed: i"
+    return [f"Unnamed: {i}" if value is None else str(value) for i, value in enumerate(header_row)]
+
+
+def _count_lines(path):
+    # Estimation du nombre de lignes (progression) : simple comptage des fins de ligne
+    count = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            count += block.count(b"\n")
+    return count
+
+
+class ChunkedSource:
+    """Fichier de nouveaux tokens lu par lots de chunk_rows lignes (xlsx, CSV, JSONL).
+
+    Seul le lot en cours est en mémoire ; l'index de chaque lot continue celui
+    du précédent (numéro de ligne dans le fichier, données seulement).
+    total_rows est une estimation pour la progression (None si inconnue).
+    """
+
+    EXTENSIONS = {
+        ".xlsx": "xlsx", ".xlsm": "xlsx",
+        ".csv": "csv",
+        ".jsonl": "jsonl", ".ndjson": "jsonl",
+    }
+
+    def __init__(self, path, chunk_rows=None):
+        self.path = path
+        self.chunk_rows = chunk_rows or config.IMPORT_CHUNK_ROWS
+        self.kind = self.EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if self.kind is None:
+            raise ValueError(f"Format non pris en charge : {os.path.basename(path)} "
+                             f"(attendu : {', '.join(sorted(self.EXTENSIONS))})")
+        self.total_rows = None
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    def __iter__(self):
+        if self.kind == "xlsx":
+            return self._xlsx_chunks()
+        if self.kind == "csv":
+            self.total_rows = max(_count_lines(self.path) - 1, 0)
+            return self._reindexed(pd.read_csv(self.path, chunksize=self.chunk_rows))
+        self.total_rows = _count_lines(self.path)
+        return self._reindexed(pd.read_json(self.path, lines=True, chunksize=self.chunk_rows))
+
+    def _reindexed(self, reader):
+        offset = 0
+        with reader:
+            for chunk in reader:
+                chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+                offset += len(chunk)
+                yield chunk
+
+    def _xlsx_chunks(self):
+        # Lecture en flux (read_only) de la feuille active, comme load_excel
+        workbook = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            if sheet.max_row:
+                self.total_rows = max(sheet.max_row - 1, 0)
+            rows = sheet.iter_rows(values_only=True)
+            headers = _excel_headers(next(rows, ()))
+            width = len(headers)
+            batch, offset = [], 0
+            for row in rows:
+                if all(value is None for value in row):
+                    continue  # lignes vides (fin de feuille mal dimensionnée)
+                if len(row) < width:
+                    row = tuple(row) + (None,) * (width - len(row))
+                batch.append(row[:width])
+                if len(batch) >= self.chunk_rows:
+                    yield self._frame(batch, headers, offset)
+                    offset += len(batch)
+                    batch = []
+            if batch or offset == 0:
+                yield self._frame(batch, headers, offset)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _frame(batch, headers, offset):
+        frame = pd.DataFrame.from_records(batch, columns=headers)
+        frame.index = pd.RangeIndex(offset, offset + len(frame))
+        return frame.infer_objects()
@@ -0,0 +1,103 @@
+# src/lock_store.py
+
+import json
+import weakref
+
+import numpy as np
+
+
+FORMAT = 2  # {"format": 2, "locks": {colonne: {contract_address: [token_id, ...]}}}
+
+
+class LockStore:
+    """Cellules verrouillées, identifiées par (clé du token, nom de colonne).
+
+    Aucune position n'est stockée : un tri, une suppression ou un import ne
+    déplacent pas les verrous. masks() donne pour chaque colonne un tableau
+    booléen aligné sur les lignes de df, recalculé seulement quand les lignes,
+    les clés ou les verrous ont changé.
+    """
+
+    def __init__(self):
+        self._keys = {}     # colonne -> set de clés (contract_address, token_id)
+        self.version = 0    # incrémenté à chaque verrouillage / déverrouillage
+        self._masks = {}    # colonne -> tableau booléen aligné sur df
+        self._state = None  # (version des lignes de df, version des verrous) de _masks
+        self._source = None  # weakref du DataFrame de _masks
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._keys.values())
+
+    def columns(self):
+        return [column for column, keys in self._keys.items() if keys]
+
+    def keys(self, column):
+        return set(self._keys.get(column, ()))
+
+    def clear(self):
+        self._keys.clear()
+        self.version += 1
+
+    def lock(self, column, keys):
+        self._keys.setdefault(column, set()).update(keys)
+        self.version += 1
+
+    def unlock(self, column, keys):
+        self._keys.get(column, set()).difference_update(keys)
+        self.version += 1
+
+    def rename_column(self, old_name, new_name):
+        if old_name in self._keys:
+            self._keys.setdefault(new_name, set()).update(self._keys.pop(old_name))
+            self.version += 1
+
+    def drop_column(self, column):
+        # Colonne supprimée : ses verrous sont retirés (rendus à lock() si la suppression est annulée)
+        keys = self._keys.pop(column, set())
+        if keys:
+            self.version += 1
+        return keys
+
+    # --- Masques alignés sur df ---
+
+    def masks(self, df, rows_version, positions_of):
+        """{colonne: tableau booléen (une valeur par ligne de df)}, colonnes verrouillées seulement.
+
+        rows_version : change quand les lignes ou les clés de df changent ;
+        positions_of(clés) -> positions de ces clés dans df (voir TokenIndex.positions).
+        """
+        state = (rows_version, self.version)
+        if self._source is not None and self._source() is df and self._state == state:
+            return self._masks
+        masks = {}
+        for column, keys in self._keys.items():
+            if not keys:
+                continue
+            mask = np.zeros(len(df), dtype=bool)
+            mask[positions_of(keys)] = True
+            masks[column] = mask
+        self._masks, self._state, self._source = masks, state, weakref.ref(df)
+        return masks
+
+    # --- Fichier ---
+
+    def to_json(self):
+        # Regroupé par colonne puis par contrat : chaque adresse n'est écrite qu'une fois par colonne
+        locks = {}
+        for column, keys in self._keys.items():
+            by_contract = {}
+            for contract_address, token_id in sorted(keys):
+                by_contract.setdefault(contract_address, []).append(token_id)
+            if by_contract:
+                locks[str(column)] = by_contract
+        return {"format": FORMAT, "locks": locks}
+
+    def load_json(self, data):
+        self._keys = {column: {(contract_address, str(token_id))
+                               for contract_address, token_ids in by_contract.items() for token_id in token_ids}
+                      for column, by_contract in data.get("locks", {}).items()}
+        self.version += 1
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, ensure_ascii=False, separators=(",", ":"))
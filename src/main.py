@@ -1,24 +1,67 @@
 # src/main.py
 
 import sys
-from PyQt5.QtWidgets import QApplication
-from excel_manager import ExcelManager
-from main_window import MainWindow
+import time
+
+
+class StartupProfile:
+    """Chronométrage du démarrage (--profile-startup) : durée de chaque étape, cumul depuis le lancement."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.steps = []
+
+    def mark(self, step):
+        now = time.perf_counter()
+        self.steps.append((step, now - self.last, now - self.started))
+        self.last = now
+
+    def report(self, load_stats=None):
+        print("⏱️ Démarrage :")
+        for step, duration, total in self.steps:
+            print(f"   {step:<45} {duration * 1000:8.1f} ms   (cumul {total * 1000:8.1f} ms)")
+        if load_stats:
+            print(f"   lecture du classeur : {load_stats}")
+
 
 def main():
+    argv = sys.argv[1:]
+    # Sous-commande (import / export / stats) : ligne de commande, sans charger PyQt5
+    import cli
+    if any(arg in cli.COMMANDS for arg in argv) or any(arg in ("-h", "--help") for arg in argv):
+        sys.exit(cli.main(argv))
+
+    profile = StartupProfile() if "--profile-startup" in argv else None
+    qt_argv = [sys.argv[0]] + [arg for arg in argv if arg != "--profile-startup"]
+
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    if profile is not None:
+        profile.mark("import PyQt5")
+
     # Initialisation de l'application Qt
-    app = QApplication(sys.argv)
+    app = QApplication(qt_argv)
 
-    # Chargement des données Excel
-    excel_manager = ExcelManager()
-    excel_manager.load_excel()
+    from main_window import MainWindow
+    if profile is not None:
+        profile.mark("QApplication + import main_window")
 
-    # Création et affichage de la fenêtre principale
-    window = MainWindow(None, excel_manager)
+    # Fenêtre affichée tout de suite : pandas / openpyxl et la lecture du classeur viennent après
+    window = MainWindow(None, defer_startup=True)
     window.show()
+    if profile is not None:
+        profile.mark("fenêtre créée et affichée")
+
+    def finish_startup():
+        if profile is not None:
+            profile.mark("premier affichage")
+        window.finish_startup(profile)
+
+    QTimer.singleShot(0, finish_startup)
 
     # Boucle principale Qt
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,62 +1,53 @@
 import sys
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton, QShortcut,
-    QLabel, QTableWidget, QTableWidgetItem, QMessageBox,
-    QLineEdit, QMenu, QAction, QInputDialog, QAbstractItemView
+    QLabel, QTableView, QHeaderView, QMessageBox,
+    QLineEdit, QMenu, QAction, QInputDialog, QAbstractItemView, QFileDialog
 )
-from PyQt5.QtCore import Qt, QPoint, QObject, QEvent, QTimer
-from excel_manager import ExcelManager
-from PyQt5.QtGui import QKeySequence, QKeyEvent, QFont, QColor
+from PyQt5.QtCore import Qt, QObject, QTimer, QFileSystemWatcher, pyqtSignal
+from import_pipeline import ImportCancelled
+import config
+from PyQt5.QtGui import QKeySequence, QKeyEvent
 
-import pandas as pd
 import json
 import os
+import threading
+import time
 import traceback
 from logger import logger 
-import hashlib
 import logging
 
 
 DEBUG_MODE = True
 
-def hash_df(df):
-        return hashlib.md5(pd.util.hash_pandas_object(df, index=True).values).hexdigest()
-
-def compare_dfs(df1, df2):
-
-    diffs = []
-    rows = max(len(df1), len(df2))
-    cols = set(df1.columns).union(set(df2.columns))
-
-    for i in range(rows):
-        for col in cols:
-            val1 = df1[col][i] if i < len(df1) and col in df1.columns else "<missing>"
-            val2 = df2[col][i] if i < len(df2) and col in df2.columns else "<missing>"
-            if str(val1) != str(val2):
-                diffs.append(f"🟥 Diff ligne {i}, colonne '{col}': '{val1}' -> '{val2}'")
-    return diffs
-
-def log_df_differences(df_before: pd.DataFrame, df_after: pd.DataFrame, locked_cells: set):
-    for row in range(min(len(df_before), len(df_after))):
-        for col in range(min(len(df_before.columns), len(df_after.columns))):
-            val_before = df_before.iat[row, col]
-            val_after = df_after.iat[row, col]
-            if pd.isna(val_before): val_before = ""
-            if pd.isna(val_after): val_after = ""
-            if str(val_before) != str(val_after):
-                col_name = df_before.columns[col]
-                is_locked = (row, col) in locked_cells
-                status = "🔒" if is_locked else "⚠️"
-                print(f"{status} Diff (row={row}, col={col}, '{col_name}') : '{val_before}' → '{val_after}'")
+# Modules lourds (pandas, numpy, openpyxl) : importés par load_heavy_modules() une fois la
+# fenêtre affichée, pour que le premier affichage n'attende pas leur chargement ; les méthodes
+# les importent là où elles s'en servent (déjà chargés, l'import ne coûte plus rien)
+
+
+def load_heavy_modules(profile=None):
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    if profile is not None:
+        profile.mark("import pandas / numpy")
+    import excel_manager  # noqa: F401
+    if profile is not None:
+        profile.mark("import excel_manager (openpyxl, index...)")
+    import clipboard  # noqa: F401
+    import drop_folder  # noqa: F401
+    import import_sources  # noqa: F401
+    import table_model  # noqa: F401
+    import undo_journal  # noqa: F401
+    if profile is not None:
+        profile.mark("import modèle, journal, import")
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, root, excel_manager):
+    def __init__(self, root, excel_manager=None, defer_startup=False):
         super().__init__()
 
         self.loading = False
         self.last_saved_state = None
-        self.locked_cells = set()
 
 
         # Gestion Timer
@@ -68,8 +59,39 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Token Manager")
         self.setGeometry(100, 100, 1200, 600)
 
-        # Gestionnaire Excel
-        self.manager = ExcelManager("tokens.xlsx")
+        # Gestionnaire Excel : celui fourni par main.py, sinon créé par finish_startup()
+        self.manager = excel_manager
+        self.table = None
+        self.journal = None
+        self.startup_profile = None
+
+        # Sauvegarde en arrière-plan : les signaux ramènent la progression dans le thread de l'interface
+        self.save_signals = SaveSignals()
+        self.save_signals.progress.connect(self.on_save_progress)
+        self.save_signals.finished.connect(self.on_save_finished)
+
+        # Import en arrière-plan (lecture -> clés -> fusion), publié dans df à la fin
+        self.import_signals = ImportSignals()
+        self.import_signals.progress.connect(self.on_import_progress)
+        self.import_signals.finished.connect(self.on_import_finished)
+        self.import_future = None
+        self.import_cancelled = None
+        self.import_before = None
+        self.import_from_drop = False
+
+        # Dossier de dépôt : un passage quand le dossier change, après un délai (fichiers en cours de copie)
+        self.drop_watcher = QFileSystemWatcher()
+        self.drop_timer = QTimer()
+        self.drop_timer.setSingleShot(True)
+        self.drop_timer.setInterval(config.DROP_FOLDER_SETTLE_MS)
+        self.drop_timer.timeout.connect(self.ingest_drop_folder)
+        self.drop_watcher.directoryChanged.connect(lambda _: self.drop_timer.start())
+
+        # Point de reprise périodique (le journal de ExcelManager enregistre chaque modification)
+        self.autosave_timer = QTimer()
+        self.autosave_timer.setInterval(config.DIRTY_STATE_CHECK_INTERVAL * 1000)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.autosave_timer.start()
 
         # Interface centrale
         self.central_widget = QWidget()
@@ -89,18 +111,71 @@ class MainWindow(QMainWindow):
         self.redo_button.clicked.connect(self.redo_last_change)
         self.import_button = QPushButton("Importer")
         self.import_button.clicked.connect(self.import_new_tokens)
+        self.drop_button = QPushButton("Surveiller le dossier de dépôt")
+        self.drop_button.setCheckable(True)
+        self.drop_button.toggled.connect(self.set_drop_watch)
+
+        # Lecture du classeur en arrière-plan (voir load_table_async)
+        self.load_signals = LoadSignals()
+        self.load_signals.finished.connect(self.on_load_finished)
+
+        # Champ de recherche (filtrage différé pendant la frappe)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Rechercher... (ex. chain:eth qtt_owned>3 last_scrape_date<2026-01-01)")
+        self.search_timer = QTimer()
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(config.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(lambda: self.filter_table(self.search_input.text()))
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.loading = False
+
+        # Ajout des widgets au layout (la table est insérée sous la recherche par finish_startup)
+        self.layout.addWidget(self.label)
+        self.layout.addWidget(self.button)
+        self.layout.addWidget(self.search_input)
+        self.layout.addWidget(self.save_button)
+        self.layout.addWidget(self.undo_button)
+        self.layout.addWidget(self.redo_button)
+        self.layout.addWidget(self.import_button)
+        self.layout.addWidget(self.drop_button)
+
+        if defer_startup:
+            # main.py : la fenêtre s'affiche d'abord, finish_startup() est appelé ensuite
+            self.label.setText("Démarrage...")
+            self.set_data_loading(True)
+        else:
+            self.finish_startup(load_data=False)
+
+    def finish_startup(self, profile=None, load_data=True):
+        from excel_manager import ExcelManager
+        from undo_journal import UndoJournal
+        # Après le premier affichage : modules lourds, gestionnaire, table, puis données en arrière-plan
+        self.startup_profile = profile
+        load_heavy_modules(profile)
+        if self.manager is None:
+            self.manager = ExcelManager("tokens.xlsx")
+        # Deltas, borné en mémoire ; les actions sans effet sur le contenu ne sont pas empilées
+        self.journal = UndoJournal(config.UNDO_MEMORY_BUDGET_MB, fingerprint=self.manager.fingerprint)
+        self._build_table()
+        self.load_table_settings()
+        if profile is not None:
+            profile.mark("table créée")
+        if load_data:
+            self.load_table_async()
+        else:
+            self.set_data_loading(False)
 
-        # Table principale
-        self.table = TokenTableWidget(manager=excel_manager, main_window=self)
+    def _build_table(self):
+        from undo_journal import RowsReordered
+        # Table principale (vue sur self.manager.df via TokenTableModel)
+        self.table = TokenTableWidget(manager=self.manager, main_window=self)
         self.table.setFocusPolicy(Qt.StrongFocus)
         self.table.setFocus()
         self.table.setSortingEnabled(True)
-        self.table.itemChanged.connect(self.save_state_for_undo)
-        self.table.itemChanged.connect(self.handle_cell_change)
-
-        # En-têtes de colonnes
-        self.table.setColumnCount(len(self.manager.headers))
-        self.table.setHorizontalHeaderLabels([h.capitalize() for h in self.manager.headers])
+        self.table.token_model.cellEdited.connect(self.handle_cell_change)
+        self.table.token_model.rowsReordered.connect(
+            lambda order: self.save_state_for_undo(RowsReordered(order), "Tri")
+        )
 
         # Menu contextuel (table et en-têtes)
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -128,101 +203,79 @@ class MainWindow(QMainWindow):
         paste_shortcut.activated.connect(self.paste_cells)
         cut_shortcut = QShortcut(QKeySequence.Cut, self.table)
         cut_shortcut.activated.connect(self.cut_cells)
-        
-        # Pile d'annulation
-        self.undo_stack = []
-        self.redo_stack = []
-        self.loading = False
+        # Raccourcis qui modifient df : désactivés pendant un import (voir set_importing)
+        self.edit_shortcuts = [delete_shortcut, undo_shortcut, paste_shortcut, cut_shortcut]
 
-        # Champ de recherche
-        self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Rechercher...")
-        self.search_input.textChanged.connect(self.filter_table)
+        self.layout.insertWidget(self.layout.indexOf(self.search_input) + 1, self.table)
 
-        # Ajout des widgets au layout
-        self.layout.addWidget(self.label)
-        self.layout.addWidget(self.button)
-        self.layout.addWidget(self.search_input)
-        self.layout.addWidget(self.table)
-        self.layout.addWidget(self.save_button)
-        self.layout.addWidget(self.undo_button)
-        self.layout.addWidget(self.redo_button)
-        self.layout.addWidget(self.import_button)
+    def set_data_loading(self, loading):
+        # Pas d'action sur les données tant que le classeur n'est pas lu
+        for button in (self.button, self.save_button, self.undo_button, self.redo_button,
+                       self.import_button, self.drop_button):
+            button.setEnabled(not loading)
 
-        self.load_table_settings()
+    def load_table_async(self):
+        # Lecture du classeur dans un thread : la fenêtre reste affichée et réactive
+        self.set_data_loading(True)
+        self.label.setText("Chargement des données...")
+        print(">>> Chargement des données depuis tokens.xlsx via load_excel() (arrière-plan)")
+
+        def run():
+            try:
+                self.manager.load_excel()
+                # Empreintes calculées ici plutôt qu'à la première édition (voir ExcelManager.fingerprint)
+                self.manager.fingerprint()
+                self.manager.saved_fingerprint()
+            except Exception as e:
+                self.load_signals.finished.emit(e)
+            else:
+                self.load_signals.finished.emit(None)
+
+        threading.Thread(target=run, name="load-excel", daemon=True).start()
 
-    def load_table(self, from_file: bool = True):
+    def on_load_finished(self, error):
+        self.set_data_loading(False)
+        if error is not None:
+            self.label.setText("Erreur de chargement.")
+            QMessageBox.critical(self, "Erreur", str(error))
+            return
+        self.show_recovered()
+        self.load_table(from_file=False)
+        profile, self.startup_profile = self.startup_profile, None
+        if profile is not None:
+            profile.mark("données chargées et affichées")
+            profile.report(self.manager.last_load_stats)
+
+    def show_recovered(self):
+        recovered = self.manager.last_load_stats.get("recovered", 0)
+        if recovered:
+            QMessageBox.information(self, "Reprise", f"{recovered} modification(s) non sauvegardée(s) "
+                                                     "récupérée(s) après un arrêt inattendu.")
+
+    def load_table(self, from_file: bool = True, keep_history: bool = False):
+        from table_model import CHECK_COLUMN
+        # keep_history : df remplacé par une action annulable (import), l'historique reste valable
         self.loading = True
         try:
             if from_file:
                 print(">>> Chargement des données depuis tokens.xlsx via load_excel()")
                 self.manager.load_excel()
+                self.show_recovered()
                 print("🟢 Données chargées depuis le fichier :")
                 print(self.manager.df.head(10).to_string()) 
             else:
                 print(">>> Chargement des données depuis la mémoire (self.manager.df)")
 
-            data = self.manager.get_all_data()
-            if not data:
+            df = self.manager.df
+            if df is None or df.empty:
                 QMessageBox.information(self, "Info", "Aucune donnée chargée.")
                 return
 
-            df = self.manager.df
+            # Colonne temporaire "checked" pour l'affichage (remise à zéro à chaque chargement)
+            df[CHECK_COLUMN] = False
 
-            # Supprime toute colonne 'checked' déjà présente (on la gère via la table uniquement)
-            if "checked" in df.columns:
-                df.drop(columns=["checked"], inplace=True)
-
-            # Chargement ou création de la colonne temporaire "checked" pour l'affichage
-            checked_values = [False] * len(df)
-            if hasattr(self, 'locked_cells'):  # pour s'assurer que locked_cells existe
-                self.locked_cells = set()
-
-            if "checked" not in df.columns:
-                df["checked"] = False
-
-            headers = ["✔"] + [col for col in df.columns if col != "checked"]
-
-            # Initialisation de la table
-            self.table.clear()
-            self.table.setRowCount(0)
-            self.table.setColumnCount(len(headers))
-            self.table.setHorizontalHeaderLabels(headers)
-            self.table.setRowCount(len(df))
-
-            for row_idx, (_, row) in enumerate(df.iterrows()):
-                # Colonne 0 : checkbox
-                checkbox_item = QTableWidgetItem()
-                checkbox_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
-                checked = row.get("checked", False) if "checked" in row else False
-                checkbox_item.setCheckState(Qt.Checked if checked else Qt.Unchecked)
-                self.table.setItem(row_idx, 0, checkbox_item)
-
-                # Autres colonnes
-                for col_idx, (col_name, value) in enumerate(row.items()):
-                    if col_name == "checked":
-                        continue  # déjà traité
-
-                    item = QTableWidgetItem(str(value) if pd.notna(value) else "")
-                    col_pos = col_idx + 1  # +1 car colonne 0 = checkbox
-
-                    if (row_idx, col_pos) in self.locked_cells:
-                        if not value or str(value).strip() == "":
-                            self.locked_cells.discard((row_idx, col_pos))
-                        else:
-                            font = item.font()
-                            font.setBold(True)
-                            item.setFont(font)
-
-                    self.table.setItem(row_idx, col_pos, item)
-
-            # Chargement des cellules verrouillées
-            locked_path = os.path.join(os.path.dirname(self.manager.filepath), "locked_cells.json")
-            self.locked_cells = set()
-            if os.path.exists(locked_path):
-                with open(locked_path, "r") as f:
-                    loaded = json.load(f)
-                    self.locked_cells = set(tuple(cell) for cell in loaded)
+            # La vue lit directement df : aucune cellule n'est créée ici
+            self.table.token_model.reload()
 
             self.label.setText("Données chargées depuis tokens.xlsx")
 
@@ -231,18 +284,12 @@ class MainWindow(QMainWindow):
 
         self.load_table_settings()
         self.load_locked_cells()
+        # Styles (verrous, lignes modifiées / inactives) fournis par le modèle (FontRole/BackgroundRole)
+        self.table.token_model.refresh_styles()
         self.apply_checked_column()
         self.loading = False
-        self.save_state_for_undo()
-
-        # Appliquer les styles aux cellules verrouillées
-        for (row, col) in self.locked_cells:
-            item = self.table.item(row, col)
-            if item:
-                font = item.font()
-                font.setBold(True)
-                item.setFont(font)
-                item.setBackground(QColor(80, 80, 80))
+        if not keep_history:
+            self.journal.clear()  # nouvel état de référence
 
         print("🟡 Données extraites de la table vers df (sans les cases cochées) :")
         print(self.manager.df.head(10).to_string())
@@ -255,35 +302,99 @@ class MainWindow(QMainWindow):
         logger.info("🔽 Sauvegarde en cours...")
 
         try:
-            self.table.update_df_from_table(skip_columns=[0])
+            self.table.update_df_from_table(skip_columns=[0])  # incrémental : rien à balayer
 
-            self.manager.save_excel()  # Utilise la méthode correcte pour sauvegarder
-            self.statusBar().showMessage("Fichier sauvegardé.", 5000)  # Affiche un message de confirmation
-            logger.info("✅ Fichier sauvegardé avec succès.")
-            self.unsaved_changes = False
+            # Instantané pris ici, écriture (fichier temporaire + renommage) dans un thread :
+            # la fenêtre reste utilisable et les éditions faites pendant l'écriture restent à sauvegarder
+            self.statusBar().showMessage("Sauvegarde en cours...")
+            future = self.manager.save_excel_async(progress=self.save_signals.progress.emit)
+            future.add_done_callback(lambda f: self.save_signals.finished.emit(f.exception()))
 
         except Exception as e:
             logger.error(f"❌ ERREUR pendant la sauvegarde : {e}")
             logger.error(traceback.format_exc())
             self.statusBar().showMessage("Erreur lors de la sauvegarde.", 5000)
 
+    def autosave(self):
+        if self.manager is None or self.manager.df is None or not self.manager.is_dirty() or self.manager.is_saving():
+            return
+        if self.manager.checkpoint_async() is not None:
+            logger.debug("💾 Point de reprise enregistré.")
+
+    def describe_changes(self):
+        # Résumé de ce qui a changé depuis la dernière sauvegarde (détail dans le journal)
+        diff = self.manager.changes_since_save()
+        summary = diff.summary()
+        logger.debug(f"🔍 Différences depuis la sauvegarde en {diff.seconds * 1000:.1f} ms : {summary}")
+        if DEBUG_MODE:
+            for line in diff.describe(self.table.token_model.columns if self.table is not None else None,
+                                      self.manager.is_locked, limit=50):
+                logger.debug(line)
+        parts = [f"{summary['changed_cells']} cellule(s) modifiée(s) sur {summary['changed_rows']} ligne(s)"]
+        if summary["added_rows"] or summary["removed_rows"]:
+            parts.append(f"{summary['added_rows']} ligne(s) ajoutée(s), {summary['removed_rows']} supprimée(s)")
+        if summary["added_columns"] or summary["removed_columns"]:
+            parts.append(f"colonnes ajoutées : {', '.join(map(str, summary['added_columns'])) or '-'}, "
+                         f"supprimées : {', '.join(map(str, summary['removed_columns'])) or '-'}")
+        return "\n".join(parts)
+
+    def closeEvent(self, event):
+        discard = True
+        if self.manager is None:
+            event.accept()  # fermée avant la fin du démarrage : rien à sauvegarder
+            return
+        if self.manager.df is not None and self.manager.is_dirty():
+            if config.SAVE_WARNING_ON_EXIT:
+                answer = QMessageBox.question(
+                    self, "Modifications non sauvegardées", f"{self.describe_changes()}\n\nSauvegarder avant de quitter ?",
+                    QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel, QMessageBox.Save)
+                if answer == QMessageBox.Cancel:
+                    event.ignore()
+                    return
+                if answer == QMessageBox.Save:
+                    try:
+                        self.manager.save_excel()
+                    except Exception as e:
+                        QMessageBox.critical(self, "Erreur", f"Sauvegarde impossible : {e}")
+                        event.ignore()
+                        return
+            else:
+                discard = False  # pas d'avertissement : le journal est gardé pour la prochaine ouverture
+        if self.import_future is not None:
+            self.import_cancelled.set()  # import en cours abandonné, df n'a pas été touché
+        self.autosave_timer.stop()
+        self.manager.close_recovery(discard=discard)
+        event.accept()
+
+    def on_save_progress(self, done, total):
+        self.statusBar().showMessage(f"Sauvegarde en cours... {done * 100 // max(total, 1)} % ({done}/{total} lignes)")
+
+    def on_save_finished(self, error):
+        if error is None:
+            stats = self.manager.last_save_stats
+            self.statusBar().showMessage(f"Fichier sauvegardé (sauvegarde {stats.get('mode')}, "
+                                         f"{stats.get('seconds', 0):.2f} s).", 5000)  # Affiche un message de confirmation
+            logger.info(f"✅ Fichier sauvegardé avec succès ({stats}).")
+            self.table.token_model.refresh_styles()  # fond des lignes modifiées retiré
+        else:
+            logger.error(f"❌ ERREUR pendant la sauvegarde : {error}")
+            logger.error("".join(traceback.format_exception(type(error), error, error.__traceback__)))
+            self.statusBar().showMessage("Erreur lors de la sauvegarde (fichier d'origine intact).", 5000)
+
     def filter_table(self, text):
+        # Recherche dans l'index de ExcelManager, les lignes trouvées sont appliquées en bloc au modèle
         self.loading = True
-        text = text.strip().lower()
-        for row in range(self.table.rowCount()):
-            match = False
-            for column in range(self.table.columnCount()):
-                item = self.table.item(row, column)
-                if item and text in item.text().lower():
-                    match = True
-                    break
-            self.table.setRowHidden(row, not match)
+        model = self.table.token_model
+        model.set_search(text)
+        if text.strip():
+            self.statusBar().showMessage(f"{model.rowCount()} ligne(s) trouvée(s).", 3000)
         self.loading = False
 
     #Méthode pour le menu contextuel du tableau
     def show_table_context_menu(self, pos):
         self.loading = True
         menu = QMenu(self)
+        editable = not self.table.token_model.read_only  # import en cours : table en lecture seule
         
         add_row_action = QAction("Ajouter une ligne", self)
         add_row_action.triggered.connect(self.add_row)
@@ -324,6 +435,11 @@ class MainWindow(QMainWindow):
         menu.addAction(lock_action)
         menu.addAction(unlock_action)
 
+        # Verrous compris : les masques de l'import en cours ont été relevés à son lancement
+        for action in (add_row_action, delete_row_action, duplicate_row_action, clear_cells_action,
+                       cut_action, paste_action, lock_action, unlock_action):
+            action.setEnabled(editable)
+
         # afficher les menus définis
         menu.exec_(self.table.viewport().mapToGlobal(pos))
         self.loading = False
@@ -339,8 +455,7 @@ class MainWindow(QMainWindow):
 
 
         # masquer la colonne
-        header_item = self.table.horizontalHeaderItem(index)
-        header_label = header_item.text() if header_item else f"Colonne {index}"
+        header_label = self.table.token_model.headerData(index, Qt.Horizontal) or f"Colonne {index}"
         hide_column_action = QAction(f"Masquer la colonne '{header_label}'", self)
         hide_column_action.triggered.connect(lambda: self.table.setColumnHidden(index, True))
         menu.addAction(hide_column_action)
@@ -366,96 +481,130 @@ class MainWindow(QMainWindow):
         delete_column_action.triggered.connect(lambda: self.delete_column(index))
         menu.addAction(delete_column_action)
 
+        # déplacer la colonne dans le classeur (ordre des colonnes de df)
+        move_left_action = QAction("Déplacer la colonne vers la gauche", self)
+        move_left_action.triggered.connect(lambda: self.move_column(index, -1))
+        menu.addAction(move_left_action)
+        move_right_action = QAction("Déplacer la colonne vers la droite", self)
+        move_right_action.triggered.connect(lambda: self.move_column(index, 1))
+        menu.addAction(move_right_action)
+
+        # Import en cours : les colonnes de df ne changent pas (le résultat serait rejeté)
+        for action in (add_column_action, rename_column_action, delete_column_action,
+                       move_left_action, move_right_action):
+            action.setEnabled(not self.table.token_model.read_only)
+
 
         # afficher les menu definis
         menu.exec_(self.table.horizontalHeader().viewport().mapToGlobal(pos))
         self.loading = False
         
     def rename_column(self, index):
+        from undo_journal import ColumnRenamed
+        if index <= 0:
+            return  # la colonne des cases à cocher n'est pas renommable
         self.loading = True
         new_name, ok = QInputDialog.getText(self, "Renommer la colonne", "Nouveau nom :")
-        if ok and new_name:
-            self.manager.headers[index] = new_name
-            self.table.setHorizontalHeaderLabels(self.manager.headers)
+        old_name = self.table.token_model.column_name(index)
+        if ok and new_name != old_name:
+            try:
+                self.manager.rename_column(old_name, new_name)
+            except ValueError as e:
+                QMessageBox.warning(self, "Renommer la colonne", str(e))
+            else:
+                self.table.token_model.sync_columns()
+                self.save_state_for_undo(ColumnRenamed(old_name, new_name), "Renommer la colonne")
         self.loading = False
-        self.save_state_for_undo()
 
     def show_all_columns(self):
         self.loading = True
         for col in range(self.table.columnCount()):
             self.table.setColumnHidden(col, False)
         self.loading = False
-        self.save_state_for_undo()
 
     def sync_checked_column(self):
-        checked_values = []
-        for row in range(self.table.rowCount()):
-            item = self.table.item(row, 0)
-            checked = item.checkState() == Qt.Checked if item else False
-            checked_values.append(checked)
-
-        if "checked" in self.manager.df.columns:
-            self.manager.df["checked"] = checked_values
-        else:
-            self.manager.df.insert(0, "checked", checked_values)
+        from table_model import CHECK_COLUMN
+        # Les cases à cocher sont écrites directement dans df["checked"] par le modèle
+        if CHECK_COLUMN not in self.manager.df.columns:
+            self.manager.df.insert(0, CHECK_COLUMN, False)
+            self.table.token_model.reload()
 
     def apply_checked_column(self):
-        if "checked" in self.manager.df.columns:
-            for row in range(self.table.rowCount()):
-                item = self.table.item(row, 0)
-                if item:
-                    state = Qt.Checked if self.manager.df.at[row, "checked"] else Qt.Unchecked
-                    item.setCheckState(state)
+        from table_model import CHECK_COLUMN
+        if CHECK_COLUMN in self.manager.df.columns:
+            model = self.table.token_model
+            model.refresh_cells(0, 0, model.rowCount() - 1, 0)
 
     def add_row(self):
-        row_position = self.table.rowCount()
-        self.table.insertRow(row_position)
-
-        # Initialisez la colonne de checkbox
-        checkbox_item = QTableWidgetItem()
-        checkbox_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
-        checkbox_item.setCheckState(Qt.Unchecked)
-        self.table.setItem(row_position, 0, checkbox_item)
-
-        # Initialisez les autres colonnes
-        for col in range(1, self.table.columnCount()):
-            self.table.setItem(row_position, col, QTableWidgetItem(""))
-        self.table.update_df_from_table(skip_columns=[0])
-        self.save_state_for_undo()
+        from undo_journal import RowsInserted
+        row_position = len(self.manager.df)  # ajoutée en fin de df, même si une recherche est active
+        self.table.token_model.insertRows(self.table.rowCount(), 1)
+        frame = self.manager.df.iloc[[row_position]].copy()
+        self.save_state_for_undo(RowsInserted([row_position], frame), "Ajouter une ligne")
 
 
     def add_column(self):
+        from undo_journal import ColumnAdded
         column_name, ok = QInputDialog.getText(self, "Ajouter une colonne", "Nom de la nouvelle colonne :")
-        if ok and column_name:
-            self.manager.headers.append(column_name)
-            current_column_count = self.table.columnCount()
-            self.table.setColumnCount(current_column_count + 1)
-            self.table.setHorizontalHeaderLabels(self.manager.headers)
-
-            # Ajoute des cellules vides pour chaque ligne existante
-            for row in range(self.table.rowCount()):
+        if ok:
+            # Colonne vide dans df, seul l'en-tête de la vue est notifié
+            position = len(self.manager.df.columns)
+            try:
+                self.manager.add_column(column_name, position)
+            except ValueError as e:
+                QMessageBox.warning(self, "Ajouter une colonne", str(e))
+                return
+            self.table.token_model.sync_columns()
+            self.save_state_for_undo(ColumnAdded(column_name, position), "Ajouter une colonne")
 
-                  self.table.setItem(row, current_column_count, QTableWidgetItem(""))
-        self.save_state_for_undo()
+    def selected_rows(self):
+        import numpy as np
+        # Lignes vue sélectionnées (triées), à partir des plages : pas de QModelIndex par cellule
+        ranges = self.table.selectedRanges()
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([np.arange(rng.top(), rng.bottom() + 1) for rng in ranges]))
 
     def delete_selected_row(self):
-        selected_rows = sorted(set(index.row() for index in self.table.selectedIndexes()), reverse=True)
-        for row in selected_rows:
-            self.table.removeRow(row)
-        self.save_state_for_undo()
+        from undo_journal import RowsDeleted
+        # Une seule suppression dans df (drop en bloc), une seule action à annuler
+        rows = self.selected_rows()
+        if not len(rows):
+            return
+        positions, removed = self.table.token_model.remove_view_rows(rows)
+        self.save_state_for_undo(RowsDeleted(positions, removed), "Supprimer la ligne")
 
     def delete_column(self, index):
-        self.table.removeColumn(index)
-        if index < len(self.manager.headers):
-            del self.manager.headers[index]
-        self.save_state_for_undo()
+        from undo_journal import ColumnDeleted
+        if index <= 0:
+            return  # la colonne des cases à cocher n'est pas supprimable
+        name = self.table.token_model.column_name(index)
+        position, values, locks = self.manager.delete_column(name)
+        self.table.token_model.sync_columns()
+        self.save_state_for_undo(ColumnDeleted(name, position, values, locks), "Supprimer la colonne")
+
+    def move_column(self, index, step):
+        from undo_journal import ColumnMoved
+        # Échange de place avec la colonne voisine dans df (la case à cocher reste en tête)
+        model = self.table.token_model
+        target = index + step
+        if index <= 0 or target <= 0 or target >= model.columnCount():
+            return
+        name = model.column_name(index)
+        position = self.manager.df.columns.get_loc(model.column_name(target))
+        old_position = self.manager.move_column(name, position)
+        model.sync_columns()
+        self.save_state_for_undo(ColumnMoved(name, old_position, position), "Déplacer la colonne")
 
     def save_table_settings(self, path="table_settings.json"):
+        # Préférences par nom de colonne : restent justes après un ajout / une suppression de colonne
         header = self.table.horizontalHeader()
+        names = [self.table.token_model.column_name(i) for i in range(header.count())]
         settings = {
-            "column_order": [header.visualIndex(i) for i in range(header.count())],
-            "hidden_columns": [i for i in range(self.table.columnCount()) if self.table.isColumnHidden(i)],
-            "column_widths": {str(i): self.table.columnWidth(i) for i in range(self.table.columnCount())}
+            "format": 2,
+            "column_order": [names[header.logicalIndex(visual)] for visual in range(header.count())],
+            "hidden_columns": [name for i, name in enumerate(names) if self.table.isColumnHidden(i)],
+            "column_widths": {name: self.table.columnWidth(i) for i, name in enumerate(names)}
         }
         with open(path, "w") as f:
             json.dump(settings, f)    
@@ -466,184 +615,281 @@ class MainWindow(QMainWindow):
                 settings = json.load(f)
 
             header = self.table.horizontalHeader()
+            names = [self.table.token_model.column_name(i) for i in range(header.count())]
+            if settings.get("format") == 2:
+                logical = {name: i for i, name in enumerate(names)}
+            else:
+                # Ancien format : colonnes désignées par leur index
+                logical = {i: i for i in range(len(names))}
+                settings["column_widths"] = {int(i): width for i, width in settings.get("column_widths", {}).items()}
 
-            # Ordre des colonnes
+            # Ordre des colonnes (colonnes inconnues ignorées, nouvelles colonnes laissées à la fin)
             if "column_order" in settings:
-                for logical, visual in enumerate(settings["column_order"]):
-                    header.moveSection(header.visualIndex(logical), visual)
+                if settings.get("format") == 2:
+                    order = [logical[name] for name in settings["column_order"] if name in logical]
+                else:
+                    # ancien format : visualIndex de chaque colonne logique
+                    order = [i for i, _ in sorted(enumerate(settings["column_order"]), key=lambda item: item[1])
+                             if i < len(names)]
+                for visual, i in enumerate(order):
+                    header.moveSection(header.visualIndex(i), visual)
 
             # Colonnes masquées
             if "hidden_columns" in settings:
-                for i in range(self.table.columnCount()):
-                    self.table.setColumnHidden(i, i in settings["hidden_columns"])
+                hidden = set(settings["hidden_columns"])
+                for key, i in logical.items():
+                    self.table.setColumnHidden(i, key in hidden)
 
             # Largeurs de colonnes
-            if "column_widths" in settings:
-                for i_str, width in settings["column_widths"].items():
-                    i = int(i_str)
-                    self.table.setColumnWidth(i, width)
+            for key, width in settings.get("column_widths", {}).items():
+                if key in logical:
+                    self.table.setColumnWidth(logical[key], width)
 
         except Exception as e:
             print(f"Erreur lors du chargement des préférences d'affichage : {e}")
 
-    def handle_cell_change(self, item: QTableWidgetItem):
-        if self.loading or not item:
-            return
-
-        row = item.row()
-        col = item.column()
-
-        if (row, col) in self.locked_cells:
-            print(f"[🔒 VERROUILLÉ] Cellule ({row}, {col}) → modification annulée.")
-            old_value = self.manager.df.iat[row, col]
-            self.table.blockSignals(True)
-            item.setText(str(old_value) if pd.notna(old_value) else "")
-            self.table.blockSignals(False)
-            return
-
-        new_value = item.text()
-        old_value = self.manager.df.iat[row, col]
+    def handle_cell_change(self, row, col, old_value, new_value):
+        import pandas as pd
+        from undo_journal import CellsEdit
+        # Le modèle a déjà écrit la valeur dans df (et refusé les cellules verrouillées)
+        column = self.table.token_model.column_name(col)
+        stored = self.manager.df.iat[row, self.manager.df.columns.get_loc(column)]
+        self.save_state_for_undo(CellsEdit([row], [column], [old_value], [stored]), "Modifier la cellule")
 
-        if pd.isna(old_value):
+        if old_value is None or pd.isna(old_value):
             old_value = ""
-
-        if new_value != str(old_value):
-            model_col = col - 1  # Décalage pour la checkbox (col 0)
-            if model_col >= 0:  # Ignore la colonne checkbox
-                self.manager.df.iat[row, model_col] = new_value
-            print(f"📝 Cellule modifiée : ({row}, {col}) « {old_value} » → « {new_value} »")
-            self.save_state_for_undo()
+        print(f"📝 Cellule modifiée : ({row}, {col}) « {old_value} » → « {new_value} »")
 
     
     def clear_selected_cells(self):
-         for item in self.table.selectedItems():
-            if item is None:
-                continue
-            row = item.row()
-            col = item.column()
-            if (row, col) in self.table.locked_cells:
-                continue 
-            item.setText("")
+        import clipboard
+        # Effacement en bloc, cellules verrouillées ignorées (voir clipboard.fill_plan)
+        self.write_cells(clipboard.fill_plan(self.table.token_model, self.table.selectedRanges(), ""),
+                         "Effacer les cellules")
+
+    def write_cells(self, plan, label):
+        from undo_journal import CellsEdit
+        # plan : (lignes df, colonnes, valeurs) ; une écriture vectorisée par colonne, une seule action à annuler
+        model = self.table.token_model
+        if model.read_only or not len(plan[0]):
+            return 0
+        written = self.manager.set_cells(*plan)
+        if not written[0]:
+            return 0
+        self.save_state_for_undo(CellsEdit(*written), label)
+        model.refresh_row_styles(written[0], roles=[])  # un seul dataChanged : texte et styles
+        return len(written[0])
 
     def duplicate_selected_row(self):
-        selected_rows = list(set(index.row() for index in self.table.selectedIndexes()))
-        if not selected_rows:
+        import numpy as np
+        from undo_journal import RowsInserted
+        rows = self.selected_rows()
+        if not len(rows):
             return
 
         times, ok = QInputDialog.getInt(self, "Dupliquer la ligne", "Combien de fois ?", 1, 1)
         if ok:
-            for row in selected_rows:
-                row_data = [
-                    self.table.item(row, col).text() if self.table.item(row, col) else ""
-                    for col in range(self.table.columnCount())
-                ]
-                for _ in range(times):
-                    row_position = self.table.rowCount()
-                    self.table.insertRow(row_position)
-                    for col_idx, value in enumerate(row_data):
-                        self.table.setItem(row_position, col_idx, QTableWidgetItem(value))
+            # Toutes les copies ajoutées en fin de df en une insertion (chaque ligne répétée `times` fois)
+            model = self.table.token_model
+            frame = self.manager.df.iloc[np.repeat(model.df_rows(rows), times)]
+            positions = model.append_rows(frame)
+            self.save_state_for_undo(RowsInserted(positions, self.manager.df.iloc[positions]), "Dupliquer la ligne")
 
     def copy_cells(self):
-        selected = self.table.selectedRanges()
-        if selected:
-            copied_text = ""
-            for r in range(selected[0].topRow(), selected[0].bottomRow() + 1):
-                row_data = []
-                for c in range(selected[0].leftColumn(), selected[0].rightColumn() + 1):
-                    item = self.table.item(r, c)
-                    row_data.append(item.text() if item else "")
-                copied_text += "\t".join(row_data) + "\n"
-            QApplication.clipboard().setText(copied_text)
-        
+        import clipboard
+        # Toutes les plages sélectionnées, sérialisées en une passe (TSV, comme Excel)
+        ranges = self.table.selectedRanges()
+        if ranges:
+            QApplication.clipboard().setText(clipboard.selection_text(self.table.token_model, ranges))
+
     def cut_cells(self):
         self.copy_cells()
         self.clear_selected_cells()
-        
-    def paste_cells(self):
-        clipboard = QApplication.clipboard()
-        text = clipboard.text()
-        if not text:
-            return
 
-        rows = text.splitlines()
-        selected = self.selectedRanges()
-        if not selected:
+    def paste_cells(self):
+        import clipboard
+        text = QApplication.clipboard().text()
+        ranges = self.table.selectedRanges()
+        if not text or not ranges:
             return
-        start_row = selected[0].topRow()
-        start_col = selected[0].leftColumn()
-
-        for r, row_text in enumerate(rows):
-            columns = row_text.split("\t")
-            for c, value in enumerate(columns):
-                row_idx = start_row + r
-                col_idx = start_col + c
 
-                if row_idx >= self.rowCount() or col_idx >= self.columnCount():
-                    continue
-
-                model_col = col_idx - 1  # Décalage : DataFrame n’a pas la checkbox
-                if (row_idx, model_col) in self.locked_cells:
-                    logger.debug(f"🔒 Cellule verrouillée ({row_idx}, {model_col}) → collage ignoré.")
-                    continue
-
-                item = QTableWidgetItem(value)
-                self.setItem(row_idx, col_idx, item)
+        # Texte analysé en une fois (TSV / CSV), écrit en bloc hors cellules verrouillées
+        model = self.table.token_model
+        started = time.perf_counter()
+        grid = clipboard.parse_text(text)
+        if grid.shape == (1, 1) and (len(ranges) > 1 or ranges[0].width() * ranges[0].height() > 1):
+            plan = clipboard.fill_plan(model, ranges, grid.iat[0, 0])  # une valeur : toute la sélection
+        else:
+            top = min(rng.top() for rng in ranges)
+            left = min(rng.left() for rng in ranges)
+            plan = clipboard.paste_plan(model, grid, top, left)
+        count = self.write_cells(plan, "Coller")
+        logger.debug(f"📋 Collage : {count} cellule(s) écrite(s) sur {grid.size} "
+                     f"en {time.perf_counter() - started:.3f} s")
 
     def import_new_tokens(self):
+        from import_sources import ChunkedSource
+        if self.import_future is not None:
+            # Le bouton sert à annuler pendant un import
+            self.import_cancelled.set()
+            self.statusBar().showMessage("Annulation de l'import...")
+            return
+        default = os.path.join(os.path.dirname(self.manager.filepath), config.NEW_TOKENS_FILE)
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Importer des tokens", default,
+            "Nouveaux tokens (*.xlsx *.xlsm *.csv *.jsonl *.ndjson);;Tous les fichiers (*)")
+        if not path:
+            return
         try:
             
             self.table.update_df_from_table()
-            tnew = pd.read_excel("newtokens.xlsx")
-
-            # On nettoie préventivement "checked" si elle est là
-            if "checked" in tnew.columns:
-                tnew = tnew.drop(columns=["checked"])
+            # Lecture et fusion par lots dans un thread ("checked" est retirée par l'import)
+            tnew = ChunkedSource(path)
 
-            self.manager.import_table(tnew)
-            self.load_table(from_file=False)
-            QMessageBox.information(self, "Import réussi", "Les données ont été importées et fusionnées avec succès.")
+            self.start_import(lambda progress, cancelled: self.manager.import_table_async(
+                tnew, locked_cells=self.locked_cells, progress=progress, cancelled=cancelled))
+            self.statusBar().showMessage(f"Import de {tnew.name} en cours...")
         except Exception as e:
             QMessageBox.critical(self, "Erreur d'import", str(e))
 
+    def start_import(self, submit, from_drop=False):
+        # submit(progress, cancelled) -> Future du résultat à publier (voir ExcelManager.import_table_async)
+        self.import_before = self.manager.df
+        self.import_from_drop = from_drop
+        self.import_cancelled = threading.Event()
+        self.import_future = submit(lambda done, total: self.import_signals.progress.emit(done, total or 0),
+                                    self.import_cancelled)
+        self.import_future.add_done_callback(lambda f: self.import_signals.finished.emit(f.exception()))
+        self.set_importing(True)
+
+    def set_drop_watch(self, enabled):
+        # Dossier de dépôt surveillé : tous les fichiers en attente sont importés en une seule fusion
+        folder = config.DROP_FOLDER_PATH
+        if enabled:
+            os.makedirs(folder, exist_ok=True)
+            self.drop_watcher.addPath(folder)
+            logger.info(f"👀 Surveillance du dossier de dépôt {os.path.abspath(folder)}")
+            self.drop_timer.start()  # fichiers déjà présents
+        else:
+            self.drop_watcher.removePaths(self.drop_watcher.directories())
+            self.drop_timer.stop()
+
+    def ingest_drop_folder(self):
+        import drop_folder
+        if not self.drop_button.isChecked():
+            return
+        if self.import_future is not None or self.manager.df is None or self.manager.is_saving():
+            self.drop_timer.start()  # on repasse plus tard
+            return
+        settle = config.DROP_FOLDER_SETTLE_MS / 1000
+        paths = drop_folder.pending_files(config.DROP_FOLDER_PATH, config.DROP_FOLDER_PATTERN, settle)
+        if len(paths) < len(drop_folder.pending_files(config.DROP_FOLDER_PATH, config.DROP_FOLDER_PATTERN)):
+            self.drop_timer.start()  # des fichiers sont encore en cours d'écriture : pris au prochain passage
+        if not paths:
+            return
+        try:
+            self.table.update_df_from_table()
+            self.start_import(lambda progress, cancelled: self.manager.import_files_async(
+                paths, locked_cells=self.locked_cells, progress=progress, cancelled=cancelled,
+                workers=config.DROP_FOLDER_WORKERS), from_drop=True)
+            self.statusBar().showMessage(f"Import de {len(paths)} fichier(s) du dossier de dépôt en cours...")
+        except Exception as e:
+            logger.error(f"❌ ERREUR import du dossier de dépôt : {e}")
+
+    def set_importing(self, importing):
+        # Pendant un import la table reste lisible (défilement, recherche) mais pas modifiable :
+        # le résultat est fusionné à partir de df tel qu'il était au lancement
+        self.table.token_model.read_only = importing
+        self.table.setSortingEnabled(not importing)
+        for button in (self.button, self.undo_button, self.redo_button):
+            button.setEnabled(not importing)
+        # Ajout / suppression / duplication de lignes, verrous et opérations sur les colonnes :
+        # désactivés dans les menus contextuels (read_only), raccourcis d'édition désactivés ici
+        for shortcut in self.edit_shortcuts:
+            shortcut.setEnabled(not importing)
+        self.import_button.setText("Annuler l'import" if importing else "Importer")
+
+    def on_import_progress(self, done, total):
+        if total:
+            self.statusBar().showMessage(f"Import en cours... {min(done * 100 // total, 100)} % ({done}/{total} lignes)")
+        else:
+            self.statusBar().showMessage(f"Import en cours... {done} lignes lues")
+
+    def on_import_finished(self, error):
+        import drop_folder
+        from undo_journal import TableReplaced
+        future, before, from_drop = self.import_future, self.import_before, self.import_from_drop
+        self.import_future = self.import_cancelled = self.import_before = None
+        self.set_importing(False)
+        if isinstance(error, ImportCancelled):
+            self.statusBar().showMessage("Import annulé (table inchangée).", 5000)
+            return
+        try:
+            if error is not None:
+                raise error
+            # Publication : df remplacé d'un bloc puis vue rechargée (la recherche en cours est conservée)
+            prepared = future.result()
+            self.manager.publish_import(prepared)
+            self.load_table(from_file=False, keep_history=True)
+            self.save_state_for_undo(TableReplaced(before, self.manager.df), "Importer")
+            report = self.manager.last_import_report
+            if from_drop:
+                # Fichiers rangés une fois la fusion publiée ; pas de boîte de dialogue à chaque dépôt
+                drop_folder.archive(prepared["files"], drop_folder.IMPORTED_DIR)
+                self.statusBar().showMessage(
+                    f"Dossier de dépôt : {report.get('files', 0)} fichier(s) importé(s) en {report.get('seconds', 0):.1f} s "
+                    f"({report.get('updated', 0)} mis à jour, {report.get('added', 0)} ajoutés, "
+                    f"{len(report.get('failed', []))} en échec).", 10000)
+                self.drop_timer.start()  # fichiers arrivés pendant l'import
+                return
+            self.statusBar().showMessage(f"Import terminé en {report.get('seconds', 0):.1f} s.", 5000)
+            QMessageBox.information(self, "Import réussi", "Les données ont été importées et fusionnées avec succès "
+                                    f"({report.get('updated', 0)} mis à jour, {report.get('added', 0)} ajoutés).")
+        except Exception as e:
+            logger.error(f"❌ ERREUR pendant l'import : {e}")
+            if from_drop:
+                self.statusBar().showMessage(f"Erreur d'import du dossier de dépôt : {e}", 10000)
+            else:
+                QMessageBox.critical(self, "Erreur d'import", str(e))
+
+    @property
+    def locked_cells(self):
+        # Verrous par (clé du token, colonne), tenus par ExcelManager (voir lock_store)
+        return self.manager.locks if self.manager is not None else None
+
     def lock_selected_cells(self):
-        for item in self.table.selectedIndexes():
-            row, col = item.row(), item.column()
-            model_col = col - 1
-            if model_col >= 0:  # Ignore la checkbox
-                self.locked_cells.add((row, model_col))
-
-            item_widget = self.table.item(row, col)
-            if item_widget:
-                font = item_widget.font()
-                font.setBold(True)
-                item_widget.setFont(font)
-                item_widget.setBackground(QColor(80, 80, 80))  
+        self.set_selection_locked(True)
 
     def unlock_selected_cells(self):
-        for item in self.table.selectedIndexes():
-            row, col = item.row(), item.column()
-            model_col = col - 1
-            if model_col >= 0:
-                self.locked_cells.discard((row, model_col))
-            item_widget = self.table.item(row, col)
-            if item_widget:
-                font = item_widget.font()
-                font.setBold(False)
-                item_widget.setFont(font)
-                item_widget.setBackground(QColor(0, 0, 0))  
+        self.set_selection_locked(False)
+
+    def set_selection_locked(self, locked):
+        import numpy as np
+        model = self.table.token_model
+        if model.read_only:
+            return  # import en cours (voir set_importing)
+        # Cellules des plages sélectionnées (comme selected_rows), sans la checkbox
+        rows, columns = [], []
+        for rng in self.table.selectedRanges():
+            range_rows = model.df_rows(np.arange(rng.top(), rng.bottom() + 1))
+            for col in range(max(rng.left(), 1), rng.right() + 1):
+                rows.append(range_rows)
+                columns.extend([model.column_name(col)] * len(range_rows))
+        if not columns:
+            return
+        rows = np.concatenate(rows)
+        skipped = self.manager.set_locked(rows, columns, locked)
+        if skipped:
+            self.statusBar().showMessage(f"{skipped} cellule(s) ignorée(s) : ligne sans contract_address / "
+                                         "token_id.", 5000)
+        # Le style (gras + fond) est lu dans les masques de verrous : seules ces lignes sont relues
+        self.table.token_model.refresh_row_styles(rows)
 
     def load_locked_cells(self):
-        locked_path = os.path.join(os.path.dirname(self.manager.filepath), "locked_cells.json")
-        if os.path.exists(locked_path):
-            with open(locked_path, "r") as f:
-                loaded = json.load(f)
-                self.locked_cells = set()
-                for row, col in loaded:
-                    if row < self.table.rowCount() and col < self.table.columnCount():
-                        self.locked_cells.add((row, col))
+        # Même lecture que la ligne de commande (ExcelManager.load_locked_cells)
+        self.manager.load_locked_cells()
+        if os.path.exists(self.manager.locked_cells_path()):
             print(f"🔐 {len(self.locked_cells)} cellules verrouillées chargées.")
-        else:
-            self.locked_cells = set()
 
     def toggle_check_selection(self, check=True):
         state = Qt.Checked if check else Qt.Unchecked
@@ -651,138 +897,76 @@ class MainWindow(QMainWindow):
         if not selected:
             return
 
+        model = self.table.token_model
         for rng in selected:
-            for row in range(rng.topRow(), rng.bottomRow() + 1):
-                item = self.table.item(row, 0)
-                if item is not None:
-                    item.setCheckState(state)
+            for row in range(rng.top(), rng.bottom() + 1):
+                model.setData(model.index(row, 0), state, Qt.CheckStateRole)
         
    
     """def mark_cell_modified(self, row, col):
         item = self.table.item(row, col)
         if item:
             item.setBackground(QColor(255, 255, 200))"""
-    ### LA PARTIE SUIVANTE EST A PEAUFINER
-    ### probleme dans le stack, il faut regrouper les actions dans un seul stack
-    ### pour undo en une action
-    ### il y a aussi des stacks vide wen undo puis redo
-                    
-    # stacks pour undo
-    def save_state_for_undo(self):
-        self.table.update_df_from_table(skip_columns=[0])  
-
-        #verif table
-        rows = self.table.rowCount()
-        cols = self.table.columnCount()
-        if rows == 0 or cols == 0:
-            print("Table vide ou non initialisée, état ignoré")
-            return
-
-        
-        # Ne pas sauvegarder l'état si on est en train de charger/restaurer
-        if getattr(self, "loading", False):
-            return
 
-        # Capture l'état actuel
-        state = []
-        for row in range(rows):
-            row_data = []
-            for col in range(cols):
-                item = self.table.item(row, col)
-                row_data.append(item.text() if item else "")
-            state.append(row_data)
-
-        # Ne pas sauvegarder si l'état est identique au dernier
-        if self.undo_stack and self.undo_stack[-1] == state:
-            print("Aucun changement détecté, état non sauvegardé.")
+    # Journal d'annulation : chaque action enregistre un delta (voir undo_journal.py),
+    # les actions groupées (collage, effacement...) forment une seule transaction.
+    def save_state_for_undo(self, command=None, label=""):
+        # Les restaurations (undo/redo, chargement) ne passent pas par ici : rien à filtrer
+        if command is None:
             return
 
-        # Sauvegarde l'état dans la pile undo
-        self.undo_stack.append(state)
-
-        # Vide la pile redo dès qu'un nouveau changement est fait
-        self.redo_stack.clear()
-
-        # Limite la taille de la pile undo à 50 entrées
-        if len(self.undo_stack) > 50:
-            self.undo_stack.pop(0)
-
-        print(f"État sauvegardé pour annulation. Taille de la pile : {len(self.undo_stack)}")
+        self.journal.record(command, label)
+        if not self.journal.in_transaction():
+            print(f"Action enregistrée pour annulation. Taille de la pile : {len(self.journal.undo_stack)}"
+                  f" ({self.journal.memory / 1024:.1f} Ko)")
 
     def undo_last_change(self):
-        if len(self.undo_stack) < 2:
+        if not self.journal.can_undo():
             print("Aucun état précédent à restaurer.")
             return
 
-        print(f"Undo demandé. Taille de la pile avant pop : {len(self.undo_stack)}")
-
-
-        # Sauvegarder l'état courant dans redo_stack
-        current_state = self.undo_stack[-1]
-        if current_state:  # Assure que ce n’est pas None
-            self.redo_stack.append(current_state.copy())
-        else:
-            print("État actuel invalide, non ajouté à redo_stack.")
-
-
-            
-        print("Annulation en cours")
-        # Supprimer l'état courant
-        self.undo_stack.pop()
-        self.redo_stack.append(current_state)
-
-        
-        # Restaurer l'état précédent
-        last_state = self.undo_stack[-1]
-
-        
-        self.loading = True  # désactiver temporairement save_state_for_undo pendant le remplissage
-        self.table.blockSignals(True) #timer
-        self.table.setRowCount(len(last_state))
-        self.table.setColumnCount(len(last_state[0]))
-
-        for row_idx, row_data in enumerate(last_state):
-            for col_idx, value in enumerate(row_data):
-                self.table.setItem(row_idx, col_idx, QTableWidgetItem(value))
-        self.table.blockSignals(False) 
-        # self.loading = False
-        QTimer.singleShot(0, lambda: setattr(self, "loading", False))
-        print("Annulation effectuée.")
+        print(f"Undo demandé. Taille de la pile avant pop : {len(self.journal.undo_stack)}")
+        transaction = self.journal.undo(self.manager)
+        self.restore_table_state(transaction)
+        print(f"Annulation effectuée ({transaction.label}).")
 
     def redo_last_change(self):
-        if not self.redo_stack:
+        if not self.journal.can_redo():
             print("Aucun état à refaire.")
             return
 
-        print(f"Redo demandé. Taille de la pile redo : {len(self.redo_stack)}")
+        print(f"Redo demandé. Taille de la pile redo : {len(self.journal.redo_stack)}")
+        transaction = self.journal.redo(self.manager)
+        self.restore_table_state(transaction)
+        print(f"Refaire effectué ({transaction.label}).")
+
+    def restore_table_state(self, transaction):
+        # Rafraîchit uniquement ce que la transaction a touché
+        model = self.table.token_model
+        if transaction.columns_only:
+            model.sync_columns()  # en-tête seulement
+        elif transaction.structural:
+            model.reload()
+        else:
+            # Un seul dataChanged (texte et styles) pour les lignes touchées
+            model.refresh_row_styles([row for row, _ in transaction.cells()], roles=[])
 
-        state_to_restore = self.redo_stack.pop()
-        self.undo_stack.append(state_to_restore)
 
-        self.restore_table_state(state_to_restore)
-        print("Refaire effectué.")
+class SaveSignals(QObject):
+    progress = pyqtSignal(int, int)   # lignes écrites, total
+    finished = pyqtSignal(object)     # None ou l'exception levée
 
-    def restore_table_state(self, state):
-        self.loading = True
-        self.table.blockSignals(True)
-        
-        self.table.setRowCount(len(state))
-        self.table.setColumnCount(len(state[0]))
 
-        for row_idx, row_data in enumerate(state):
-            for col_idx, value in enumerate(row_data):
-                self.table.setItem(row_idx, col_idx, QTableWidgetItem(value))
+class LoadSignals(QObject):
+    finished = pyqtSignal(object)     # None ou l'exception levée
 
-        self.table.blockSignals(False)
-        QTimer.singleShot(0, lambda: setattr(self, "loading", False))
-    
-    ### LA PARTIE PRECEDENTE EST A PEAUFINER
-    ### probleme dans le stack, il faut regrouper les actions dans un seul stack
-    ### pour undo en une action
 
+class ImportSignals(QObject):
+    progress = pyqtSignal(int, int)   # lignes lues, total estimé (0 si inconnu)
+    finished = pyqtSignal(object)     # None ou l'exception levée
 
 
-class TokenTableWidget(QTableWidget):
+class TokenTableWidget(QTableView):
     from logger import logger
 
     def setup_logger(name="token_manager", log_file="token_manager.log", level=logging.DEBUG):
@@ -804,13 +988,27 @@ class TokenTableWidget(QTableWidget):
     logger = setup_logger()
 
     def __init__(self, manager, main_window=None, parent=None):
+        from table_model import TokenTableModel
         super().__init__(parent)
         self.manager = manager
-        self.locked_cells = set()  # (row, column) tuples
+        self.main_window = main_window
         
         assert hasattr(manager, 'df'), "manager must have a 'df' attribute"
-        if not hasattr(self.manager, 'df') or self.manager.df is None:
-            return
+
+        # Vue virtualisée : le modèle lit df, seules les lignes visibles sont peintes
+        self.token_model = TokenTableModel(manager, self)
+        self.setModel(self.token_model)
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.verticalHeader().setDefaultSectionSize(22)
+
+    def rowCount(self):
+        return self.token_model.rowCount()
+
+    def columnCount(self):
+        return self.token_model.columnCount()
+
+    def selectedRanges(self):
+        return list(self.selectionModel().selection())
 
 
     def keyPressEvent(self, event):
@@ -823,15 +1021,14 @@ class TokenTableWidget(QTableWidget):
 
                 # Supprimer contenu des cellules
             elif event.key() in (Qt.Key_Delete, Qt.Key_Backspace):
-                for item in self.selectedItems():
-                        if item is not None:
-                            item.setText("")
+                if self.main_window:
+                    self.main_window.clear_selected_cells()
                 return
 
             else: super().keyPressEvent(event)
 
 
-    def update_df_from_table(self, skip_columns=None):
+    def update_df_from_table(self, skip_columns=None, full=False):
 
         if self.manager.df is None:
                 return
@@ -839,34 +1036,42 @@ class TokenTableWidget(QTableWidget):
         if skip_columns is None:
             skip_columns = []
 
-        for row in range(self.rowCount()):
-            for col in range(1, self.columnCount()):  # col=0 = checkbox
+        # Synchronisation incrémentale : chaque édition est déjà poussée dans df par
+        # le modèle (ExcelManager.set_cell) et suivie dans manager.dirty_cells.
+        if not full:
+            logger.debug(f"🟡 {len(self.manager.dirty_cells)} cellule(s) modifiée(s) depuis la dernière sauvegarde")
+            return
+
+        # Balayage complet (secours explicite) : normalise les chaînes vides en None
+        model = self.token_model
+        for row in range(len(self.manager.df)):  # toutes les lignes de df, recherche active ou non
+            for col in range(1, model.columnCount()):  # col=0 = checkbox
                 model_col = col - 1  # Décalage : DataFrame n’a pas la checkbox
 
                 if col in skip_columns:
                     continue
-                if (row, model_col) in self.locked_cells:
+                if self.manager.is_locked(row, model.column_name(col)):
                     logger.debug(f"🔒 [SKIP] Cellule verrouillée ignorée ({row}, {model_col})")
                     continue
 
-                item = self.item(row, col)
-                value = item.text() if item else None
-                value = value if value != "" else None
-                self.manager.df.iat[row, model_col] = value
+                if self.manager.df.iat[row, model.position(col)] == "":
+                    self.manager.df.iat[row, model.position(col)] = None
 
         logger.info("🟡 Données extraites de la table vers df (sans les cases cochées) :")
         logger.info(self.manager.df.head(10).to_string())
 
     def debug_print_locked_cells(self):
-        for (row, col) in sorted(self.locked_cells):
-            item = self.item(row, col + 1)  # +1 car col=0 est checkbox
-            val = item.text() if item else "N/A"
-            logger.debug(f"[🔒] ({row},{col}) = {val}")
+        for column, mask in self.manager.lock_masks().items():
+            for row in mask.nonzero()[0]:
+                if column in self.manager.df.columns:
+                    val = self.manager.df.iat[row, self.manager.df.columns.get_loc(column)]
+                else:
+                    val = "N/A"
+                logger.debug(f"[🔒] ({row},'{column}') = {val}")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    manager = ExcelManager("tokens.xlsx")
-    window = MainWindow(None, manager)
+    window = MainWindow(None)
     window.show()
     sys.exit(app.exec_())
 
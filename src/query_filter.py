@@ -0,0 +1,126 @@
+# src/query_filter.py
+
+import re
+import shlex
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from search_index import _column_text
+
+
+# colonne:texte  colonne=valeur  colonne!=valeur  colonne>3  colonne<=2026-01-01 ...
+TERM_PATTERN = re.compile(r"^(?P<column>[^\s:<>=!]+)(?P<op>:|>=|<=|!=|=|>|<)(?P<value>.*)$")
+
+
+def split_terms(text):
+    # Découpe en termes, les guillemets regroupent une valeur avec espaces (chain:"binance smart chain")
+    try:
+        return shlex.split(text)
+    except ValueError:  # guillemet non fermé pendant la frappe
+        return text.split()
+
+
+def parse_query(text, columns):
+    """Sépare la requête en filtres (colonne, opérateur, valeur) et texte libre.
+
+    Un terme dont la colonne n'existe pas (ex. une URL "https://...") reste du
+    texte libre, comme une valeur vide en cours de frappe ("chain:").
+    """
+    by_name = {str(col).lower(): col for col in columns}
+    filters, words = [], []
+    for term in split_terms(text):
+        match = TERM_PATTERN.match(term)
+        column = by_name.get(match.group("column").lower()) if match else None
+        if column is None:
+            words.append(term)
+        elif match.group("value") != "":
+            filters.append((column, match.group("op"), match.group("value")))
+    return filters, " ".join(words)
+
+
+def _as_number(value):
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return None if np.isnan(number) else number
+
+
+def _as_date(value):
+    try:
+        return pd.Timestamp(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _compare(values, op, value):
+    if op == "=":
+        return values == value
+    if op == "!=":
+        return values != value
+    if op == ">":
+        return values > value
+    if op == "<":
+        return values < value
+    if op == ">=":
+        return values >= value
+    return values <= value
+
+
+class ColumnParseCache:
+    """Conversions par colonne (texte minuscule, nombres, dates) gardées entre deux requêtes.
+
+    Une entrée reste valable tant que df est le même objet et que la version
+    de la colonne (voir ExcelManager.column_version) n'a pas changé.
+    """
+
+    def __init__(self):
+        self._source = None
+        self._cache = {}  # (colonne, type) -> (version, tableau)
+
+    def get(self, df, column, kind, version):
+        if self._source is None or self._source() is not df:
+            self._cache.clear()
+            self._source = weakref.ref(df)
+        entry = self._cache.get((column, kind))
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        series = df[column]
+        if kind == "number":
+            values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+        elif kind == "date":
+            if pd.api.types.is_datetime64_any_dtype(series):
+                values = series.to_numpy()
+            else:
+                values = pd.to_datetime(series, errors="coerce", format="mixed").to_numpy()
+        else:
+            values = _column_text(series).str.lower().to_numpy(dtype=object)
+        self._cache[(column, kind)] = (version, values)
+        return values
+
+    def mask(self, df, filters, version_of):
+        # Masque booléen vectorisé : ET de tous les filtres
+        mask = np.ones(len(df), dtype=bool)
+        for column, op, value in filters:
+            version = version_of(column)
+            number = _as_number(value) if op != ":" else None
+            date = _as_date(value) if op != ":" and number is None else None
+            if number is not None:
+                values = self.get(df, column, "number", version)
+                with np.errstate(invalid="ignore"):
+                    hit = _compare(values, op, number) & ~np.isnan(values)
+            elif date is not None:
+                values = self.get(df, column, "date", version)
+                hit = _compare(values, op, date.to_datetime64()) & ~pd.isna(values)
+            else:
+                texts = self.get(df, column, "text", version)
+                value = value.lower()
+                if op == ":":
+                    hit = pd.Series(texts, dtype=object).str.contains(value, regex=False).to_numpy(dtype=bool)
+                else:
+                    hit = _compare(texts, op, value)
+            mask &= np.asarray(hit, dtype=bool)
+        return mask
@@ -0,0 +1,176 @@
+# src/recovery_journal.py
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+TIMESTAMP_TAG = "$timestamp"  # {"$timestamp": "2025-06-01T10:30:00"} : date relue en pd.Timestamp
+
+
+def _json_default(value):
+    if isinstance(value, (pd.Timestamp, np.datetime64, datetime)):
+        value = pd.Timestamp(value)
+        return None if pd.isna(value) else {TIMESTAMP_TAG: value.isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _json_object(record):
+    # Inverse de _json_default pour les dates : mêmes valeurs rejouées qu'à l'édition
+    if len(record) == 1 and TIMESTAMP_TAG in record:
+        return pd.Timestamp(record[TIMESTAMP_TAG])
+    return record
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+class RecoveryJournal:
+    """Journal d'écriture anticipée (JSON lines, ajout seul) des modifications de df.
+
+    Première ligne : {"base": {"file": ..., "signature": ...}}, le fichier sur
+    lequel rejouer les lignes suivantes. Chaque modification est une ligne
+    écrite + flush (survit à un plantage du programme) ; fsync au plus une
+    fois par sync_interval secondes pour rester en microsecondes par édition.
+    """
+
+    def __init__(self, path, sync_interval=1.0):
+        self.path = path
+        self.sync_interval = sync_interval
+        self._file = None
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self.records = 0  # lignes écrites depuis l'en-tête (marqueurs compris)
+        self._dropped = 0  # lignes retirées par rebase() : positions absolues des marqueurs
+
+    # --- Écriture ---
+
+    def start(self, base, records=()):
+        with self._lock:
+            self._dropped = 0
+            self._write(base, [json.dumps(r, default=_json_default, ensure_ascii=False) + "\n" for r in records])
+
+    def _write(self, base, records):
+        # (Ré)écrit le journal : en-tête + lignes conservées, via fichier temporaire + os.replace
+        if self._file is not None:
+            self._file.close()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"base": base}) + "\n")
+            f.writelines(records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._last_sync = time.monotonic()
+        self.records = len(records)
+
+    def is_open(self):
+        return self._file is not None
+
+    def append(self, record):
+        line = json.dumps(record, default=_json_default, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush()
+            self.records += 1
+            now = time.monotonic()
+            if now - self._last_sync >= self.sync_interval:
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+
+    def sync(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._last_sync = time.monotonic()
+
+    def mark_snapshot(self, kind):
+        # Marque l'instant d'un instantané (sauvegarde / point de reprise) : les lignes
+        # suivantes sont les modifications faites après lui. Retourne sa position.
+        self.append({"op": "snapshot", "kind": kind})
+        with self._lock:
+            return self._dropped + self.records
+
+    def cancel_snapshot(self, position):
+        with self._lock:
+            at = position - self._dropped
+        if at > 0:
+            self.append({"op": "snapshot_failed", "at": at})
+
+    def rebase(self, base, position):
+        # L'instantané est sur disque : nouveau journal = nouvelle base + lignes écrites après lui
+        with self._lock:
+            if self._file is None:
+                return
+            after = max(position - self._dropped, 0)
+            self._file.flush()
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()[1:]
+            self._dropped += after
+            self._write(base, lines[after:])
+
+    def close(self, delete=False):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+        if delete and os.path.exists(self.path):
+            os.remove(self.path)
+
+    # --- Lecture (reprise après plantage) ---
+
+    @staticmethod
+    def read(path):
+        """(base, lignes) du journal, ou (None, []) ; une dernière ligne tronquée est ignorée."""
+        if not os.path.exists(path):
+            return None, []
+        base, records = None, []
+        with open(path, "r", encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                try:
+                    record = json.loads(line, object_hook=_json_object)
+                except ValueError:
+                    break  # écriture interrompue : tout ce qui précède est valide
+                if i == 0:
+                    base = record.get("base")
+                else:
+                    records.append(record)
+        return base, records
+
+    @staticmethod
+    def replay_plan(base, records, signature_of):
+        """Choisit le fichier de départ et les lignes à rejouer : (fichier, lignes) ou (None, []).
+
+        signature_of(kind) donne la signature actuelle du fichier "xlsx" ou
+        "checkpoint" (None s'il n'existe pas).
+        """
+        if base is None:
+            return None, []
+        if signature_of(base["file"]) == base["signature"]:
+            return base["file"], records
+
+        # Plantage entre l'écriture d'un instantané et la réécriture du journal :
+        # on repart du dernier instantané mené à terme
+        for i in range(len(records) - 1, -1, -1):
+            record = records[i]
+            if record.get("op") != "snapshot":
+                continue
+            cancelled = any(r.get("op") == "snapshot_failed" and r.get("at") == i + 1 for r in records[i + 1:])
+            if not cancelled and signature_of(record["kind"]) is not None:
+                return record["kind"], records[i + 1:]
+        return None, []
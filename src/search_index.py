@@ -0,0 +1,112 @@
+# src/search_index.py
+
+import weakref
+
+import numpy as np
+import pandas as pd
+
+
+SEPARATOR = "\x1f"  # entre deux cellules : une recherche ne déborde pas d'une cellule à l'autre
+SKIP_COLUMNS = ("checked",)
+
+
+def _column_text(series):
+    # Même rendu que TokenTableModel.cell_text (str(valeur), "" pour les vides), sans str() par cellule
+    present = series.notna()
+    if pd.api.types.is_datetime64_any_dtype(series) and series.dt.tz is None \
+            and not (series.dt.microsecond[present] != 0).any() and not (series.dt.nanosecond[present] != 0).any():
+        return series.dt.strftime("%Y-%m-%d %H:%M:%S").where(present, "").astype(object)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.astype(str).astype(object).where(present, "")
+    return series.astype(object).where(present, "").astype(str)
+
+
+def row_texts(frame):
+    # Texte de recherche de chaque ligne : cellules affichées, en minuscules, concaténées
+    columns = [col for col in frame.columns if col not in SKIP_COLUMNS]
+    if not columns or len(frame) == 0:
+        return np.full(len(frame), "", dtype=object)
+    parts = [_column_text(frame[col]).to_numpy(dtype=object) for col in columns]
+    texts = np.empty(len(frame), dtype=object)
+    texts[:] = [SEPARATOR.join(values).lower() for values in zip(*parts)]
+    return texts
+
+
+class SearchIndex:
+    """Texte de recherche par ligne de df, construit une fois puis tenu à jour par ExcelManager.
+
+    Une requête qui prolonge la précédente ("eth" -> "ethe") ne parcourt que les
+    lignes qui correspondaient déjà.
+    """
+
+    def __init__(self):
+        self._texts = np.empty(0, dtype=object)
+        self._source = None  # weakref du DataFrame indexé
+        self._version = 0    # incrémenté à chaque modification du texte indexé
+        self._last = None    # (version, requête, positions trouvées)
+
+    # --- État ---
+
+    def is_current(self, df):
+        return self._source is not None and self._source() is df
+
+    def attach(self, df):
+        self._source = weakref.ref(df) if df is not None else None
+        self._version += 1
+
+    def invalidate(self):
+        self._source = None
+        self._last = None
+
+    def rebuild(self, df):
+        self._texts = row_texts(df) if df is not None else np.empty(0, dtype=object)
+        self._last = None
+        self.attach(df)
+
+    # --- Mises à jour incrémentales ---
+
+    def insert(self, positions, frame, df):
+        positions = np.asarray(positions, dtype=int)
+        texts = np.empty(len(self._texts) + len(positions), dtype=object)
+        inserted = np.zeros(len(texts), dtype=bool)
+        inserted[positions] = True
+        texts[~inserted] = self._texts
+        texts[inserted] = row_texts(frame)
+        self._texts = texts
+        self.attach(df)
+
+    def delete(self, positions, df):
+        self._texts = np.delete(self._texts, np.asarray(list(positions), dtype=int))
+        self.attach(df)
+
+    def reorder(self, order, df):
+        self._texts = self._texts[np.asarray(order)]
+        self.attach(df)
+
+    def update(self, position, df):
+        self._texts[position] = row_texts(df.iloc[[position]])[0]
+        self._version += 1
+
+    def update_rows(self, positions, df):
+        positions = np.asarray(positions, dtype=np.int64)
+        self._texts[positions] = row_texts(df.iloc[positions])
+        self._version += 1
+
+    # --- Recherche ---
+
+    def search(self, query):
+        """Positions (triées) des lignes contenant query, insensible à la casse."""
+        query = query.strip().lower()
+        if not query:
+            return np.arange(len(self._texts))
+
+        candidates = None
+        last = self._last
+        if last is not None and last[0] == self._version and last[1] in query:
+            candidates = last[2]  # affinage : seules les lignes déjà trouvées peuvent encore correspondre
+
+        texts = self._texts if candidates is None else self._texts[candidates]
+        found = pd.Series(texts, dtype=object).str.contains(query, regex=False).to_numpy(dtype=bool)
+        positions = np.flatnonzero(found) if candidates is None else candidates[found]
+        self._last = (self._version, query, positions)
+        return positions
@@ -0,0 +1,412 @@
+# src/table_model.py
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt5.QtGui import QColor, QFont
+import numpy as np
+import pandas as pd
+
+import config
+
+
+CHECK_COLUMN = "checked"
+CHECK_HEADER = "✔"
+LOCKED_BACKGROUND = QColor(80, 80, 80)
+MODIFIED_BACKGROUND = QColor(config.MODIFIED_ROW_COLOR)
+INACTIVE_BACKGROUND = QColor(config.INACTIVE_ROW_COLOR)
+STYLE_ROLES = [Qt.BackgroundRole, Qt.FontRole]
+
+
+class TokenTableModel(QAbstractTableModel):
+    """Modèle virtualisé au-dessus de ExcelManager.df.
+
+    Aucune donnée n'est copiée : la vue ne demande data() que pour les
+    cellules visibles, lues directement dans le DataFrame. La colonne 0 de la
+    vue est la case à cocher (colonne 'checked' du DataFrame), les autres
+    colonnes suivent l'ordre de df sans 'checked'.
+
+    Une recherche (set_search) restreint les lignes affichées : la ligne `row`
+    de la vue est alors la ligne df_row(row) de df. Les signaux et les
+    cellules verrouillées utilisent toujours les positions dans df.
+
+    Les styles (verrouillée, ligne modifiée, ligne inactive) sont lus dans des
+    masques de ExcelManager au moment de l'affichage : aucun style n'est
+    stocké par cellule, un changement n'émet dataChanged que pour ses lignes.
+    """
+
+    # (ligne df, colonne vue, ancienne valeur, nouvelle valeur)
+    cellEdited = pyqtSignal(int, int, object, object)
+    # permutation appliquée aux lignes de df par un tri
+    rowsReordered = pyqtSignal(object)
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.columns = []      # noms des colonnes de données (sans 'checked')
+        self._positions = []   # position de chaque colonne dans df
+        self.search_text = ""
+        self._rows = None          # positions df affichées (triées), None = toutes
+        self.read_only = False     # pendant un import en arrière-plan : lecture seule
+        self._refresh_columns()
+
+    # --- Structure ---
+
+    def _refresh_columns(self):
+        df = self.manager.df
+        if df is None:
+            self.columns = []
+            self._positions = []
+            return
+        self.columns = [col for col in df.columns if col != CHECK_COLUMN]
+        self._positions = [df.columns.get_loc(col) for col in self.columns]
+
+    def _refresh_rows(self):
+        if not self.search_text or self.manager.df is None:
+            self._rows = None
+        else:
+            self._rows = self.manager.query(self.search_text)
+
+    def sync_columns(self):
+        """Après une opération sur les colonnes de df (ajout, suppression, renommage, déplacement
+        d'une colonne) : notification de l'en-tête seulement, sans reset (largeurs, colonnes masquées
+        et sélection conservées). Reset si plusieurs colonnes ont changé à la fois."""
+        df = self.manager.df
+        old = self.columns
+        new = [col for col in df.columns if col != CHECK_COLUMN] if df is not None else []
+        changed = [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+        first = changed[0] if changed else min(len(old), len(new))
+        if new == old:
+            self._refresh_columns()  # positions dans df (colonne 'checked' déplacée)
+        elif len(new) == len(old) + 1 and new[:first] + new[first + 1:] == old:
+            self.beginInsertColumns(QModelIndex(), first + 1, first + 1)
+            self._refresh_columns()
+            self.endInsertColumns()
+        elif len(new) == len(old) - 1 and old[:first] + old[first + 1:] == new:
+            self.beginRemoveColumns(QModelIndex(), first + 1, first + 1)
+            self._refresh_columns()
+            self.endRemoveColumns()
+        elif len(new) == len(old) and len(changed) == 1:
+            self._refresh_columns()
+            self.headerDataChanged.emit(Qt.Horizontal, first + 1, first + 1)  # renommage
+        elif sorted(map(str, new)) == sorted(map(str, old)) and self._moved(old, new, changed):
+            source, target = self._moved(old, new, changed)
+            # destination au sens de Qt : index avant déplacement, après la colonne cible si vers la droite
+            self.beginMoveColumns(QModelIndex(), source + 1, source + 1, QModelIndex(),
+                                  target + 2 if target > source else target + 1)
+            self._refresh_columns()
+            self.endMoveColumns()
+        else:
+            self.reload()
+            return
+        if self.search_text and len(new) != len(old):
+            self.set_search(self.search_text)  # les valeurs cherchées ont changé avec la colonne
+
+    @staticmethod
+    def _moved(old, new, changed):
+        # (position avant, position après) si new est old avec une seule colonne déplacée, sinon None
+        first, last = changed[0], changed[-1]
+        for source, target in ((first, last), (last, first)):
+            moved = old[:source] + old[source + 1:]
+            moved.insert(target, old[source])
+            if moved == new:
+                return source, target
+        return None
+
+    def reload(self):
+        self.beginResetModel()
+        self._refresh_columns()
+        self._refresh_rows()
+        self.endResetModel()
+
+    def set_search(self, text):
+        # Visibilité appliquée en bloc : un seul reset au lieu d'un setRowHidden par ligne
+        self.beginResetModel()
+        self.search_text = text.strip()
+        self._refresh_rows()
+        self.endResetModel()
+
+    def df_row(self, row):
+        """Position dans df de la ligne vue `row`."""
+        return row if self._rows is None else int(self._rows[row])
+
+    def df_rows(self, rows):
+        """Positions dans df des lignes vue `rows` (tableau)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return rows if self._rows is None else np.asarray(self._rows, dtype=np.int64)[rows]
+
+    def view_row(self, df_row):
+        """Ligne vue de la position df `df_row`, ou -1 si elle est filtrée."""
+        if self._rows is None:
+            return df_row
+        row = int(np.searchsorted(self._rows, df_row))
+        return row if row < len(self._rows) and self._rows[row] == df_row else -1
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.manager.df is None:
+            return 0
+        if self._rows is not None:
+            return len(self._rows)
+        return len(self.manager.df)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.manager.df is None:
+            return 0
+        return len(self.columns) + 1
+
+    def column_name(self, col):
+        if col <= 0:
+            return CHECK_HEADER
+        return self.columns[col - 1]
+
+    def position(self, col):
+        """Position dans df de la colonne vue `col` (col >= 1)."""
+        return self._positions[col - 1]
+
+    # --- Lecture ---
+
+    def cell_value(self, row, col):
+        return self.manager.df.iat[self.df_row(row), self._positions[col - 1]]
+
+    def cell_text(self, row, col):
+        value = self.cell_value(row, col)
+        if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+            return ""
+        return str(value)
+
+    def is_checked(self, row):
+        df = self.manager.df
+        if CHECK_COLUMN not in df.columns:
+            return False
+        return bool(df.iat[self.df_row(row), df.columns.get_loc(CHECK_COLUMN)])
+
+    def is_locked(self, row, col):
+        # Verrous par (clé du token, colonne) : lecture O(1) dans le masque de la colonne
+        return col > 0 and self.manager.is_locked(self.df_row(row), self.columns[col - 1])
+
+    def background(self, row, col):
+        # Priorité : cellule verrouillée, ligne modifiée depuis la sauvegarde, ligne inactive (actif = 0)
+        if self.is_locked(row, col):
+            return LOCKED_BACKGROUND
+        df_row = self.df_row(row)
+        if self.manager.is_modified(df_row):
+            return MODIFIED_BACKGROUND
+        if self.manager.is_inactive(df_row):
+            return INACTIVE_BACKGROUND
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+
+        if role == Qt.BackgroundRole:
+            return self.background(row, col)
+        if col == 0:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if self.is_checked(row) else Qt.Unchecked
+            return None
+
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.cell_text(row, col)
+        if role == Qt.FontRole and self.is_locked(row, col):
+            font = QFont()
+            font.setBold(True)
+            return font
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            if 0 <= section < self.columnCount():
+                return self.column_name(section)
+            return None
+        return str(self.df_row(section) + 1)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if self.read_only:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == 0:
+            return Qt.ItemIsUserCheckable | Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    # --- Écriture ---
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or self.read_only:
+            return False
+        row, col = index.row(), index.column()
+
+        if col == 0:
+            if role != Qt.CheckStateRole:
+                return False
+            df = self.manager.df
+            if CHECK_COLUMN not in df.columns:
+                df[CHECK_COLUMN] = False
+                self._refresh_columns()
+            df.iat[self.df_row(row), df.columns.get_loc(CHECK_COLUMN)] = (value == Qt.Checked)
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+            return True
+
+        if role != Qt.EditRole:
+            return False
+        if self.is_locked(row, col):
+            print(f"[🔒 VERROUILLÉ] Cellule ({row}, {col}) → modification annulée.")
+            return False
+
+        old_value = self.cell_value(row, col)
+        new_value = "" if value is None else str(value)
+        old_text = self.cell_text(row, col)
+        if new_value == old_text:
+            return False
+
+        # Seule la cellule éditée est poussée dans df (suivie dans manager.dirty_cells)
+        self.manager.set_cell(self.df_row(row), self.columns[col - 1], new_value)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        self.refresh_row_styles([self.df_row(row)])  # fond de la ligne (modifiée / inactive)
+        self.cellEdited.emit(self.df_row(row), col, old_value, new_value)
+        return True
+
+    def refresh_cells(self, top, left, bottom, right):
+        if self.rowCount() == 0 or self.columnCount() == 0:
+            return
+        self.dataChanged.emit(self.index(top, left), self.index(bottom, right))
+
+    def refresh_cell(self, df_row, column):
+        if column not in self.columns or df_row >= len(self.manager.df):
+            return
+        row = self.view_row(df_row)
+        if row >= 0:
+            index = self.index(row, self.columns.index(column) + 1)
+            self.dataChanged.emit(index, index)
+
+    def refresh_row_styles(self, df_rows, roles=STYLE_ROLES):
+        """Styles à relire pour ces lignes de df : un seul dataChanged, de la première à la
+        dernière ligne affichée concernée (la vue ne redessine que ce qui est visible)."""
+        if self.rowCount() == 0:
+            return
+        rows = np.asarray(df_rows, dtype=np.int64)
+        if self._rows is not None:
+            rows = np.intersect1d(self._rows, rows, assume_unique=False)
+            rows = np.searchsorted(self._rows, rows)
+        rows = rows[(rows >= 0) & (rows < self.rowCount())]
+        if rows.size:
+            self.dataChanged.emit(self.index(int(rows.min()), 0),
+                                  self.index(int(rows.max()), self.columnCount() - 1), roles)
+
+    def refresh_styles(self):
+        # Ensemble des lignes (après une sauvegarde, un rechargement des verrous)
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, self.columnCount() - 1),
+                                  STYLE_ROLES)
+
+    # --- Lignes ---
+
+    def _blank_rows(self, count):
+        df = self.manager.df
+        blank = pd.DataFrame({col: [None] * count for col in df.columns}, columns=df.columns)
+        if CHECK_COLUMN in blank.columns:
+            blank[CHECK_COLUMN] = False
+        return blank
+
+    def _shift_rows(self, view_row, inserted=None, deleted=None):
+        # Met à jour les positions filtrées après insertion / suppression dans df
+        rows = self._rows
+        if deleted is not None:
+            rows = np.delete(rows, np.flatnonzero(np.isin(rows, deleted)))
+            rows = rows - np.searchsorted(deleted, rows)
+        if inserted is not None:
+            rows = np.where(rows >= inserted[0], rows + len(inserted), rows)
+            rows = np.insert(rows, view_row, inserted)  # lignes ajoutées visibles même hors recherche
+        self._rows = rows
+
+    def insertRows(self, row, count, parent=QModelIndex()):
+        df = self.manager.df
+        if df is None or count <= 0:
+            return False
+        start = len(df) if row >= self.rowCount() else self.df_row(row)
+        self.beginInsertRows(QModelIndex(), row, row + count - 1)
+        self.manager.insert_rows(range(start, start + count), self._blank_rows(count))
+        if self._rows is not None:
+            self._shift_rows(row, inserted=np.arange(start, start + count))
+        self.endInsertRows()
+        return True
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        df = self.manager.df
+        if df is None or count <= 0:
+            return False
+        positions = [self.df_row(r) for r in range(row, row + count)]
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        self.manager.delete_rows(positions)
+        if self._rows is not None:
+            self._shift_rows(row, deleted=np.asarray(positions))
+        self.endRemoveRows()
+        return True
+
+    def duplicate_row(self, row):
+        self.append_rows(self.manager.df.iloc[[self.df_row(row)]])
+
+    def append_rows(self, frame):
+        """Ajoute les lignes de frame en fin de df : une seule insertion dans ExcelManager, une
+        seule notification. Retourne leurs positions dans df."""
+        df = self.manager.df
+        start, count = len(df), len(frame)
+        if count == 0:
+            return []
+        view_end = self.rowCount()
+        self.beginInsertRows(QModelIndex(), view_end, view_end + count - 1)
+        self.manager.insert_rows(range(start, start + count), frame)
+        if self._rows is not None:
+            self._shift_rows(view_end, inserted=np.arange(start, start + count))
+        self.endInsertRows()
+        return list(range(start, start + count))
+
+    def remove_view_rows(self, rows):
+        """Supprime les lignes vue `rows` en une seule suppression dans ExcelManager : notification
+        de la plage si elles se suivent, sinon un seul reset. Retourne (positions df, lignes supprimées)."""
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        if not len(rows):
+            return [], None
+        positions = self.df_rows(rows)
+        contiguous = rows[-1] - rows[0] + 1 == len(rows)
+        if contiguous:
+            self.beginRemoveRows(QModelIndex(), int(rows[0]), int(rows[-1]))
+        else:
+            self.beginResetModel()
+        removed = self.manager.delete_rows(positions)
+        if self._rows is not None:
+            self._shift_rows(int(rows[0]), deleted=positions)
+        if contiguous:
+            self.endRemoveRows()
+        else:
+            self.endResetModel()
+        return positions.tolist(), removed
+
+    # --- Tri ---
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        df = self.manager.df
+        if df is None or column <= 0 or column >= self.columnCount():
+            return
+        name = self.column_name(column)
+
+        def sort_key(series):
+            numbers = pd.to_numeric(series, errors="coerce")
+            if numbers.notna().sum() == series.notna().sum():
+                return numbers
+            return series.astype(object).where(series.notna(), "").astype(str)
+
+        permutation = df.reset_index(drop=True).sort_values(
+            name, ascending=(order == Qt.AscendingOrder), kind="mergesort",
+            na_position="last", key=sort_key
+        ).index.to_numpy()
+
+        self.layoutAboutToBeChanged.emit()
+        self.manager.reorder_rows(permutation)
+        if self._rows is not None:
+            # Mêmes lignes affichées, à leurs nouvelles positions
+            self._rows = np.sort(np.argsort(permutation, kind="stable")[self._rows])
+        self.layoutChanged.emit()
+        self.rowsReordered.emit(permutation)
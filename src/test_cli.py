@@ -0,0 +1,83 @@
+import json
+import os
+
+import pandas as pd
+
+import cli
+from conftest import HEADERS, token_rows
+
+
+def run(capsys, *argv):
+    code = cli.main(list(argv))
+    out, err = capsys.readouterr()
+    return code, out, err
+
+
+def new_tokens(tmp_path):
+    # 4 tokens déjà présents (mis à jour) et 3 nouveaux
+    path = str(tmp_path / "new.csv")
+    pd.DataFrame(token_rows(15)[8:], columns=HEADERS).assign(collection="imported").to_csv(path, index=False)
+    return path
+
+
+def test_stats_json_only_result_on_stdout(workbook, capsys):
+    code, out, err = run(capsys, "--json", "stats", "--file", workbook)
+    assert code == 0
+    stats = json.loads(out)
+    assert stats["rows"] == 12 and stats["duplicate_keys"] == 0
+    assert stats["chains"] == {"ethereum": 12}
+    assert "Fichier chargé" in err  # messages du chargement sur stderr
+
+
+def test_stats_text_output(workbook, capsys):
+    code, out, _ = run(capsys, "stats", "--file", workbook)
+    assert code == 0
+    assert "rows : 12" in out.splitlines()
+
+
+def test_export_csv(workbook, tmp_path, capsys):
+    output = str(tmp_path / "out.csv")
+    code, out, _ = run(capsys, "export", "--file", workbook, "--format", "csv", "-o", output, "--json")
+    assert code == 0
+    assert json.loads(out)["rows"] == 12
+    exported = pd.read_csv(output)
+    assert exported.columns.tolist() == HEADERS and len(exported) == 12
+
+
+def test_export_missing_workbook_fails_without_creating_it(tmp_path, capsys):
+    missing = str(tmp_path / "absent.xlsx")
+    code, out, err = run(capsys, "export", "--file", missing)
+    assert code == 1 and out == ""
+    assert "introuvable" in err
+    assert not os.path.exists(missing)
+
+
+def test_import_merges_and_saves(workbook, tmp_path, capsys):
+    code, out, _ = run(capsys, "import", new_tokens(tmp_path), "--file", workbook, "--json")
+    assert code == 0
+    result = json.loads(out)
+    assert (result["updated"], result["added"], result["rows"], result["saved"]) == (4, 3, 15, True)
+
+    code, out, _ = run(capsys, "stats", "--file", workbook, "--json")
+    assert json.loads(out)["rows"] == 15
+
+
+def test_import_dry_run_leaves_workbook_untouched(workbook, tmp_path, capsys):
+    before = os.path.getmtime(workbook), os.path.getsize(workbook)
+    code, out, _ = run(capsys, "import", new_tokens(tmp_path), "--file", workbook, "--dry-run", "--json")
+    assert code == 0 and json.loads(out)["saved"] is False
+    assert (os.path.getmtime(workbook), os.path.getsize(workbook)) == before
+
+
+def test_import_refused_while_recovery_journal_exists(workbook, tmp_path, capsys):
+    with open(workbook + ".journal", "w"):
+        pass  # fichier ouvert dans l'interface
+    code, _, err = run(capsys, "import", new_tokens(tmp_path), "--file", workbook)
+    assert code == 1 and "--force" in err
+    code, _, _ = run(capsys, "import", new_tokens(tmp_path), "--file", workbook, "--force")
+    assert code == 0
+
+
+def test_unreadable_source_exit_code(workbook, tmp_path, capsys):
+    code, _, err = run(capsys, "import", str(tmp_path / "new.ods"), "--file", workbook)
+    assert code == 1 and "Format non pris en charge" in err
@@ -0,0 +1,95 @@
+import numpy as np
+
+import clipboard
+
+
+class Range:
+    # Même accès que QItemSelectionRange (bornes incluses)
+    def __init__(self, top, left, bottom, right):
+        self._top, self._left, self._bottom, self._right = top, left, bottom, right
+
+    def top(self):
+        return self._top
+
+    def left(self):
+        return self._left
+
+    def bottom(self):
+        return self._bottom
+
+    def right(self):
+        return self._right
+
+
+class Model:
+    # Ce que clipboard lit de TokenTableModel : colonne 0 = cases à cocher, rows = lignes df visibles
+    def __init__(self, manager, rows=None):
+        self.manager = manager
+        self.columns = [col for col in manager.df.columns if col != "checked"]
+        self.rows = rows
+
+    def rowCount(self):
+        return len(self.manager.df) if self.rows is None else len(self.rows)
+
+    def columnCount(self):
+        return len(self.columns) + 1
+
+    def column_name(self, col):
+        return self.columns[col - 1]
+
+    def position(self, col):
+        return self.manager.df.columns.get_loc(self.columns[col - 1])
+
+    def df_rows(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        return rows if self.rows is None else np.asarray(self.rows, dtype=np.int64)[rows]
+
+
+def test_parse_text_tsv_keeps_empty_cells_and_ragged_rows():
+    grid = clipboard.parse_text("a\tb\tc\n\te\nf\n")
+    assert grid.shape == (3, 3)
+    assert grid.iloc[0].tolist() == ["a", "b", "c"]
+    assert grid.iloc[1].tolist()[:2] == ["", "e"] and grid.iat[1, 2] is None
+    assert grid.iat[2, 0] == "f"
+
+
+def test_parse_text_csv_and_quoted_fields():
+    grid = clipboard.parse_text('x,"y, z"\n1,2\n')
+    assert grid.values.tolist() == [["x", "y, z"], ["1", "2"]]
+
+
+def test_parse_text_single_column_when_not_csv():
+    assert clipboard.parse_text("Hello, world").values.tolist() == [["Hello, world"]]
+    assert clipboard.parse_text("a,b\nc\n").values.tolist() == [["a,b"], ["c"]]
+
+
+def test_selection_text_is_tsv_block(manager):
+    model = Model(manager)
+    col = model.columns.index("collection") + 1
+    text = clipboard.selection_text(model, [Range(0, col, 1, col + 1), Range(3, col, 3, col)])
+    rows = text.splitlines()
+    assert rows[0].split("\t") == ["col0", "0"]
+    assert rows[2].split("\t") == ["col3", ""]  # cellule du bloc non sélectionnée
+    assert len(rows) == 3
+
+
+def test_paste_plan_skips_locked_cells_and_overflow(manager):
+    model = Model(manager, rows=[5, 6, 7])  # recherche active : 3 lignes visibles
+    col = model.columns.index("collection") + 1
+    manager.set_locked([6], ["collection"])
+    grid = clipboard.parse_text("a\t1\nb\t2\nc\t3\nd\t4\n")
+    rows, columns, values = clipboard.paste_plan(model, grid, 0, col)
+    cells = sorted(zip(rows.tolist(), columns.tolist(), values.tolist()))
+    assert cells == [(5, "collection", "a"), (5, "qtt_owned", "1"), (6, "qtt_owned", "2"),
+                     (7, "collection", "c"), (7, "qtt_owned", "3")]
+
+    manager.set_cells(rows, columns, values)
+    assert manager.df.loc[[5, 6, 7], "collection"].tolist() == ["a", "col2", "c"]
+    assert manager.df.loc[[5, 6, 7], "qtt_owned"].astype(str).tolist() == ["1", "2", "3"]
+
+
+def test_fill_plan_ignores_checkbox_column(manager):
+    model = Model(manager)
+    rows, columns, values = clipboard.fill_plan(model, [Range(0, 0, 1, 2)], "")
+    assert sorted(set(columns.tolist())) == sorted(model.columns[:2])
+    assert len(rows) == 4 and set(values.tolist()) == {""}
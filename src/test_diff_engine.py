@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+from diff_engine import RowHashes, column_hash, diff_frames, series_hashes
+
+
+def frame():
+    return pd.DataFrame({
+        "contract_address": ["0xa", "0xa", "0xb"],
+        "token_id": ["1", "2", "1"],
+        "chain": pd.Categorical(["ethereum", "matic", None]),
+        "qtt_owned": [1, 2, 3],
+    })
+
+
+def test_column_hash_follows_displayed_text_not_dtype():
+    df = frame()
+    assert column_hash(df["chain"]) == column_hash(df["chain"].astype(object))
+    assert column_hash(pd.Series([1, None, ""], dtype=object)) == column_hash(pd.Series(["1", np.nan, None]))
+    assert column_hash(df["qtt_owned"]) != column_hash(df["qtt_owned"][::-1].reset_index(drop=True))
+
+
+def test_row_hashes_are_sums_of_series_hashes():
+    df = frame()
+    hashes = RowHashes()
+    hashes.rebuild(df)
+    # Même empreinte de colonne <=> même contribution aux empreintes de lignes
+    other = df.assign(chain=df["chain"].astype(object))
+    assert column_hash(other["chain"]) == column_hash(df["chain"])
+    assert np.array_equal(series_hashes(other["chain"], df["chain"].dtype), series_hashes(df["chain"]))
+    assert hashes.fingerprint_of(other) == hashes.fingerprint()
+
+
+def test_fingerprint_tracks_edits_and_reverts():
+    df = frame()
+    hashes = RowHashes()
+    hashes.rebuild(df)
+    before = hashes.fingerprint()
+    hashes.update_cell(1, "qtt_owned", 2, 5)
+    assert hashes.fingerprint() != before
+    hashes.update_cell(1, "qtt_owned", 5, 2)
+    assert hashes.fingerprint() == before
+
+
+def test_column_operations_match_a_rebuild():
+    df = frame()
+    hashes = RowHashes()
+    hashes.rebuild(df)
+    df.insert(2, "notes", ["x", None, "y"])
+    hashes.add_column("notes", df)
+    df.rename(columns={"chain": "network"}, inplace=True)
+    hashes.rename_column("chain", "network", df)
+    values = df.pop("qtt_owned")
+    hashes.delete_column("qtt_owned", values, df)
+
+    rebuilt = RowHashes()
+    rebuilt.rebuild(df)
+    assert np.array_equal(hashes.row_hashes(), rebuilt.row_hashes())
+    assert hashes.fingerprint() == rebuilt.fingerprint()
+
+
+def test_row_ids_follow_rows_and_grow_on_insert():
+    df = frame()
+    hashes = RowHashes()
+    hashes.rebuild(df)
+    first = hashes.row_ids().tolist()
+    df = pd.concat([df.iloc[[1]], df], ignore_index=True)
+    hashes.insert_rows([0], df)
+    df = df.iloc[[3, 2, 1, 0]].reset_index(drop=True)
+    hashes.reorder([3, 2, 1, 0], df)
+    df = df.drop(index=1).reset_index(drop=True)
+    hashes.delete_rows([1], df)
+    assert hashes.row_ids().tolist() == [first[2], first[0], max(first) + 1]
+
+
+def test_copies_of_saved_rows_are_modified(manager):
+    copy = manager.df.iloc[[2, 2]]
+    manager.insert_rows([0, len(manager.df) + 1], copy)  # avant et après l'original (ligne 3)
+    assert manager.modified_rows().nonzero()[0].tolist() == [0, len(manager.df) - 1]
+    manager.delete_rows([0])
+    manager.reorder_rows(list(range(len(manager.df)))[::-1])
+    assert manager.modified_rows().nonzero()[0].tolist() == [0]  # la copie, pas l'original
+
+    manager.save_excel()
+    assert not manager.modified_rows().any()
+
+
+def test_reinserted_rows_are_not_modified(manager):
+    # Suppression annulée (RowsDeleted.undo) : mêmes lignes que le classeur sauvegardé
+    removed = manager.delete_rows([4, 5])
+    manager.insert_rows([4, 5], removed)
+    manager.set_cell(0, "collection", "edited")
+    assert manager.modified_rows().nonzero()[0].tolist() == [0]
+
+
+def test_diff_skips_columns_with_equal_hashes():
+    before = frame()
+    after = before.assign(qtt_owned=[1, 7, 3], chain=before["chain"].astype(object))
+    diff = diff_frames(before, after, before_hash=lambda c: column_hash(before[c]),
+                       after_hash=lambda c: column_hash(after[c]))
+    assert "chain" in diff.skipped_columns
+    assert list(diff.changed) == ["qtt_owned"]
+    assert diff.cells() == [(1, "qtt_owned", 2, 7)]
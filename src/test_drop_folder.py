@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+
+import drop_folder
+from conftest import HEADERS, token_rows
+from url_keys import UrlKeyExtractor
+
+
+def drop(folder, name, rows, **values):
+    frame = pd.DataFrame(rows, columns=HEADERS).assign(**values)
+    path = str(folder / name)
+    frame.to_csv(path, index=False)
+    return path
+
+
+def test_coalesce_keeps_last_non_empty_value_per_token():
+    old = pd.DataFrame({"contract_address": ["0xa", "0xa", None], "token_id": ["1", "2", None],
+                        "collection": ["old", "old2", "sans clé"], "floor_price": [1.0, 2.0, 3.0]})
+    new = pd.DataFrame({"contract_address": ["0xa"], "token_id": ["1"], "collection": [""], "floor_price": [5.0]})
+    frame, url_keys = drop_folder.coalesce([old, new])
+    assert url_keys is None  # pas de colonne url
+    assert frame[["token_id", "collection", "floor_price"]].values.tolist()[:2] == [
+        ["1", "old", 5.0], ["2", "old2", 2.0]]
+    assert pd.isna(frame.loc[2, "token_id"]) and frame.loc[2, "collection"] == "sans clé"
+
+
+def test_read_files_coalesces_files_and_carries_url_keys(tmp_path):
+    rows = token_rows(6)
+    first = drop(tmp_path, "a.csv", rows[:4], collection="first")
+    second = drop(tmp_path, "b.csv", rows[2:], collection="second")
+    with open(second, "a") as f:
+        f.write("0xc,,ethereum,pas une url,broken,1,1.0,1\n")
+
+    frame, (keys, invalid), read, failed = drop_folder.read_files([first, second], workers=2)
+    assert read == [first, second] and failed == []
+    assert len(frame) == 7  # 6 tokens distincts + la ligne sans token_id
+    assert frame.set_index("token_id").loc[["0", "3", "5"], "collection"].tolist() == ["first", "second", "second"]
+    # Clés transmises telles que UrlKeyExtractor les calculerait sur le tableau fusionné
+    expected_keys, expected_invalid = UrlKeyExtractor().extract(frame["url"])
+    pd.testing.assert_frame_equal(keys, expected_keys)
+    assert invalid.tolist() == expected_invalid.tolist() == [6]
+
+
+def test_import_files_merges_once_and_archives(manager, tmp_path, monkeypatch):
+    folder = tmp_path / "drop"
+    folder.mkdir()
+    rows = token_rows(16)
+    first = drop(folder, "a.csv", rows[8:14], collection="first")
+    second = drop(folder, "b.csv", rows[10:], collection="second")
+    broken = str(folder / "c.xlsx")
+    with open(broken, "wb") as f:
+        f.write(b"pas un classeur")
+
+    parsed = []
+    extract = manager.url_keys.extract
+    monkeypatch.setattr(manager.url_keys, "extract", lambda urls: parsed.append(len(urls)) or extract(urls))
+    report = manager.import_files([first, second, broken], workers=2)
+
+    assert parsed == [12]  # URL de la table seulement : celles des fichiers ne sont pas reparsées
+    assert (report["files"], report["updated"], report["added"]) == (2, 4, 4)
+    assert report["failed"] == [broken]
+    assert manager.df.loc[9, "collection"] == "first"
+    assert manager.df.loc[10, "collection"] == "second"
+    assert sorted(os.listdir(folder / drop_folder.IMPORTED_DIR)) == ["a.csv", "b.csv"]
+    assert os.listdir(folder / drop_folder.FAILED_DIR) == ["c.xlsx"]
+    assert drop_folder.pending_files(str(folder), "*") == []
+
+
+def test_archive_keeps_earlier_file_with_same_name(tmp_path):
+    path = drop(tmp_path, "a.csv", token_rows(1))
+    drop_folder.archive([path], drop_folder.IMPORTED_DIR)
+    drop(tmp_path, "a.csv", token_rows(2))
+    drop_folder.archive([path], drop_folder.IMPORTED_DIR)
+    archived = os.listdir(tmp_path / drop_folder.IMPORTED_DIR)
+    assert len(archived) == 2 and "a.csv" in archived
@@ -1,3 +1,15 @@
+import glob
+import os
+import threading
+from datetime import date, datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+from openpyxl.styles import Font
+
+import excel_manager
+from conftest import HEADERS, token_rows, write_workbook
 from excel_manager import ExcelManager
 
 def main():
@@ -30,5 +42,322 @@ def main():
     
     print("✅ Test terminé.")
 
+# --- Tests pytest (fixtures workbook / manager : voir conftest.py) ---
+
+def reload(path):
+    manager = ExcelManager(path, use_cache=False, use_recovery=False)
+    manager.load_excel()
+    return manager
+
+
+def test_background_save_keeps_later_edits_dirty(manager, monkeypatch):
+    writing, release = threading.Event(), threading.Event()
+    write_workbook = excel_manager._write_workbook
+
+    def slow_write(*args):
+        writing.set()
+        release.wait(5)
+        return write_workbook(*args)
+
+    monkeypatch.setattr(excel_manager, "_write_workbook", slow_write)
+    manager.delete_rows([0])  # structure changée : écriture complète
+    future = manager.save_excel_async()
+    assert writing.wait(5) and manager.is_saving()
+    manager.set_cell(0, "collection", "pendant la sauvegarde")  # df reste modifiable
+    release.set()
+    future.result()
+
+    assert reload(manager.filepath).df.loc[0, "collection"] == "col1"  # instantané du lancement
+    assert manager.is_dirty()
+    assert (0, "collection") in manager.dirty_cells
+
+
+def test_failed_save_leaves_workbook_intact(manager, monkeypatch):
+    with open(manager.filepath, "rb") as f:
+        original = f.read()
+
+    def broken_write(snapshot, path, progress=None):
+        with open(path, "wb") as f:
+            f.write(b"classeur tronque")
+        raise OSError("disque plein")
+
+    monkeypatch.setattr(excel_manager, "_write_workbook", broken_write)
+    manager.delete_rows([0])
+    with pytest.raises(OSError):
+        manager.save_excel_async().result()
+
+    with open(manager.filepath, "rb") as f:
+        assert f.read() == original
+    assert not glob.glob(os.path.join(os.path.dirname(manager.filepath), ".*.xlsx.tmp"))
+    assert manager.is_dirty()
+
+
+def test_saves_run_one_at_a_time_in_order(manager):
+    manager.set_cell(0, "collection", "premier")
+    first = manager.save_excel_async()
+    manager.set_cell(0, "collection", "second")
+    second = manager.save_excel_async()
+    first.result()
+    second.result()
+    assert reload(manager.filepath).df.loc[0, "collection"] == "second"
+    assert not manager.is_dirty()
+
+
+def load_with(path, engine):
+    manager = ExcelManager(path, engine=engine, use_cache=False, use_recovery=False)
+    manager.load_excel()
+    return manager.df
+
+
+@pytest.mark.skipif(excel_manager._default_engine() != "calamine", reason="python-calamine absent")
+def test_engines_load_the_same_frame(tmp_path):
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "Notes"
+    workbook.active.append(["pas", "les", "tokens"])
+    sheet = workbook.create_sheet("Tokens")
+    sheet.append(["Contract_Address", "token_id", None, "chain", "qtt_owned", "floor_price",
+                  "last_scrape_date", "notes", 2024])
+    sheet.append(["0xa", 1, "hors tableau", "ethereum", 2, 0.5, datetime(2025, 6, 1, 10, 30), "x", 1])
+    sheet.append(["0xb", "2", None, "polygon", None, 1, date(2025, 6, 2), 7, None])
+    sheet.append([None] * 9)  # ligne vide au milieu : gardée
+    sheet.append(["0xc", 12.0, None, None, 3, None, None, None, 2.5])
+    sheet["A7"].font = Font(bold=True)  # lignes vides en fin de feuille, gardées par openpyxl
+    workbook.active = 1
+    path = str(tmp_path / "tokens.xlsx")
+    workbook.save(path)
+
+    frame = load_with(path, "openpyxl")
+    assert frame.columns.tolist()[:8] == ["contract_address", "token_id", "chain", "qtt_owned", "floor_price",
+                                          "last_scrape_date", "notes", "2024"]
+    assert frame["token_id"].tolist() == ["1", "2", None, "12", None, None]
+    pd.testing.assert_frame_equal(load_with(path, "calamine"), frame)
+
+
+@pytest.mark.skipif(excel_manager._default_engine() != "calamine", reason="python-calamine absent")
+def test_engines_keep_a_saved_blank_last_row(manager):
+    blank = pd.DataFrame([[None] * len(manager.df.columns)], columns=manager.df.columns)
+    manager.insert_rows([len(manager.df)], blank)
+    manager.save_excel()
+    frame = load_with(manager.filepath, "openpyxl")
+    assert len(frame) == len(manager.df)
+    pd.testing.assert_frame_equal(load_with(manager.filepath, "calamine"), frame)
+
+
+def cached_load(path):
+    manager = ExcelManager(path, use_recovery=False)
+    manager.load_excel()
+    manager.wait_for_cache()
+    return manager
+
+
+def test_cache_loads_the_same_frame_as_the_workbook(tmp_path):
+    rows = [row + [datetime(2025, 6, 1 + i, 10, 30)] for i, row in enumerate(token_rows(6))]
+    rows[2][4] = rows[3][6] = rows[4][8] = None
+    path = write_workbook(tmp_path / "tokens.xlsx", rows, HEADERS + ["last_scrape_date"])
+
+    assert cached_load(path).last_load_stats["engine"] != "cache"  # premier chargement : cache écrit
+    manager = cached_load(path)
+    assert manager.last_load_stats["engine"] == "cache"
+    pd.testing.assert_frame_equal(manager.df, reload(path).df)
+
+    # Sauvegarde partielle puis complète : le cache régénéré reste identique au xlsx relu
+    manager.set_cell(0, "collection", "edited")
+    manager.set_cell(1, "floor_price", None)
+    manager.save_excel()
+    manager.wait_for_cache()
+    pd.testing.assert_frame_equal(cached_load(path).df, reload(path).df)
+
+    blank = pd.DataFrame([[None] * len(manager.df.columns)], columns=manager.df.columns)
+    manager.insert_rows([1], blank)
+    manager.delete_rows([4])
+    manager.save_excel()
+    manager.wait_for_cache()
+    cached = cached_load(path)
+    assert cached.last_load_stats["engine"] == "cache"
+    pd.testing.assert_frame_equal(cached.df, reload(path).df)
+
+
+def test_cache_is_ignored_when_the_workbook_changes(workbook):
+    cached_load(workbook)
+    assert cached_load(workbook).last_load_stats["engine"] == "cache"
+
+    # Même contenu, autre date de modification
+    stat = os.stat(workbook)
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cached_load(workbook).last_load_stats["engine"] != "cache"
+    assert cached_load(workbook).last_load_stats["engine"] == "cache"
+
+    # Autre contenu (autre taille), date de modification d'origine
+    stat = os.stat(workbook)
+    write_workbook(workbook, token_rows(13))
+    assert os.stat(workbook).st_size != stat.st_size
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    manager = cached_load(workbook)
+    assert manager.last_load_stats["engine"] != "cache"
+    assert len(manager.df) == 13
+
+
+def test_formulas_survive_a_full_rewrite(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["contract_address", "token_id", "qtt_owned", "total"])
+    sheet.append(["0xa", "1", 2, "=C2*10"])
+    sheet.append(["0xb", "2", 3, "=C3*10"])
+    path = str(tmp_path / "tokens.xlsx")
+    workbook.save(path)
+
+    manager = ExcelManager(path, use_cache=False, use_recovery=False)
+    manager.load_excel()
+    assert manager.last_load_stats["engine"] == "openpyxl"  # calamine n'aurait que les valeurs calculées
+    assert manager.df["total"].tolist() == ["=C2*10", "=C3*10"]
+    manager.delete_rows([1])  # écriture complète
+    manager.save_excel()
+    assert openpyxl.load_workbook(path).active["D2"].value == "=C2*10"
+
+
+def test_add_and_delete_column(manager):
+    manager.add_column("notes", 2)
+    assert manager.df.columns[2] == "notes" and manager.df["notes"].isna().all()
+    position, values, _ = manager.delete_column("notes")
+    assert position == 2 and "notes" not in manager.df.columns
+    manager.add_column("notes", position, values)
+    assert manager.df.columns[2] == "notes"
+
+
+@pytest.mark.parametrize("name", ["chain", " Chain ", "", "   ", None])
+def test_add_column_rejects_blank_and_taken_names(manager, name):
+    columns = manager.df.columns.tolist()
+    with pytest.raises(ValueError):
+        manager.add_column(name)
+    assert manager.df.columns.tolist() == columns
+
+
+def test_rename_column(manager):
+    edits = manager.edit_count
+    manager.rename_column("chain", "chain")  # même nom : rien à faire
+    assert manager.edit_count == edits
+    with pytest.raises(ValueError):
+        manager.rename_column("chain", "URL")
+    with pytest.raises(ValueError):
+        manager.rename_column("chain", " ")
+    manager.rename_column("chain", "Chain")  # changement de casse seul : accepté
+    manager.rename_column("Chain", "network")
+    assert "network" in manager.df.columns and "chain" not in manager.df.columns
+
+
+def test_move_column(manager):
+    columns = manager.df.columns.tolist()
+    assert manager.move_column("url", 0) == columns.index("url")
+    assert manager.df.columns.tolist() == ["url"] + [col for col in columns if col != "url"]
+    assert manager.df["url"].iloc[0].startswith("https://")
+
+
+def test_column_changes_are_saved(manager):
+    manager.add_column("notes", 1)
+    manager.set_cell(0, "notes", "hello")
+    manager.rename_column("collection", "series")
+    manager.move_column("qtt_owned", 0)
+    manager.delete_column("actif")
+    manager.save_excel()
+    reloaded = reload(manager.filepath)
+    assert reloaded.df.columns.tolist() == manager.df.columns.tolist()
+    assert reloaded.df.loc[0, "notes"] == "hello"
+
+
+def baseline_import(df, tnew, locked=()):
+    # Fusion d'origine (ligne par ligne, iterrows), gardée comme référence pour import_table
+    def clean_keys(df):
+        df = df.copy()
+
+        def extract_from_url(url):
+            try:
+                parts = url.split('/')
+                return parts[4], parts[5], str(int(float(parts[6])))
+            except Exception:
+                return None, None, None
+
+        for idx, row in df.iterrows():
+            url = row.get("url")
+            chain, contract_address, token_id = extract_from_url(str(url)) if pd.notna(url) else (None, None, None)
+            if contract_address:
+                df.at[idx, "contract_address"] = contract_address
+            if token_id:
+                df.at[idx, "token_id"] = token_id
+            if chain:
+                df.at[idx, "chain"] = chain
+        return df
+
+    def get_key(df):
+        return df["contract_address"].astype(str) + "_" + df["token_id"].astype(str)
+
+    t1 = clean_keys(df)
+    tnew = clean_keys(tnew)
+    t1_keys = get_key(t1)
+    for col in tnew.columns:
+        if col not in t1.columns:
+            t1[col] = None
+    for col in t1.columns:
+        if col not in tnew.columns:
+            tnew[col] = None
+
+    t1_index = {key: i for i, key in enumerate(t1_keys)}
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for idx, row in tnew.iterrows():
+        key = f"{row['contract_address']}_{row['token_id']}"
+        if key in t1_index:
+            i = t1_index[key]
+            for col in tnew.columns:
+                if pd.notna(row[col]) and row[col] != "":
+                    if col not in df.columns or (i, col) in locked:
+                        continue
+                    t1.at[i, col] = row[col]
+            t1.at[i, "last_scrape_date"] = now
+        else:
+            new_row = {col: row.get(col) if pd.notna(row.get(col)) else None for col in t1.columns}
+            new_row["last_scrape_date"] = now
+            t1 = pd.concat([t1, pd.DataFrame([new_row], columns=t1.columns)], ignore_index=True)
+    return t1
+
+
+def import_fixture(manager):
+    # Mises à jour (dont une cellule verrouillée et une valeur vide), clé en double dans le lot,
+    # nouveaux tokens et nouvelle colonne "rarity"
+    def url(i):
+        return f"https://opensea.io/assets/ethereum/0x{i % 3:040x}/{i}"
+
+    manager.set_locked([1], ["collection"])
+    return pd.DataFrame({
+        "url": [url(1), url(2), url(20), url(2), url(21), url(21)],
+        "collection": ["new1", None, "new7", "dup2", None, "b8"],
+        "qtt_owned": [9, None, 4, 3, None, None],
+        "rarity": ["r1", "r2", None, "r2bis", "r8", None],
+    })
+
+
+def test_import_matches_original_merge(manager):
+    tnew = import_fixture(manager)
+    expected = baseline_import(manager.df, tnew, {(1, "collection")})
+    manager.import_table(tnew, manager.locks)
+    result = manager.df
+
+    assert result.index[result["last_scrape_date"].notna()].tolist() == [1, 2, 12, 13, 14]
+    # Seul écart voulu : la fusion d'origine ignorait les nouvelles colonnes pour les tokens existants
+    assert expected.loc[[1, 2], "rarity"].isna().all()
+    expected.loc[[1, 2], "rarity"] = ["r1", "r2bis"]
+    expected = excel_manager.restore_column_types(expected)
+    pd.testing.assert_frame_equal(result.drop(columns="last_scrape_date"),
+                                  expected.drop(columns="last_scrape_date"))
+    assert result.loc[1, "collection"] == "col1"  # verrouillée
+    assert result.loc[2, "collection"] == "dup2"  # dernière ligne du lot pour ce token
+
+
+def test_imported_table_has_the_types_of_a_reload(manager):
+    manager.import_table(import_fixture(manager), manager.locks)
+    assert manager.df["token_id"].tolist()[-3:] == ["20", "21", "21"]
+    manager.save_excel()
+    reloaded = reload(manager.filepath)
+    pd.testing.assert_series_equal(reloaded.df.dtypes, manager.df.dtypes)
+
+
 if __name__ == "__main__":
     main()
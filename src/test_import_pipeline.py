@@ -0,0 +1,115 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from conftest import HEADERS, token_rows
+from import_pipeline import ImportCancelled, read_ahead
+
+
+class Source:
+    # Itérable de lots qui note ce qui a été lu et s'il a été refermé
+    def __init__(self, count, fail_at=None):
+        self.count, self.fail_at = count, fail_at
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        try:
+            for i in range(self.count):
+                if i == self.fail_at:
+                    raise OSError(f"lot {i} illisible")
+                self.read += 1
+                yield i
+        finally:
+            self.closed = True
+
+
+def test_read_ahead_runs_stage_in_reader_thread_in_order():
+    threads = set()
+
+    def stage(chunk):
+        threads.add(threading.current_thread().name)
+        return chunk * 10
+
+    assert list(read_ahead(Source(5), stage)) == [0, 10, 20, 30, 40]
+    assert threads == {"import-read"}
+
+
+def test_read_ahead_stays_at_most_depth_chunks_ahead():
+    source = Source(20)
+    items = read_ahead(source, lambda chunk: chunk, depth=2)
+    assert next(items) == 0
+    threading.Event().wait(0.3)  # le lecteur avance jusqu'à remplir la file
+    assert source.read <= 4  # lot rendu + 2 en file + 1 en attente de place
+    items.close()
+
+
+def test_reader_error_is_raised_after_earlier_chunks():
+    source = Source(5, fail_at=2)
+    items = read_ahead(source, lambda chunk: chunk)
+    assert next(items) == 0 and next(items) == 1
+    with pytest.raises(OSError, match="lot 2"):
+        next(items)
+    assert source.closed
+
+
+def test_cancel_stops_reader_and_closes_source():
+    cancelled = threading.Event()
+    source = Source(1000)
+    items = read_ahead(source, lambda chunk: chunk, cancelled)
+    assert next(items) == 0
+    cancelled.set()
+    with pytest.raises(ImportCancelled):
+        list(items)
+    for _ in range(50):
+        if source.closed:
+            break
+        threading.Event().wait(0.02)
+    assert source.closed and source.read < 1000
+
+
+def new_tokens(count, start=100):
+    frame = pd.DataFrame(token_rows(start + count)[start:], columns=HEADERS)
+    frame["collection"] = "imported"
+    return frame
+
+
+def test_cancelled_import_leaves_df_unchanged(manager):
+    df, edits = manager.df, manager.edit_count
+    cancelled = threading.Event()
+    cancelled.set()
+    future = manager.import_table_async([new_tokens(5), new_tokens(5, 200)], cancelled=cancelled)
+    with pytest.raises(ImportCancelled):
+        future.result(5)
+    assert manager.df is df and manager.edit_count == edits
+    assert len(manager.df) == 12
+
+
+def test_reader_error_fails_import_without_touching_df(manager):
+    df = manager.df
+
+    def chunks():
+        yield new_tokens(3)
+        raise OSError("fichier tronqué")
+
+    with pytest.raises(OSError, match="tronqué"):
+        manager.import_table_async(chunks()).result(5)
+    assert manager.df is df and len(df) == 12
+
+
+def test_prepared_import_is_published_in_one_step(manager):
+    df = manager.df
+    prepared = manager.prepare_import([new_tokens(3), new_tokens(2, 200)])
+    assert manager.df is df and len(df) == 12  # rien de visible avant la publication
+    manager.publish_import(prepared)
+    assert len(manager.df) == 17
+    assert manager.last_import_report["added"] == 5
+
+
+def test_publish_is_rejected_after_a_concurrent_edit(manager):
+    prepared = manager.prepare_import(new_tokens(3))
+    manager.set_cell(0, "collection", "edited during import")
+    with pytest.raises(ValueError):
+        manager.publish_import(prepared)
+    assert len(manager.df) == 12 and manager.df.loc[0, "collection"] == "edited during import"
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from conftest import HEADERS, token_rows, write_workbook
+from import_sources import ChunkedSource
+
+
+def frame(count):
+    return pd.DataFrame(token_rows(count), columns=HEADERS)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl", ".xlsx"])
+def test_chunks_cover_the_file_with_continuous_index(tmp_path, suffix):
+    path = str(tmp_path / f"new{suffix}")
+    if suffix == ".csv":
+        frame(7).to_csv(path, index=False)
+    elif suffix == ".jsonl":
+        frame(7).to_json(path, orient="records", lines=True)
+    else:
+        write_workbook(path, token_rows(7))
+
+    source = ChunkedSource(path, chunk_rows=3)
+    chunks = list(source)
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [chunk.index[0] for chunk in chunks] == [0, 3, 6]
+    assert source.total_rows == 7
+    merged = pd.concat(chunks)
+    assert merged.columns.tolist() == HEADERS
+    assert merged["url"].tolist() == frame(7)["url"].tolist()
+
+
+def test_exact_multiple_of_chunk_rows_has_no_empty_tail(tmp_path):
+    path = str(tmp_path / "new.csv")
+    frame(6).to_csv(path, index=False)
+    assert [len(chunk) for chunk in ChunkedSource(path, chunk_rows=3)] == [3, 3]
+
+
+def test_xlsx_skips_blank_rows_and_names_blank_headers(tmp_path):
+    rows = token_rows(4)
+    rows.insert(2, [None] * len(HEADERS))
+    path = write_workbook(tmp_path / "new.xlsx", rows, HEADERS[:-1] + [None])
+    chunks = list(ChunkedSource(path, chunk_rows=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2]
+    assert chunks[-1].columns[-1] == f"Unnamed: {len(HEADERS) - 1}"  # comme pd.read_excel
+
+
+def test_unsupported_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Format non pris en charge"):
+        ChunkedSource(str(tmp_path / "new.ods"))
+
+
+def test_chunked_import_equals_single_frame_import(tmp_path, workbook):
+    from excel_manager import ExcelManager
+
+    new = frame(30).iloc[8:]  # 4 tokens existants, 18 nouveaux
+    new = new.assign(collection="imported")
+    path = str(tmp_path / "new.csv")
+    new.to_csv(path, index=False)
+
+    results = []
+    for tnew in (pd.read_csv(path), ChunkedSource(path, chunk_rows=5)):
+        manager = ExcelManager(workbook, use_cache=False, use_recovery=False)
+        manager.load_excel()
+        manager.import_table(tnew)
+        results.append(manager.df.drop(columns="last_scrape_date"))
+        assert manager.last_import_report["updated"] == 4
+    pd.testing.assert_frame_equal(*results)
@@ -0,0 +1,99 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from lock_store import LockStore
+from undo_journal import ColumnAdded, ColumnDeleted
+
+
+def test_masks_cached_until_rows_or_locks_change():
+    df = pd.DataFrame({"token_id": ["1", "2", "3"]})
+    positions = {("0xa", "1"): 0, ("0xa", "3"): 2}
+    positions_of = lambda keys: np.array(sorted(positions[key] for key in keys if key in positions), dtype=np.int64)
+    store = LockStore()
+    store.lock("chain", {("0xa", "1"), ("0xa", "3")})
+
+    masks = store.masks(df, 1, positions_of)
+    assert masks["chain"].tolist() == [True, False, True]
+    assert store.masks(df, 1, positions_of) is masks
+    assert store.masks(df, 2, positions_of) is not masks  # lignes changées
+    store.unlock("chain", {("0xa", "3")})
+    assert store.masks(df, 2, positions_of)["chain"].tolist() == [True, False, False]
+
+
+def test_json_round_trip_groups_by_contract():
+    store = LockStore()
+    store.lock("chain", {("0xa", "1"), ("0xa", "2"), ("0xb", "1")})
+    store.lock("url", {("0xb", "7")})
+    data = store.to_json()
+    assert data == {"format": 2, "locks": {"chain": {"0xa": ["1", "2"], "0xb": ["1"]}, "url": {"0xb": ["7"]}}}
+
+    loaded = LockStore()
+    loaded.load_json(json.loads(json.dumps(data)))
+    assert loaded.keys("chain") == {("0xa", "1"), ("0xa", "2"), ("0xb", "1")}
+    assert len(loaded) == 4
+
+
+def test_rename_column_carries_locks():
+    store = LockStore()
+    store.lock("chain", {("0xa", "1")})
+    store.rename_column("chain", "network")
+    assert store.columns() == ["network"]
+    assert store.keys("network") == {("0xa", "1")}
+
+
+def test_deleted_column_takes_its_locks_and_undo_restores_them(manager):
+    manager.set_locked([1, 3], ["collection", "collection"])
+    position, values, locks = manager.delete_column("collection")
+    assert len(locks) == 2 and "collection" not in manager.locks.columns()
+    manager.load_locked_cells()  # fichier des verrous réécrit
+    assert len(manager.locks) == 0
+
+    # Colonne recréée sous le même nom : aucun verrou
+    added = ColumnAdded("collection", position)
+    added.redo(manager)
+    assert "collection" not in manager.lock_masks()
+    added.undo(manager)
+
+    ColumnDeleted("collection", position, values, locks).undo(manager)
+    assert manager.lock_masks()["collection"].nonzero()[0].tolist() == [1, 3]
+    manager.load_locked_cells()
+    assert manager.locks.keys("collection") == locks
+
+
+def test_locks_follow_the_token_after_sort_and_delete(manager):
+    key = tuple(manager.df.loc[4, ["contract_address", "token_id"]])
+    manager.set_locked([4], ["collection"])
+    assert manager.is_locked(4, "collection")
+
+    manager.reorder_rows(np.arange(len(manager.df))[::-1])
+    row = manager.find(key)
+    assert row == len(manager.df) - 5
+    assert manager.is_locked(row, "collection")
+    assert manager.lock_masks()["collection"].sum() == 1
+
+    manager.delete_rows([0, 1])
+    assert manager.is_locked(manager.find(key), "collection")
+    assert not manager.is_locked(manager.find(key), "chain")
+
+
+def test_locks_are_saved_and_reloaded_by_key(manager):
+    key = tuple(manager.df.loc[2, ["contract_address", "token_id"]])
+    manager.set_locked([2, 3], ["url", "url"])
+    manager.reorder_rows(np.arange(len(manager.df))[::-1])
+
+    manager.load_locked_cells()
+    assert manager.is_locked(manager.find(key), "url")
+    assert manager.lock_masks()["url"].sum() == 2
+
+
+def test_legacy_position_file_is_converted(manager):
+    # Ancien format [[ligne df, colonne du modèle], ...] : colonne 2 = "chain"
+    key = tuple(manager.df.loc[1, ["contract_address", "token_id"]])
+    with open(manager.locked_cells_path(), "w") as f:
+        json.dump([[1, 2], [999, 0]], f)
+    manager.load_locked_cells()
+    assert manager.locks.keys("chain") == {key}
+    with open(manager.locked_cells_path()) as f:
+        assert json.load(f)["format"] == 2
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from query_filter import ColumnParseCache, parse_query, split_terms
+
+
+COLUMNS = ["contract_address", "token_id", "chain", "qtt_owned", "last_scrape_date"]
+
+
+def frame():
+    return pd.DataFrame({
+        "chain": ["ethereum", "binance smart chain", "matic", None],
+        "qtt_owned": [0, 3, 10, None],
+        "last_scrape_date": pd.to_datetime(["2025-01-01", "2026-02-01", None, "2024-06-30"]),
+    })
+
+
+def test_parse_query_filters_and_free_text():
+    filters, words = parse_query('CHAIN:eth qtt_owned>=3 last_scrape_date<2026-01-01 azuki', COLUMNS)
+    assert filters == [("chain", ":", "eth"), ("qtt_owned", ">=", "3"), ("last_scrape_date", "<", "2026-01-01")]
+    assert words == "azuki"
+
+
+def test_parse_query_quoted_values_and_operators():
+    filters, _ = parse_query('chain="binance smart chain" token_id!=12 qtt_owned<=2', COLUMNS)
+    assert filters == [("chain", "=", "binance smart chain"), ("token_id", "!=", "12"), ("qtt_owned", "<=", "2")]
+
+
+def test_parse_query_unknown_columns_and_incomplete_terms_stay_free_text():
+    filters, words = parse_query("https://opensea.io/assets chain: foo:bar", COLUMNS)
+    assert filters == []
+    assert words == "https://opensea.io/assets foo:bar"
+
+
+def test_unclosed_quote_does_not_raise():
+    assert split_terms('chain:"binance smart') == ['chain:"binance', "smart"]
+    filters, _ = parse_query('chain:"binance smart', COLUMNS)
+    assert filters == [("chain", ":", '"binance')]
+
+
+def test_mask_numbers_dates_and_text():
+    df = frame()
+    cache = ColumnParseCache()
+    mask = lambda text: cache.mask(df, parse_query(text, df.columns)[0], lambda column: 0).tolist()
+    assert mask("qtt_owned>2") == [False, True, True, False]  # cellule vide jamais retenue
+    assert mask("qtt_owned!=3") == [True, False, True, False]
+    assert mask("last_scrape_date<2026-01-01") == [True, False, False, True]
+    assert mask("chain:SMART") == [False, True, False, False]
+    assert mask("chain=matic") == [False, False, True, False]
+    assert mask("chain:e qtt_owned<5") == [True, True, False, False]
+
+
+def test_cache_reused_until_column_version_changes():
+    df = frame()
+    cache = ColumnParseCache()
+    first = cache.get(df, "qtt_owned", "number", 1)
+    assert cache.get(df, "qtt_owned", "number", 1) is first
+    assert cache.get(df, "qtt_owned", "number", 2) is not first
+    assert cache.get(df.copy(), "qtt_owned", "number", 2) is not first
+
+
+def test_manager_query_combines_filters_and_search(manager):
+    positions = manager.query("qtt_owned>=3 col1")
+    expected = np.flatnonzero((manager.df["qtt_owned"] >= 3) & (manager.df["collection"] == "col1"))
+    assert positions.tolist() == expected.tolist()
+    manager.set_cell(int(expected[0]), "qtt_owned", 0)
+    assert manager.query("qtt_owned>=3 col1").tolist() == expected[1:].tolist()
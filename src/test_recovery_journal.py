@@ -0,0 +1,156 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from conftest import HEADERS, token_rows, write_workbook
+from excel_manager import ExcelManager
+from recovery_journal import RecoveryJournal
+
+
+def journal_records(path):
+    return RecoveryJournal.read(path)[1]
+
+
+def test_read_ignores_truncated_last_line(tmp_path):
+    path = str(tmp_path / "tokens.xlsx.journal")
+    journal = RecoveryJournal(path)
+    journal.start({"file": "xlsx", "signature": {"size": 1}})
+    journal.append({"op": "cell", "row": 0, "column": "chain", "value": "x"})
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "cell", "row": 1, "col')  # plantage pendant l'écriture
+    base, records = RecoveryJournal.read(path)
+    assert base == {"file": "xlsx", "signature": {"size": 1}}
+    assert records == [{"op": "cell", "row": 0, "column": "chain", "value": "x"}]
+
+
+def test_dates_are_read_back_as_timestamps(tmp_path):
+    journal = RecoveryJournal(str(tmp_path / "j"))
+    journal.start({"file": "xlsx", "signature": None})
+    journal.append({"op": "cells", "column": "last_scrape_date", "rows": [0, 1, 2, 3],
+                    "values": [pd.Timestamp("2025-06-01 10:30"), np.datetime64("2025-06-02T08:00:00.123456"),
+                               pd.NaT, "2025-06-03"]})
+    journal.close()
+    values = RecoveryJournal.read(journal.path)[1][0]["values"]
+    assert values == [pd.Timestamp("2025-06-01 10:30"), pd.Timestamp("2025-06-02 08:00:00.123456"), None,
+                      "2025-06-03"]  # texte saisi : rejoué tel quel
+    assert isinstance(values[0], pd.Timestamp)
+
+
+def test_replay_plan_uses_last_completed_snapshot():
+    base = {"file": "xlsx", "signature": "old"}
+    records = [{"op": "cell", "row": 0}, {"op": "snapshot", "kind": "checkpoint"},
+               {"op": "cell", "row": 1}, {"op": "snapshot", "kind": "xlsx"},
+               {"op": "snapshot_failed", "at": 4}, {"op": "cell", "row": 2}]
+    signatures = {"xlsx": "new", "checkpoint": "cp"}
+
+    assert RecoveryJournal.replay_plan(base, records, {"xlsx": "old"}.get) == ("xlsx", records)
+    # xlsx réécrit depuis la base : la sauvegarde annulée est ignorée, on repart du point de reprise
+    assert RecoveryJournal.replay_plan(base, records, signatures.get) == ("checkpoint", records[2:])
+    assert RecoveryJournal.replay_plan(base, records[:1], signatures.get) == (None, [])
+    assert RecoveryJournal.replay_plan(None, records, signatures.get) == (None, [])
+
+
+def test_rebase_keeps_only_records_after_snapshot(tmp_path):
+    journal = RecoveryJournal(str(tmp_path / "j"))
+    journal.start({"file": "xlsx", "signature": None})
+    journal.append({"op": "cell", "row": 0})
+    position = journal.mark_snapshot("checkpoint")
+    journal.append({"op": "cell", "row": 1})
+    journal.rebase({"file": "checkpoint", "signature": None}, position)
+    journal.append({"op": "cell", "row": 2})
+    journal.close()
+    base, records = RecoveryJournal.read(journal.path)
+    assert base["file"] == "checkpoint"
+    assert records == [{"op": "cell", "row": 1}, {"op": "cell", "row": 2}]
+
+
+def open_manager(path):
+    manager = ExcelManager(path, use_cache=False)
+    manager.load_excel()
+    return manager
+
+
+def crash(manager):
+    # Plantage simulé : journal fermé sans être supprimé, rien de sauvegardé
+    manager.wait_for_save()
+    manager.recovery.close()
+
+
+def test_edits_are_replayed_after_crash(workbook):
+    manager = open_manager(workbook)
+    manager.set_cell(0, "collection", "edited")
+    manager.delete_rows([3])
+    manager.rename_column("chain", "network")
+    expected = manager.df.copy()
+    crash(manager)
+
+    recovered = open_manager(workbook)
+    assert recovered.last_load_stats["recovered"] == 3
+    assert recovered.df.equals(expected)
+    assert recovered.is_dirty()
+    recovered.close_recovery(discard=True)
+
+
+def test_replay_starts_from_checkpoint(workbook):
+    manager = open_manager(workbook)
+    manager.set_cell(0, "collection", "before checkpoint")
+    manager.checkpoint_async().result()
+    assert os.path.exists(manager._checkpoint_path())
+    manager.set_cell(1, "collection", "after checkpoint")
+    expected = manager.df.copy()
+    crash(manager)
+
+    recovered = open_manager(workbook)
+    assert recovered.last_load_stats["recovered"] == 1
+    assert recovered.df["collection"].tolist() == expected["collection"].tolist()
+    recovered.close_recovery(discard=True)
+
+
+def test_replay_after_save_only_has_later_edits(workbook):
+    manager = open_manager(workbook)
+    manager.set_cell(0, "collection", "saved")
+    manager.save_excel()
+    assert journal_records(manager._journal_path()) == []
+    manager.set_cell(1, "collection", "unsaved")
+    crash(manager)
+
+    recovered = open_manager(workbook)
+    assert recovered.last_load_stats["recovered"] == 1
+    assert recovered.df.loc[[0, 1], "collection"].tolist() == ["saved", "unsaved"]
+    recovered.close_recovery(discard=True)
+    assert not os.path.exists(recovered._journal_path())
+
+
+def test_journal_from_another_file_version_is_set_aside(workbook):
+    manager = open_manager(workbook)
+    manager.set_cell(0, "collection", "lost")
+    crash(manager)
+    os.utime(workbook, ns=(0, 0))  # xlsx modifié par un autre outil
+
+    recovered = open_manager(workbook)
+    assert recovered.last_load_stats["recovered"] == 0
+    assert recovered.df.loc[0, "collection"] == "col0"
+    assert os.path.exists(recovered._journal_path() + ".rejected")
+    recovered.close_recovery(discard=True)
+
+
+def test_dates_are_replayed_with_their_type(tmp_path):
+    rows = [row + [datetime(2025, 6, 1, 10, i)] for i, row in enumerate(token_rows(4))]
+    workbook = write_workbook(tmp_path / "tokens.xlsx", rows, HEADERS + ["last_scrape_date"])
+    manager = open_manager(workbook)
+    manager.set_cell(0, "last_scrape_date", pd.Timestamp("2025-07-01 12:00"))
+    manager.set_cells([1, 2], ["last_scrape_date"] * 2, [pd.Timestamp("2025-07-02"), None])
+    manager.insert_rows([4], manager.df.iloc[[0]])
+    manager.add_column("checked_on", values=[pd.Timestamp("2025-08-01")] * len(manager.df))
+    expected = manager.df.copy()
+    crash(manager)
+
+    recovered = open_manager(workbook)
+    assert recovered.last_load_stats["recovered"] == 4
+    for column in ("last_scrape_date", "checked_on"):
+        pd.testing.assert_series_equal(recovered.df[column], expected[column])
+    assert recovered.df.loc[4, "last_scrape_date"] == pd.Timestamp("2025-07-01 12:00")
+    recovered.close_recovery(discard=True)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from conftest import HEADERS, token_rows
+from search_index import SKIP_COLUMNS
+
+
+QUERIES = ["col1", "COL", "0x", "0.5", "ethereum/0x", "eth", "ethe", "3", "", "introuvable"]
+
+
+def unindexed_search(df, query):
+    # Recherche cellule par cellule, avec le texte affiché par TokenTableModel.cell_text
+    query = query.strip().lower()
+    found = []
+    for row in range(len(df)):
+        for col in df.columns:
+            if col in SKIP_COLUMNS:
+                continue
+            value = df.iat[row, df.columns.get_loc(col)]
+            text = "" if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)) else str(value)
+            if query in text.lower():
+                found.append(row)
+                break
+    return found
+
+
+def assert_same_results(manager):
+    for query in QUERIES:  # "eth" puis "ethe" : affinage sur les lignes déjà trouvées
+        assert manager.search(query).tolist() == unindexed_search(manager.df, query), query
+
+
+def test_results_match_unindexed_search(manager):
+    manager.set_cell(2, "collection", None)
+    manager.set_cell(5, "floor_price", np.nan)
+    assert_same_results(manager)
+    # Pas de correspondance à cheval sur deux cellules
+    assert manager.search("ethereumhttps").tolist() == []
+
+
+def test_cell_edits_update_the_index(manager):
+    assert manager.search("col1").tolist() == [1, 5, 9]
+    manager.set_cell(5, "collection", "Renamed")
+    manager.set_cells([0, 3], ["url", "url"], ["https://example.com/col1", None])
+    assert manager.search_index.is_current(manager.df)  # mis à jour, pas reconstruit
+    assert manager.search("col1").tolist() == [0, 1, 9]
+    assert manager.search("renamed").tolist() == [5]
+    assert_same_results(manager)
+
+
+def test_inserts_deletes_and_reorders_update_the_index(manager):
+    manager.search("col")  # index construit
+    new = pd.DataFrame(token_rows(22)[20:], columns=HEADERS).assign(collection="inserted")
+    manager.insert_rows([0, 7], new)
+    assert manager.search("inserted").tolist() == [0, 7]
+    assert_same_results(manager)
+
+    manager.delete_rows([0, 3, 4])
+    assert manager.search("inserted").tolist() == [4]
+    assert_same_results(manager)
+
+    manager.reorder_rows(np.arange(len(manager.df))[::-1])
+    assert manager.search("inserted").tolist() == [len(manager.df) - 5]
+    assert manager.search_index.is_current(manager.df)
+    assert_same_results(manager)
+
+
+def test_column_changes_rebuild_the_index(manager):
+    manager.add_column("notes", values=["note"] * len(manager.df))
+    assert len(manager.search("note")) == len(manager.df)
+    manager.delete_column("notes")
+    assert manager.search("note").tolist() == []
+    manager.rename_column("collection", "set")
+    assert_same_results(manager)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from token_index import TokenIndex, frame_keys, make_key
+
+
+def tokens(*pairs):
+    return pd.DataFrame({"contract_address": [ca for ca, _ in pairs],
+                         "token_id": [tid for _, tid in pairs],
+                         "chain": ["ethereum"] * len(pairs)})
+
+
+def test_make_key_normalizes_excel_numbers_and_empty_values():
+    assert make_key("0xa", 12.0) == ("0xa", "12")
+    assert make_key("0xa", "12") == ("0xa", "12")
+    assert make_key("0xa", None) is None
+    assert make_key("", "1") is None
+    assert make_key(np.nan, "1") is None
+
+
+def test_frame_keys_text_and_mixed_columns_agree():
+    text = tokens(("0xa", "1"), ("0xb", ""), (None, "3"))
+    mixed = pd.DataFrame({"contract_address": ["0xa", "0xb", None], "token_id": [1.0, None, 3]})
+    assert frame_keys(text) == [("0xa", "1"), None, None]
+    assert frame_keys(mixed) == [("0xa", "1"), None, None]
+    assert frame_keys(pd.DataFrame({"token_id": ["1"]})) == [None]
+
+
+def test_rebuild_find_and_duplicates():
+    df = tokens(("0xa", "1"), ("0xa", "2"), ("0xb", "1"), ("0xa", "1"))
+    index = TokenIndex()
+    index.rebuild(df)
+    assert index.is_current(df)
+    assert index.find(("0xa", "1")) == 0
+    assert index.find(("0xc", "1")) is None
+    assert index.find_many([("0xb", "1"), ("0xc", "1")]).tolist() == [2, -1]
+    assert index.duplicates() == {("0xa", "1"): [0, 3]}
+
+
+def test_insert_delete_reorder_keep_positions():
+    df = tokens(("0xa", "1"), ("0xa", "2"), ("0xa", "3"))
+    index = TokenIndex()
+    index.rebuild(df)
+
+    new = tokens(("0xb", "1"), ("0xa", "2"))
+    duplicates = index.insert([0, 2], new, df)  # positions finales : b/1, a/1, a/2 (nouveau), a/2, a/3
+    assert duplicates == [("0xa", "2")]
+    assert index.find(("0xb", "1")) == 0
+    assert index.positions([("0xa", "2")]).tolist() == [2, 3]
+
+    index.delete([2], df)  # a/2 ajouté retiré : b/1, a/1, a/2, a/3
+    assert index.duplicates() == {}
+    index.reorder([3, 2, 1, 0], df)  # a/3, a/2, a/1, b/1
+    assert index.find(("0xa", "3")) == 0
+    assert index.find(("0xb", "1")) == 3
+    assert index.key_at(1) == ("0xa", "2")
+
+
+def test_update_reports_new_duplicate_and_clears_old_one():
+    df = tokens(("0xa", "1"), ("0xa", "2"))
+    index = TokenIndex()
+    index.rebuild(df)
+    assert index.update(1, ("0xa", "1")) is True
+    assert index.duplicates() == {("0xa", "1"): [0, 1]}
+    assert index.update(1, ("0xa", "5")) is False
+    assert index.duplicates() == {}
+    assert index.find(("0xa", "2")) is None
+    assert index.find(("0xa", "5")) == 1
+
+
+def test_manager_index_follows_row_operations(manager):
+    key = tuple(manager.df.loc[5, ["contract_address", "token_id"]])
+    assert manager.find(key) == 5
+    manager.delete_rows([0, 1])
+    assert manager.find(key) == 3
+    manager.reorder_rows(np.arange(len(manager.df))[::-1])
+    assert manager.find(key) == len(manager.df) - 4
+    manager.set_cell(manager.find(key), "token_id", "999")
+    assert manager.find(key) is None
+    assert manager.find((key[0], "999")) is not None
@@ -0,0 +1,112 @@
+import numpy as np
+
+from undo_journal import CellsEdit, ColumnDeleted, ColumnMoved, RowsDeleted, RowsReordered, UndoJournal
+
+
+class Sized:
+    structural = False
+
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+        self.undone = self.redone = 0
+
+    def undo(self, manager):
+        self.undone += 1
+
+    def redo(self, manager):
+        self.redone += 1
+
+    def size(self):
+        return self.nbytes
+
+
+def test_budget_evicts_oldest_and_keeps_last():
+    journal = UndoJournal(memory_budget_mb=1000 / (1024 * 1024))  # 1000 octets
+    for label in "abcd":
+        journal.record(Sized(400), label)
+    assert [t.label for t in journal.undo_stack] == ["c", "d"]
+    assert journal.memory == 800
+
+    journal.record(Sized(5000), "big")  # plus gros que le budget : gardé seul
+    assert [t.label for t in journal.undo_stack] == ["big"]
+    assert journal.memory == 5000
+
+
+def test_new_action_clears_redo_and_its_memory():
+    journal = UndoJournal()
+    journal.record(Sized(100), "a")
+    journal.record(Sized(200), "b")
+    journal.undo(None)
+    assert journal.can_redo() and journal.memory == 300
+    journal.record(Sized(50), "c")
+    assert not journal.can_redo()
+    assert journal.memory == 150
+
+
+def test_transaction_groups_nested_commands():
+    journal = UndoJournal()
+    first, second = Sized(1), Sized(1)
+    with journal.transaction("outer"):
+        journal.record(first)
+        with journal.transaction("inner"):
+            journal.record(second)
+    assert len(journal.undo_stack) == 1 and journal.undo_stack[0].label == "outer"
+    journal.undo(None)
+    assert first.undone == second.undone == 1
+
+
+def test_unchanged_content_is_not_recorded():
+    state = ["a"]
+    journal = UndoJournal(fingerprint=lambda: state[0])
+    journal.record(Sized(1), "first")
+    state[0] = "b"
+    journal.record(Sized(1), "edit")
+    journal.record(Sized(1), "sort already in order")
+    assert [t.label for t in journal.undo_stack] == ["first", "edit"]
+
+
+def test_cells_edit_undo_redo(manager):
+    saved = manager.fingerprint()
+    rows, columns, old, new = manager.set_cells([0, 3], ["collection", "collection"], ["x", "y"])
+    edit = CellsEdit(rows, columns, old, new)
+    assert manager.df.loc[[0, 3], "collection"].tolist() == ["x", "y"]
+
+    edit.undo(manager)
+    assert manager.df.loc[[0, 3], "collection"].tolist() == ["col0", "col3"]
+    assert manager.fingerprint() == saved
+    edit.redo(manager)
+    assert manager.df.loc[[0, 3], "collection"].tolist() == ["x", "y"]
+
+
+def test_rows_deleted_and_reordered_revert(manager):
+    before = manager.df.copy()
+    journal = UndoJournal(fingerprint=manager.fingerprint)
+
+    removed = manager.delete_rows([1, 4, 5])
+    journal.record(RowsDeleted([1, 4, 5], removed), "Supprimer")
+    order = np.argsort(manager.df["token_id"].astype(int).to_numpy())[::-1]
+    manager.reorder_rows(order)
+    journal.record(RowsReordered(order), "Trier")
+    assert len(manager.df) == len(before) - 3
+
+    journal.undo(manager)
+    journal.undo(manager)
+    assert manager.df.equals(before)
+    journal.redo(manager)
+    assert "1" not in manager.df["token_id"].tolist()
+
+
+def test_column_deleted_and_moved_revert(manager):
+    columns = list(manager.df.columns)
+    saved = manager.fingerprint()
+
+    position, values, locks = manager.delete_column("chain")
+    deleted = ColumnDeleted("chain", position, values, locks)
+    old_position = manager.move_column("url", 0)
+    moved = ColumnMoved("url", old_position, 0)
+
+    moved.undo(manager)
+    deleted.undo(manager)
+    assert list(manager.df.columns) == columns
+    assert manager.df["chain"].tolist() == ["ethereum"] * len(manager.df)
+    assert manager.fingerprint() == saved
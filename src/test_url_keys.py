@@ -0,0 +1,63 @@
+import pandas as pd
+
+from url_keys import UrlKeyExtractor, normalize_token_ids, parse_urls
+
+
+CONTRACT = "0x" + "ab" * 20
+
+
+def test_normalize_token_ids_matches_int_float():
+    tokens = pd.Series(["2.0", "007", "0", "1e3", "123456789012345678901234567890", "abc", "", None, "nan"])
+    result = normalize_token_ids(tokens)
+    assert result[:5].tolist() == ["2", "7", "0", "1000", "123456789012345678901234567890"]
+    assert result[5:].isna().all()
+
+
+def test_normalize_token_ids_keeps_large_ids_exact():
+    erc1155 = str(2 ** 255 + 1)
+    tokens = pd.Series(["1e20", "9007199254740993.0", erc1155 + ".0", "2.5", "-3", "inf", "1e999999"])
+    assert normalize_token_ids(tokens).tolist() == [
+        "100000000000000000000", "9007199254740993", erc1155,
+        "2.5",  # pas un entier : gardé tel quel plutôt que tronqué en "2"
+        "-3", None, "1e999999"]
+
+
+def test_parse_urls_extracts_keys():
+    keys = parse_urls([f"https://opensea.io/assets/ethereum/{CONTRACT}/2.0",
+                       f"https://opensea.io/assets/matic/{CONTRACT}/15/extra"])
+    assert keys.to_dict("records")[0] == {"chain": "ethereum", "contract_address": CONTRACT, "token_id": "2"}
+    assert keys.loc[1, "chain"] == "matic"
+
+
+def test_parse_urls_rejects_unparsable_urls():
+    keys = parse_urls(["pas une url", "https://opensea.io/assets/ethereum/" + CONTRACT + "/abc",
+                       "https://opensea.io/assets/ethereum/" + CONTRACT + "/15?ref=x",
+                       "https://opensea.io/collection/x"])
+    assert keys.isna().all(axis=None)
+
+
+def test_extract_flags_invalid_rows_and_keeps_missing_urls_empty():
+    urls = pd.Series([f"https://opensea.io/assets/ethereum/{CONTRACT}/1", None, "n'importe quoi",
+                      f"https://opensea.io/assets/ethereum/{CONTRACT}/1"], index=[10, 11, 12, 13])
+    keys, invalid = UrlKeyExtractor().extract(urls)
+    assert list(invalid) == [12]
+    assert keys.loc[10].tolist() == keys.loc[13].tolist() == ["ethereum", CONTRACT, "1"]
+    assert keys.loc[11].isna().all()
+
+
+def test_each_distinct_url_is_parsed_once():
+    extractor = UrlKeyExtractor()
+    urls = pd.Series([f"https://opensea.io/assets/ethereum/{CONTRACT}/{i % 3}" for i in range(30)])
+    extractor.extract(urls)
+    assert len(extractor._cache) == 3
+    extractor._cache[urls[0]] = ("cached", "cached", "cached")
+    keys, _ = extractor.extract(urls)
+    assert keys.loc[0, "chain"] == "cached"  # relu du cache, pas reparsé
+
+
+def test_extract_table_is_memoized_per_frame_and_version():
+    extractor = UrlKeyExtractor()
+    df = pd.DataFrame({"url": [f"https://opensea.io/assets/ethereum/{CONTRACT}/1"]})
+    keys, _ = extractor.extract_table(df, version=1)
+    assert extractor.extract_table(df, version=1)[0] is keys
+    assert extractor.extract_table(df, version=2)[0] is not keys
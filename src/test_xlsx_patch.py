@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pytest
+from openpyxl.styles import Font
+
+from excel_manager import ExcelManager
+from xlsx_patch import PatchError, patch_workbook, read_header
+
+
+@pytest.fixture
+def styled_workbook(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Tokens"
+    sheet.append(["Contract_Address", "token_id", "collection", "qtt_owned", "last_scrape_date"])
+    sheet.append(["0xa", "1", "azuki", 2, datetime(2025, 6, 1, 10, 0)])
+    sheet.append(["0xb", "2", None, 5, datetime(2025, 6, 2)])
+    sheet["C2"].font = Font(bold=True)
+    sheet["E2"].number_format = "yyyy-mm-dd hh:mm"
+    workbook.create_sheet("Notes")["A1"] = "gardé tel quel"
+    path = tmp_path / "tokens.xlsx"
+    workbook.save(path)
+    return str(path)
+
+
+def test_read_header_is_lowercase_column_index(styled_workbook):
+    assert read_header(styled_workbook) == {"contract_address": 1, "token_id": 2, "collection": 3,
+                                            "qtt_owned": 4, "last_scrape_date": 5}
+
+
+def test_patched_cells_round_trip(styled_workbook, tmp_path):
+    out = str(tmp_path / "patched.xlsx")
+    count = patch_workbook(styled_workbook, out, {
+        (2, 3): "a <b> & \"c\"",                # texte à échapper, style conservé
+        (2, 4): np.int64(7),
+        (2, 5): datetime(2026, 1, 2, 3, 4),    # date dans une cellule au format date
+        (3, 3): "ajoutée",                      # cellule absente de la ligne
+        (3, 4): None,                           # cellule effacée
+        (3, 6): 1.5,                            # après la dernière cellule de la ligne
+    })
+    assert count == 6
+
+    workbook = openpyxl.load_workbook(out)
+    sheet = workbook["Tokens"]
+    assert [c.value for c in sheet[2]][:5] == ["0xa", "1", "a <b> & \"c\"", 7, datetime(2026, 1, 2, 3, 4)]
+    assert [c.value for c in sheet[3]] == ["0xb", "2", "ajoutée", None, datetime(2025, 6, 2), 1.5]
+    assert sheet["C2"].font.bold
+    assert sheet["E2"].number_format == "yyyy-mm-dd hh:mm"
+    assert workbook["Notes"]["A1"].value == "gardé tel quel"
+
+
+def test_missing_row_raises_patch_error(styled_workbook, tmp_path):
+    with pytest.raises(PatchError):
+        patch_workbook(styled_workbook, str(tmp_path / "out.xlsx"), {(40, 1): "x"})
+
+
+def test_manager_saves_edits_as_a_patch(workbook):
+    manager = ExcelManager(workbook, use_cache=False, use_recovery=False)
+    manager.load_excel()
+    manager.set_cell(2, "collection", "patched")
+    manager.set_cell(5, "qtt_owned", 42)
+    manager.save_excel()
+    assert manager.last_save_stats["mode"] == "partielle"
+    assert manager.last_save_stats["count"] == 2
+
+    reloaded = ExcelManager(workbook, use_cache=False, use_recovery=False)
+    reloaded.load_excel()
+    assert reloaded.df.loc[2, "collection"] == "patched"
+    assert reloaded.df.loc[5, "qtt_owned"] == 42
+    assert reloaded.fingerprint() == manager.fingerprint()
+
+
+def test_structural_change_falls_back_to_full_write(workbook):
+    manager = ExcelManager(workbook, use_cache=False, use_recovery=False)
+    manager.load_excel()
+    manager.delete_rows([0])
+    manager.save_excel()
+    assert manager.last_save_stats["mode"] == "complète"
+
+    reloaded = ExcelManager(workbook, use_cache=False, use_recovery=False)
+    reloaded.load_excel()
+    assert len(reloaded.df) == len(manager.df)
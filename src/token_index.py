@@ -0,0 +1,197 @@
+# src/token_index.py
+
+import weakref
+
+import numpy as np
+import pandas as pd
+
+
+INDEX_COLUMNS = ["contract_address", "token_id"]
+
+
+def make_key(contract_address, token_id):
+    # Clé composite (contract_address, token_id) ; None si l'un des deux est vide
+    if contract_address is None or token_id is None:
+        return None
+    if pd.api.types.is_scalar(contract_address) and pd.isna(contract_address):
+        return None
+    if pd.api.types.is_scalar(token_id) and pd.isna(token_id):
+        return None
+    if isinstance(token_id, (float, np.floating)) and float(token_id).is_integer():
+        token_id = int(token_id)  # 12.0 lu par Excel -> "12"
+    contract_address, token_id = str(contract_address), str(token_id)
+    if contract_address == "" or token_id == "":
+        return None
+    return (contract_address, token_id)
+
+
+def frame_keys(frame):
+    # Clé de chaque ligne de frame (None si colonne absente ou valeur vide)
+    if any(col not in frame.columns for col in INDEX_COLUMNS):
+        return [None] * len(frame)
+    contract = frame["contract_address"].to_numpy(dtype=object)
+    token = frame["token_id"].to_numpy(dtype=object)
+    infer = pd.api.types.infer_dtype
+    if infer(contract, skipna=True) in ("string", "empty") and infer(token, skipna=True) in ("string", "empty"):
+        # Cas courant (colonnes déjà en texte) : tests de vide vectorisés, pas de make_key par ligne
+        missing = pd.isna(contract) | pd.isna(token) | (contract == "") | (token == "")
+        return [None if skip else (c, t) for c, t, skip in zip(contract, token, missing)]
+    return [make_key(c, t) for c, t in zip(contract, token)]
+
+
+class TokenIndex:
+    """Index clé (contract_address, token_id) -> ligne de df, tenu à jour par ExcelManager.
+
+    Chaque ligne reçoit un identifiant stable : les insertions / suppressions /
+    tris ne touchent que le tableau identifiant -> position, le dictionnaire des
+    clés n'est modifié que pour les lignes concernées.
+    """
+
+    def __init__(self):
+        self._rows = {}        # clé -> set des identifiants de ligne
+        self._keys = {}        # identifiant -> clé (lignes avec une clé seulement)
+        self._ids = np.empty(0, dtype=np.int64)  # identifiant de chaque position de df
+        self._positions = None  # identifiant -> position, recalculé à la demande
+        self._next_id = 0
+        self._duplicates = set()  # clés présentes sur plusieurs lignes
+        self._source = None       # weakref du DataFrame indexé
+
+    # --- État ---
+
+    def is_current(self, df):
+        return self._source is not None and self._source() is df
+
+    def attach(self, df):
+        self._source = weakref.ref(df) if df is not None else None
+
+    def invalidate(self):
+        self._source = None
+
+    def rebuild(self, df):
+        self._rows.clear()
+        self._keys.clear()
+        self._duplicates.clear()
+        self._next_id = 0
+        self._ids = self._new_ids(0 if df is None else len(df))
+        if df is not None:
+            # Construction en bloc (identifiant = position initiale)
+            self._keys = {row_id: key for row_id, key in enumerate(frame_keys(df)) if key is not None}
+            for row_id, key in self._keys.items():
+                rows = self._rows.get(key)
+                if rows is None:
+                    self._rows[key] = {row_id}
+                else:
+                    rows.add(row_id)
+                    self._duplicates.add(key)
+        self.attach(df)
+
+    def __len__(self):
+        return len(self._keys)
+
+    # --- Mises à jour incrémentales ---
+
+    def _new_ids(self, count):
+        ids = np.arange(self._next_id, self._next_id + count, dtype=np.int64)
+        self._next_id += count
+        self._positions = None
+        return ids
+
+    def _add(self, row_id, key):
+        # Retourne True si la clé existait déjà (doublon détecté en O(1))
+        if key is None:
+            return False
+        self._keys[row_id] = key
+        rows = self._rows.setdefault(key, set())
+        rows.add(row_id)
+        if len(rows) > 1:
+            self._duplicates.add(key)
+            return True
+        return False
+
+    def _remove(self, row_id):
+        key = self._keys.pop(row_id, None)
+        if key is None:
+            return
+        rows = self._rows[key]
+        rows.discard(row_id)
+        if not rows:
+            del self._rows[key]
+        if len(rows) <= 1:
+            self._duplicates.discard(key)
+
+    def insert(self, positions, frame, df):
+        # Même convention que ExcelManager.insert_rows : positions finales des lignes de frame
+        positions = np.asarray(positions, dtype=int)
+        new_ids = self._new_ids(len(positions))
+        ids = np.empty(len(self._ids) + len(positions), dtype=np.int64)
+        inserted = np.zeros(len(ids), dtype=bool)
+        inserted[positions] = True
+        ids[~inserted] = self._ids
+        ids[inserted] = new_ids
+        self._ids = ids
+
+        duplicates = []
+        for row_id, key in zip(new_ids, frame_keys(frame)):
+            if self._add(int(row_id), key):
+                duplicates.append(key)
+        self.attach(df)
+        return duplicates
+
+    def delete(self, positions, df):
+        positions = np.asarray(list(positions), dtype=int)
+        for row_id in self._ids[positions]:
+            self._remove(int(row_id))
+        self._ids = np.delete(self._ids, positions)
+        self._positions = None
+        self.attach(df)
+
+    def reorder(self, order, df):
+        self._ids = self._ids[np.asarray(order)]
+        self._positions = None
+        self.attach(df)
+
+    def update(self, position, key):
+        # Édition d'une colonne clé sur une ligne ; True si la nouvelle clé est un doublon
+        row_id = int(self._ids[position])
+        if self._keys.get(row_id) == key:
+            return False
+        self._remove(row_id)
+        return self._add(row_id, key)
+
+    # --- Recherche ---
+
+    def _position_of(self):
+        if self._positions is None:
+            positions = np.full(self._next_id, -1, dtype=np.int64)
+            positions[self._ids] = np.arange(len(self._ids))
+            self._positions = positions
+        return self._positions
+
+    def find(self, key):
+        rows = self._rows.get(key)
+        if not rows:
+            return None
+        positions = self._position_of()
+        return int(min(positions[row_id] for row_id in rows))
+
+    def find_many(self, keys):
+        # Position de chaque clé (première occurrence), -1 si absente
+        positions = self._position_of()
+        result = np.full(len(keys), -1, dtype=np.int64)
+        for i, key in enumerate(keys):
+            rows = self._rows.get(key)
+            if rows:
+                result[i] = min(positions[row_id] for row_id in rows)
+        return result
+
+    def positions(self, keys):
+        # Toutes les positions des lignes ayant l'une des clés (doublons compris), triées
+        row_ids = [row_id for key in keys for row_id in self._rows.get(key, ())]
+        return np.unique(self._position_of()[np.asarray(row_ids, dtype=np.int64)])
+
+    def key_at(self, position):
+        return self._keys.get(int(self._ids[position]))
+
+    def duplicates(self):
+        positions = self._position_of()
+        return {key: sorted(int(positions[row_id]) for row_id in self._rows[key]) for key in self._duplicates}
@@ -0,0 +1,303 @@
+# src/undo_journal.py
+
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def _values_size(values):
+    return sum(sys.getsizeof(v) for v in values)
+
+
+def _frame_size(frame):
+    if frame is None:
+        return 0
+    return int(frame.memory_usage(index=False, deep=True).sum())
+
+
+# --- Commandes (deltas appliqués sur ExcelManager) ---
+
+class CellsEdit:
+    """Une ou plusieurs cellules modifiées (édition simple, collage, effacement)."""
+    structural = False
+
+    def __init__(self, rows, columns, old_values, new_values):
+        self.rows = list(rows)
+        self.columns = list(columns)
+        self.old_values = list(old_values)
+        self.new_values = list(new_values)
+
+    def undo(self, manager):
+        manager.set_cells(self.rows, self.columns, self.old_values)
+
+    def redo(self, manager):
+        manager.set_cells(self.rows, self.columns, self.new_values)
+
+    def cells(self):
+        return zip(self.rows, self.columns)
+
+    def size(self):
+        return 64 * len(self.rows) + _values_size(self.old_values) + _values_size(self.new_values)
+
+
+class RowsInserted:
+    structural = True
+
+    def __init__(self, positions, frame):
+        self.positions = list(positions)
+        self.frame = frame
+
+    def undo(self, manager):
+        manager.delete_rows(self.positions)
+
+    def redo(self, manager):
+        manager.insert_rows(self.positions, self.frame)
+
+    def size(self):
+        return 8 * len(self.positions) + _frame_size(self.frame)
+
+
+class RowsDeleted(RowsInserted):
+    def undo(self, manager):
+        RowsInserted.redo(self, manager)
+
+    def redo(self, manager):
+        RowsInserted.undo(self, manager)
+
+
+class RowsReordered:
+    structural = True
+
+    def __init__(self, order):
+        self.order = np.asarray(order)
+
+    def undo(self, manager):
+        manager.reorder_rows(np.argsort(self.order, kind="stable"))
+
+    def redo(self, manager):
+        manager.reorder_rows(self.order)
+
+    def size(self):
+        return self.order.nbytes
+
+
+class ColumnAdded:
+    structural = True
+    column_op = True  # seules les colonnes changent : la vue met à jour son en-tête (sans reset)
+
+    def __init__(self, name, position):
+        self.name = name
+        self.position = position
+        self.locks = None  # verrous posés sur la colonne avant l'annulation
+
+    def undo(self, manager):
+        self.locks = manager.delete_column(self.name)[2]
+
+    def redo(self, manager):
+        manager.add_column(self.name, self.position, locks=self.locks)
+
+    def size(self):
+        return 64
+
+
+class ColumnDeleted:
+    structural = True
+    column_op = True
+
+    def __init__(self, name, position, values, locks=None):
+        self.name = name
+        self.position = position
+        self.values = values
+        self.locks = locks  # clés verrouillées de la colonne, rendues à l'annulation
+
+    def undo(self, manager):
+        manager.add_column(self.name, self.position, self.values, self.locks)
+
+    def redo(self, manager):
+        self.locks = manager.delete_column(self.name)[2]
+
+    def size(self):
+        return 64 + (int(self.values.memory_usage(index=False, deep=True)) if self.values is not None else 0)
+
+
+class ColumnRenamed:
+    structural = True
+    column_op = True
+
+    def __init__(self, old_name, new_name):
+        self.old_name = old_name
+        self.new_name = new_name
+
+    def undo(self, manager):
+        manager.rename_column(self.new_name, self.old_name)
+
+    def redo(self, manager):
+        manager.rename_column(self.old_name, self.new_name)
+
+    def size(self):
+        return 64
+
+
+class ColumnMoved:
+    structural = True
+    column_op = True
+
+    def __init__(self, name, old_position, new_position):
+        self.name = name
+        self.old_position = old_position
+        self.new_position = new_position
+
+    def undo(self, manager):
+        manager.move_column(self.name, self.old_position)
+
+    def redo(self, manager):
+        manager.move_column(self.name, self.new_position)
+
+    def size(self):
+        return 64
+
+
+class TableReplaced:
+    """Remplacement complet de df (import) : on garde les deux références, sans copie."""
+    structural = True
+
+    def __init__(self, before, after):
+        self.before = before
+        self.after = after
+
+    def undo(self, manager):
+        manager.replace_table(self.before)
+
+    def redo(self, manager):
+        manager.replace_table(self.after)
+
+    def size(self):
+        return _frame_size(self.before)
+
+
+class Transaction:
+    """Groupe de commandes annulées / refaites en une seule action."""
+
+    def __init__(self, label, commands=None):
+        self.label = label
+        self.commands = commands or []
+        self.nbytes = 0
+
+    @property
+    def structural(self):
+        return any(command.structural for command in self.commands)
+
+    @property
+    def columns_only(self):
+        return all(getattr(command, "column_op", False) for command in self.commands)
+
+    def undo(self, manager):
+        for command in reversed(self.commands):
+            command.undo(manager)
+
+    def redo(self, manager):
+        for command in self.commands:
+            command.redo(manager)
+
+    def cells(self):
+        for command in self.commands:
+            if isinstance(command, CellsEdit):
+                yield from command.cells()
+
+    def size(self):
+        return sum(command.size() for command in self.commands)
+
+
+# --- Journal ---
+
+class UndoJournal:
+    def __init__(self, memory_budget_mb=64, fingerprint=None):
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.undo_stack = []
+        self.redo_stack = []
+        self.memory = 0
+        self._group = None
+        self._depth = 0
+        # fingerprint() : empreinte du contenu (ExcelManager.fingerprint) ; une action qui
+        # ramène au même contenu (A -> B -> A, tri déjà dans l'ordre) n'est pas empilée
+        self.fingerprint = fingerprint
+        self._state = None  # empreinte après la dernière action empilée / annulée / refaite
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.memory = 0
+        self._group = None
+        self._depth = 0
+        self._state = None
+
+    @contextmanager
+    def transaction(self, label):
+        # Les transactions imbriquées sont fusionnées dans la plus externe
+        if self._depth == 0:
+            self._group = Transaction(label)
+        self._depth += 1
+        try:
+            yield self._group
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                group, self._group = self._group, None
+                if group.commands:
+                    self._push(group)
+
+    def record(self, command, label=""):
+        if self._group is not None:
+            self._group.commands.append(command)
+        else:
+            self._push(Transaction(label, [command]))
+
+    def _changed(self):
+        if self.fingerprint is None:
+            return True
+        state, self._state = self._state, self.fingerprint()
+        return state is None or state != self._state
+
+    def _push(self, transaction):
+        if not self._changed():
+            return  # contenu identique à l'état précédent : rien à annuler
+        transaction.nbytes = transaction.size()
+        self.undo_stack.append(transaction)
+        self.memory += transaction.nbytes
+
+        # Vide la pile redo dès qu'un nouveau changement est fait
+        for redo in self.redo_stack:
+            self.memory -= redo.nbytes
+        self.redo_stack.clear()
+
+        # Budget mémoire : on oublie les plus anciennes actions (la dernière est toujours gardée)
+        while self.memory > self.memory_budget and len(self.undo_stack) > 1:
+            self.memory -= self.undo_stack.pop(0).nbytes
+
+    def in_transaction(self):
+        return self._group is not None
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self, manager):
+        if not self.undo_stack:
+            return None
+        transaction = self.undo_stack.pop()
+        transaction.undo(manager)
+        self.redo_stack.append(transaction)
+        self._state = None if self.fingerprint is None else self.fingerprint()
+        return transaction
+
+    def redo(self, manager):
+        if not self.redo_stack:
+            return None
+        transaction = self.redo_stack.pop()
+        transaction.redo(manager)
+        self.undo_stack.append(transaction)
+        self._state = None if self.fingerprint is None else self.fingerprint()
+        return transaction
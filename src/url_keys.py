@@ -0,0 +1,116 @@
+# src/url_keys.py
+
+import re
+import weakref
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+import pandas as pd
+
+
+KEY_COLUMNS = ["chain", "contract_address", "token_id"]
+MAX_TOKEN_ID_DIGITS = 80  # uint256 : 78 chiffres au plus
+
+# https://opensea.io/assets/<chain>/<contract_address>/<token_id> (segments 4, 5 et 6 de l'URL)
+URL_KEYS_PATTERN = re.compile(
+    r"^[^/]*/[^/]*/[^/]*/[^/]*/(?P<chain>[^/]*)/(?P<contract_address>[^/]*)/(?P<token_id>[^/]*)"
+)
+
+
+def _exact_token_id(token):
+    # Hors de la plage exacte des float (ERC-1155 > 2**53, "1e20", "2.5") : calcul en Decimal, sans arrondi
+    try:
+        number = Decimal(token.strip())
+    except InvalidOperation:
+        return None
+    if not number.is_finite():
+        return None
+    if number != number.to_integral_value() or number.adjusted() > MAX_TOKEN_ID_DIGITS:
+        return token.strip()  # pas un entier (ou exposant démesuré) : gardé tel quel plutôt que tronqué
+    return str(int(number))
+
+
+def normalize_token_ids(tokens):
+    # Équivalent vectorisé de str(int(float(token))) ; les entiers décimaux restent exacts
+    tokens = tokens.astype(object)
+    result = pd.Series(None, index=tokens.index, dtype=object)
+    digits = tokens.str.fullmatch(r"\d+").fillna(False).astype(bool)
+    result[digits] = tokens[digits].str.lstrip("0").replace("", "0")
+    numbers = pd.to_numeric(tokens[~digits], errors="coerce")
+    numbers = numbers[numbers.notna()]
+    # float64 n'est exact que jusqu'à 2**53 : au-delà (et pour les non-entiers), voir _exact_token_id
+    exact = np.isfinite(numbers) & (numbers.abs() < 2 ** 53) & (numbers == np.floor(numbers))
+    result[numbers.index[exact]] = numbers[exact].astype("int64").astype(str)
+    others = numbers.index[~exact]
+    result[others] = [_exact_token_id(token) for token in tokens[others]]
+    return result
+
+
+def parse_urls(urls):
+    # Parsing vectorisé d'une liste d'URL distinctes -> DataFrame chain / contract_address / token_id
+    keys = pd.Series(urls, dtype=object).str.extract(URL_KEYS_PATTERN).astype(object)
+    keys["token_id"] = normalize_token_ids(keys["token_id"])
+    keys.loc[keys["token_id"].isna(), :] = None  # token_id invalide : URL ignorée en entier
+    return keys.where(keys.notna() & (keys != ""), None)
+
+
+class UrlKeyExtractor:
+    """Extraction des clés (chain, contract_address, token_id) depuis la colonne url.
+
+    Chaque URL distincte n'est parsée qu'une fois, le résultat est gardé d'un import
+    à l'autre. Pour la table de référence, le résultat complet est mémorisé tant que
+    ses URL ne changent pas (même DataFrame, même version).
+    """
+
+    def __init__(self, max_cache_size=1_000_000):
+        self.max_cache_size = max_cache_size
+        self._cache = {}  # url -> (chain, contract_address, token_id) ou None si inexploitable
+        self._memo = None  # (weakref du DataFrame, version, clés, lignes invalides)
+
+    def clear(self):
+        self._cache.clear()
+        self._memo = None
+
+    def extract(self, urls):
+        # Retourne (clés par ligne, index des lignes dont l'URL est inexploitable)
+        values = urls.to_numpy(dtype=object)
+        present = ~pd.isna(values)
+        codes, uniques = pd.factorize(values[present])
+
+        missing = [url for url in uniques if url not in self._cache]
+        if missing:
+            if len(self._cache) + len(missing) > self.max_cache_size:
+                self._cache.clear()
+                missing = list(uniques)
+            parsed = parse_urls([str(url) for url in missing])
+            for url, chain, contract_address, token_id in zip(
+                missing, parsed["chain"], parsed["contract_address"], parsed["token_id"]
+            ):
+                found = chain is not None or contract_address is not None or token_id is not None
+                self._cache[url] = (chain, contract_address, token_id) if found else None
+
+        entries = [self._cache[url] for url in uniques]
+        valid_unique = np.array([entry is not None for entry in entries], dtype=bool)
+        keys = {}
+        for i, column in enumerate(KEY_COLUMNS):
+            per_url = np.array([entry[i] if entry is not None else None for entry in entries], dtype=object)
+            column_values = np.full(len(values), None, dtype=object)
+            column_values[present] = per_url[codes]
+            keys[column] = column_values
+        keys = pd.DataFrame(keys, index=urls.index)
+
+        invalid = np.zeros(len(values), dtype=bool)
+        invalid[present] = ~valid_unique[codes]
+        return keys, urls.index[invalid]
+
+    def extract_table(self, df, version=0):
+        # Clés de la table de référence, sans rien recalculer si ses URL n'ont pas changé
+        memo = self._memo
+        if memo is not None and memo[0]() is df and memo[1] == version:
+            return memo[2], memo[3]
+        keys, invalid = self.extract(df["url"])
+        self._memo = (weakref.ref(df), version, keys, invalid)
+        return keys, invalid
+
+    def remember_table(self, df, version, keys, invalid):
+        self._memo = (weakref.ref(df), version, keys, invalid)
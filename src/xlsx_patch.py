@@ -0,0 +1,227 @@
+# src/xlsx_patch.py
+
+import math
+import posixpath
+import re
+import zipfile
+from datetime import date, datetime
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils import get_column_letter, column_index_from_string
+
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+ROW_PATTERN = re.compile(rb'<row\b[^>]*?\br="(\d+)"[^>]*?(?:/>|>.*?</row>)', re.S)
+CELL_PATTERN = re.compile(rb'<c\b[^>]*?\br="([A-Z]+)\d+"[^>]*?(?:/>|>.*?</c>)', re.S)
+STYLE_PATTERN = re.compile(rb'\bs="(\d+)"')
+ROW_NUMBER_PATTERN = re.compile(rb'<row\b[^>]*?\br="(\d+)"')
+FORMULA_PATTERN = re.compile(rb"<f[ >/]")
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+
+
+class PatchError(Exception):
+    """Le classeur ne peut pas être corrigé sur place (on repasse à une écriture complète)."""
+
+
+def _active_sheet(archive):
+    # Élément <sheet> de l'onglet actif (activeTab de workbook.xml, comme openpyxl)
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    sheets = workbook.findall(f"{MAIN_NS}sheets/{MAIN_NS}sheet")
+    view = workbook.find(f"{MAIN_NS}bookViews/{MAIN_NS}workbookView")
+    active = int(view.get("activeTab", 0)) if view is not None else 0
+    return sheets[min(active, len(sheets) - 1)]
+
+
+def active_sheet_name(path):
+    """Nom de la feuille active (celle lue par load_excel, quel que soit le moteur)."""
+    with zipfile.ZipFile(path) as archive:
+        return _active_sheet(archive).get("name")
+
+
+def active_sheet_path(archive):
+    # Feuille active (celle lue par load_excel) : workbook.xml -> relation -> xl/worksheets/...
+    rel_id = _active_sheet(archive).get(f"{REL_NS}id")
+
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.findall(f"{PKG_REL_NS}Relationship"):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            if target.startswith("/"):
+                return target[1:]
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise PatchError("feuille active introuvable")
+
+
+def _cell_text(cell, shared_strings):
+    # Texte d'une cellule d'en-tête (chaîne partagée, chaîne en ligne ou valeur brute)
+    kind = cell.get("t")
+    if kind == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{MAIN_NS}t"))
+    value = cell.find(f"{MAIN_NS}v")
+    if value is None or value.text is None:
+        return None
+    if kind == "s":
+        return shared_strings(int(value.text))
+    return value.text
+
+
+def _shared_string(archive, index):
+    # Lecture en flux de sharedStrings.xml jusqu'à l'indice voulu (les en-têtes sont en tête de table)
+    with archive.open("xl/sharedStrings.xml") as f:
+        position = 0
+        for _, element in ElementTree.iterparse(f):
+            if element.tag == f"{MAIN_NS}si":
+                if position == index:
+                    return "".join(t.text or "" for t in element.iter(f"{MAIN_NS}t"))
+                position += 1
+                element.clear()
+    return None
+
+
+def read_header(path):
+    """Première ligne de la feuille active : nom (minuscule, comme load_excel) -> indice de colonne."""
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(active_sheet_path(archive)) as f:
+            head = b""
+            while True:
+                chunk = f.read(1 << 16)
+                head += chunk
+                match = ROW_PATTERN.search(head)
+                if match is not None or not chunk:
+                    break
+        if match is None:
+            return {}
+        row = ElementTree.fromstring(match.group(0).replace(b"<row", f'<row xmlns="{MAIN_NS[1:-1]}"'.encode(), 1))
+        header = {}
+        for cell in row.findall(f"{MAIN_NS}c"):
+            text = _cell_text(cell, lambda index: _shared_string(archive, index))
+            if text is not None:
+                column = column_index_from_string(re.match(r"[A-Z]+", cell.get("r")).group(0))
+                header[str(text).strip().lower()] = column
+        return header
+
+
+def last_row_number(path):
+    """Numéro de la dernière ligne <row> de la feuille active (lignes vides comprises, comme openpyxl)."""
+    last = 0
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(active_sheet_path(archive)) as f:
+            tail = b""
+            while True:
+                chunk = f.read(1 << 20)
+                if not chunk:
+                    return last
+                block = tail + chunk
+                position = block.rfind(b"<row")
+                while position >= 0:
+                    match = ROW_NUMBER_PATTERN.match(block, position)
+                    if match is not None:
+                        last = max(last, int(match.group(1)))
+                        break
+                    position = block.rfind(b"<row", 0, position)
+                tail = block[-256:]  # balise <row coupée entre deux blocs
+
+
+def has_formulas(path):
+    """Vrai si la feuille active contient au moins une formule (<f>), lue en flux jusqu'à la première."""
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(active_sheet_path(archive)) as f:
+            tail = b""
+            while True:
+                chunk = f.read(1 << 20)
+                if not chunk:
+                    return False
+                block = tail + chunk
+                if FORMULA_PATTERN.search(block):
+                    return True
+                tail = block[-3:]
+
+
+def _cell_xml(ref, value, style):
+    # Nouvelle cellule ; le style existant (s="...") est conservé
+    s = b' s="' + style + b'"' if style else b""
+    ref = ref.encode()
+    if value is None or (not isinstance(value, str) and pd.api.types.is_scalar(value) and pd.isna(value)) \
+            or value == "":
+        return b'<c r="' + ref + b'"' + s + b"/>" if style else b""
+    if isinstance(value, (bool, np.bool_)):
+        return b'<c r="' + ref + b'"' + s + b' t="b"><v>' + (b"1" if value else b"0") + b"</v></c>"
+    if isinstance(value, (int, float, np.integer, np.floating)) and math.isfinite(value):
+        return b'<c r="' + ref + b'"' + s + b' t="n"><v>' + repr(value.item() if isinstance(value, np.generic) else value).encode() + b"</v></c>"
+    if isinstance(value, (datetime, date, np.datetime64)) and style:
+        serial = (pd.Timestamp(value) - EXCEL_EPOCH) / pd.Timedelta(days=1)
+        return b'<c r="' + ref + b'"' + s + b' t="n"><v>' + repr(serial).encode() + b"</v></c>"
+    text = escape(str(value)).encode("utf-8")
+    return (b'<c r="' + ref + b'"' + s + b' t="inlineStr"><is><t xml:space="preserve">' + text + b"</t></is></c>")
+
+
+def _patch_row(row_xml, excel_row, cells):
+    # cells : {indice de colonne (1 = A): valeur}
+    if row_xml.endswith(b"/>"):
+        row_xml = row_xml[:-2] + b"></row>"
+    existing = {}
+    for match in CELL_PATTERN.finditer(row_xml):
+        existing[column_index_from_string(match.group(1).decode())] = match
+
+    pieces, last = [], 0
+    # Cellules remplacées / insérées dans l'ordre des colonnes
+    end_of_cells = row_xml.rindex(b"</row>")
+    for col in sorted(cells):
+        ref = f"{get_column_letter(col)}{excel_row}"
+        match = existing.get(col)
+        if match is not None:
+            style_match = STYLE_PATTERN.search(match.group(0).split(b">", 1)[0])
+            style = style_match.group(1) if style_match else None
+            pieces.append(row_xml[last:match.start()])
+            pieces.append(_cell_xml(ref, cells[col], style))
+            last = match.end()
+        else:
+            following = [m.start() for c, m in existing.items() if c > col and m.start() >= last]
+            at = min(following) if following else end_of_cells
+            pieces.append(row_xml[last:at])
+            pieces.append(_cell_xml(ref, cells[col], None))
+            last = at
+    pieces.append(row_xml[last:])
+    return b"".join(pieces)
+
+
+def patch_workbook(path, out_path, cells):
+    """Copie path vers out_path en ne réécrivant que les cellules données.
+
+    cells : {(ligne Excel, indice de colonne): valeur}. Les autres parties du
+    classeur (styles, largeurs, autres feuilles) sont recopiées telles quelles.
+    """
+    by_row = {}
+    for (row, col), value in cells.items():
+        by_row.setdefault(row, {})[col] = value
+
+    with zipfile.ZipFile(path) as archive:
+        sheet_path = active_sheet_path(archive)
+        sheet = archive.read(sheet_path)
+
+        pieces, last, patched = [], 0, 0
+        for match in ROW_PATTERN.finditer(sheet):
+            row = int(match.group(1))
+            if row not in by_row:
+                continue
+            pieces.append(sheet[last:match.start()])
+            pieces.append(_patch_row(match.group(0), row, by_row[row]))
+            last = match.end()
+            patched += 1
+        if patched != len(by_row):
+            raise PatchError("lignes absentes de la feuille")
+        pieces.append(sheet[last:])
+
+        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as output:
+            for info in archive.infolist():
+                data = b"".join(pieces) if info.filename == sheet_path else archive.read(info.filename)
+                # Compression rapide pour la feuille (gros volume), les autres parties sont petites
+                output.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED,
+                                compresslevel=1 if info.filename == sheet_path else None)
+    return len(cells)